@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Bar Cache Module - Local historical bar store in memory-mapped columnar files
+One directory per (conId, bar size) with one flat file per column; appends go
+to the end of each file and range queries return NumPy memmap slices (no copy)
+"""
+
+import os
+import re
+import calendar
+from datetime import date, datetime
+
+import numpy as np
+
+COLUMNS = {
+    'time': np.int64,      # bar start, UTC epoch seconds
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.float64,
+}
+
+# How far back the first fetch for a (conId, bar size) reaches
+INITIAL_DURATIONS = {
+    '1 min': '1 D',
+    '5 mins': '1 W',
+    '15 mins': '2 W',
+    '1 hour': '1 M',
+    '1 day': '1 Y',
+}
+
+
+def bar_timestamp(bar_date):
+    """UTC epoch seconds for an ib_insync BarData.date (date or datetime)"""
+    if isinstance(bar_date, datetime):
+        if bar_date.tzinfo is None:
+            return calendar.timegm(bar_date.timetuple())
+        return int(bar_date.timestamp())
+    if isinstance(bar_date, date):
+        return calendar.timegm(bar_date.timetuple())
+    return int(bar_date)
+
+
+def gap_duration(seconds, bar_size='1 min'):
+    """
+    Smallest IB durationStr covering a gap of `seconds`. Seconds are only used for
+    intraday bars within a day; daily and longer bars are requested in days or weeks
+    """
+    intraday = not re.search(r'day|week|month', bar_size)
+    if intraday and seconds <= 86400:
+        return f"{max(int(seconds), 60)} S"
+    days = int(seconds // 86400) + 1
+    if days <= 7:
+        return f"{days} D"
+    if days <= 365:
+        return f"{-(-days // 7)} W" if not intraday else f"{days} D"
+    return f"{days // 365 + 1} Y"
+
+
+class BarStore:
+    """Append-only columnar bar files under a root directory (only the newest bar is ever rewritten)"""
+
+    def __init__(self, root):
+        self.root = root
+        self._maps = {}  # (path, column) -> (size, memmap) reused until the file grows
+
+    def _dir(self, con_id, bar_size):
+        return os.path.join(self.root, f"{int(con_id)}_{re.sub(r'[^0-9a-z]+', '', bar_size.lower())}")
+
+    def _column(self, path, name):
+        """Read-only memmap of one column, or an empty array if nothing is stored"""
+        file_path = os.path.join(path, f"{name}.bin")
+        size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        if size == 0:
+            return np.empty(0, dtype=COLUMNS[name])
+        cached = self._maps.get((path, name))
+        if cached is None or cached[0] != size:
+            cached = (size, np.memmap(file_path, dtype=COLUMNS[name], mode='r'))
+            self._maps[(path, name)] = cached
+        return cached[1]
+
+    def count(self, con_id, bar_size):
+        """Rows stored (shortest column, so a torn append is ignored)"""
+        path = self._dir(con_id, bar_size)
+        itemsize = {name: np.dtype(dtype).itemsize for name, dtype in COLUMNS.items()}
+        sizes = [os.path.getsize(os.path.join(path, f"{name}.bin")) // itemsize[name]
+                 if os.path.exists(os.path.join(path, f"{name}.bin")) else 0
+                 for name in COLUMNS]
+        return min(sizes)
+
+    def last_timestamp(self, con_id, bar_size):
+        """Start time of the newest cached bar, or None"""
+        rows = self.count(con_id, bar_size)
+        if rows == 0:
+            return None
+        return int(self._column(self._dir(con_id, bar_size), 'time')[rows - 1])
+
+    def append(self, con_id, bar_size, bars):
+        """
+        Append ib_insync BarData from the last cached bar on; returns rows written.
+        The last cached bar is rewritten, since it may have been cached while still forming
+        """
+        last = self.last_timestamp(con_id, bar_size)
+        rows = [(bar_timestamp(b.date), b.open, b.high, b.low, b.close, b.volume) for b in bars]
+        rows = [row for row in rows if last is None or row[0] >= last]
+        if not rows:
+            return 0
+
+        path = self._dir(con_id, bar_size)
+        os.makedirs(path, exist_ok=True)
+        # Trim any torn tail (and the bar being replaced) so all columns stay aligned
+        stored = self.count(con_id, bar_size)
+        if last is not None and rows[0][0] == last:
+            stored -= 1
+        for i, (name, dtype) in enumerate(COLUMNS.items()):
+            file_path = os.path.join(path, f"{name}.bin")
+            values = np.array([row[i] for row in rows], dtype=dtype)
+            with open(file_path, 'ab') as f:
+                f.truncate(stored * np.dtype(dtype).itemsize)
+                f.write(values.tobytes())
+        return len(rows)
+
+    def query(self, con_id, bar_size, start=None, end=None):
+        """Columns for bars with start <= time <= end, as zero-copy memmap slices"""
+        path = self._dir(con_id, bar_size)
+        rows = self.count(con_id, bar_size)
+        times = self._column(path, 'time')[:rows]
+        lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        hi = rows if end is None else int(np.searchsorted(times, end, side='right'))
+        return {name: self._column(path, name)[lo:hi] if rows else self._column(path, name)
+                for name in COLUMNS}
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Chain Export Module - Streams option-chain snapshots and live option ticks to disk
+Rows are buffered in columns on the bridge loop and handed in batches to a
+writer thread, which appends them to rolling segment files: Arrow IPC (memory-
+mappable), Parquet, or CSV when pyarrow is not installed. The active segment
+carries a '.partial' suffix until it is rolled or the export stops
+"""
+
+import csv
+import math
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+# Column order and types are fixed so files from any session read the same way
+SCHEMA = [
+    ('ts', 'int64'),           # epoch milliseconds
+    ('symbol', 'string'),
+    ('expiry', 'string'),      # YYYYMMDD
+    ('strike', 'float64'),
+    ('right', 'string'),       # C / P
+    ('bid', 'float64'),
+    ('ask', 'float64'),
+    ('mid', 'float64'),
+    ('iv', 'float64'),         # fraction, not percent
+    ('delta', 'float64'),
+    ('gamma', 'float64'),
+    ('theta', 'float64'),
+    ('vega', 'float64'),
+    ('underlying', 'float64'),
+    ('source', 'string'),      # snapshot / tick
+]
+COLUMNS = [name for name, _ in SCHEMA]
+EXTENSIONS = {'arrow': 'arrow', 'parquet': 'parquet', 'csv': 'csv'}
+
+
+def arrow_schema():
+    return pa.schema([(name, getattr(pa, kind)()) for name, kind in SCHEMA])
+
+
+def resolve_format(fmt):
+    """'auto' picks Arrow IPC when pyarrow is available, else CSV"""
+    fmt = (fmt or 'auto').lower()
+    if fmt == 'auto':
+        return 'arrow' if pa is not None else 'csv'
+    if fmt not in EXTENSIONS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt != 'csv' and pa is None:
+        raise ValueError(f"{fmt} export needs pyarrow (pip install pyarrow); use csv instead")
+    return fmt
+
+
+def _number(value):
+    """float, with None/NaN as NaN"""
+    if value is None:
+        return math.nan
+    value = float(value)
+    return value if value == value else math.nan
+
+
+class SegmentWriter:
+    """One rolling output file in the chosen format"""
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.partial = path + '.partial'
+        self.fmt = fmt
+        self.rows = 0
+        self.opened = time.time()
+        if fmt == 'csv':
+            self._file = open(self.partial, 'w', newline='')
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(COLUMNS)
+        elif fmt == 'arrow':
+            self.schema = arrow_schema()
+            self._sink = pa.OSFile(self.partial, 'wb')
+            self._writer = pa.ipc.new_file(self._sink, self.schema)
+        else:
+            self.schema = arrow_schema()
+            self._writer = pa.parquet.ParquetWriter(self.partial, self.schema)
+
+    def write(self, batch):
+        if self.fmt == 'csv':
+            self._csv.writerows(zip(*(batch[name] for name in COLUMNS)))
+            self._file.flush()
+        else:
+            record_batch = pa.RecordBatch.from_arrays(
+                [pa.array(batch[field.name], type=field.type) for field in self.schema], schema=self.schema)
+            if self.fmt == 'arrow':
+                self._writer.write_batch(record_batch)
+            else:
+                self._writer.write_table(pa.Table.from_batches([record_batch]))
+        self.rows += len(batch['ts'])
+
+    def close(self):
+        if self.fmt == 'csv':
+            self._file.close()
+        else:
+            self._writer.close()
+            if self.fmt == 'arrow':
+                self._sink.close()
+        os.replace(self.partial, self.path)
+        return self.path
+
+
+class ChainExporter:
+    """Buffers chain rows on the caller's thread and writes them in batches on a background thread"""
+
+    def __init__(self, root, fmt='auto', live=False, batch_rows=2048, flush_interval=2.0,
+                 roll_rows=1000000, roll_seconds=3600):
+        self.root = root
+        self.fmt = resolve_format(fmt)
+        self.live = live
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self.roll_rows = roll_rows
+        self.roll_seconds = roll_seconds
+        os.makedirs(root, exist_ok=True)
+
+        self._buffer = {name: [] for name in COLUMNS}
+        self._last_flush = time.time()
+        self._batches = queue.Queue()
+        self._segment = None
+        self._segment_num = 0
+        self.files = []          # closed segments, oldest first
+        self.rows_written = 0
+        self.rows_buffered = 0
+        self.error = None
+        self._thread = threading.Thread(target=self._write_loop, name='chain-export', daemon=True)
+        self._thread.start()
+
+    # Bridge-loop side
+
+    def _append(self, ts, symbol, expiry, strike, right, bid, ask, mid, iv, delta, gamma, theta, vega,
+                underlying, source):
+        for name, value in zip(COLUMNS, (ts, symbol, expiry, float(strike), right, bid, ask, mid, iv,
+                                         delta, gamma, theta, vega, underlying, source)):
+            self._buffer[name].append(value)
+        self.rows_buffered += 1
+        if self.rows_buffered >= self.batch_rows:
+            self.flush()
+
+    def add_chain(self, symbol, rows, underlying=None):
+        """One get_option_chain reply (a call and a put row per strike)"""
+        ts = int(time.time() * 1000)
+        nan = math.nan
+        for row in rows:
+            for right, prefix in (('C', 'call'), ('P', 'put')):
+                iv = _number(row.get(f'{prefix}IV')) / 100
+                self._append(ts, symbol, row['expiryRaw'], row['strike'], right, nan, nan,
+                             _number(row.get(f'{prefix}Mid')) or nan, iv or nan,
+                             _number(row.get(f'{prefix}Delta')), nan, _number(row.get(f'{prefix}Theta')), nan,
+                             _number(underlying), 'snapshot')
+
+    def add_tick(self, option_ticker):
+        """One live update from an option market-data line"""
+        contract = option_ticker.contract
+        greeks = option_ticker.modelGreeks
+        bid, ask = _number(option_ticker.bid), _number(option_ticker.ask)
+        self._append(int(time.time() * 1000), contract.symbol, contract.lastTradeDateOrContractMonth,
+                     contract.strike, contract.right, bid, ask, (bid + ask) / 2,
+                     _number(greeks.impliedVol) if greeks else math.nan,
+                     _number(greeks.delta) if greeks else math.nan,
+                     _number(greeks.gamma) if greeks else math.nan,
+                     _number(greeks.theta) if greeks else math.nan,
+                     _number(greeks.vega) if greeks else math.nan,
+                     _number(greeks.undPrice) if greeks else math.nan, 'tick')
+
+    def flush(self):
+        """Hand the buffered rows to the writer thread (never blocks on I/O)"""
+        if self.rows_buffered:
+            batch, self._buffer = self._buffer, {name: [] for name in COLUMNS}
+            self._batches.put(batch)
+            self.rows_buffered = 0
+        self._last_flush = time.time()
+
+    def maybe_flush(self):
+        """Periodic hook: flush once the interval has passed"""
+        if self.rows_buffered and time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def close(self):
+        """Flush, finish the active segment and stop the writer thread"""
+        self.flush()
+        self._batches.put(None)
+        self._thread.join()
+        return self.status()
+
+    def status(self):
+        return {
+            "format": self.fmt,
+            "live": self.live,
+            "directory": self.root,
+            "rowsWritten": self.rows_written,
+            "rowsBuffered": self.rows_buffered,
+            "files": list(self.files),
+            "activeFile": self._segment.partial if self._segment else None,
+            "error": self.error,
+        }
+
+    # Writer thread
+
+    def _roll(self):
+        if self._segment is not None:
+            self.files.append(self._segment.close())
+            self._segment = None
+
+    def _write_loop(self):
+        while True:
+            batch = self._batches.get()
+            try:
+                if batch is None:
+                    self._roll()
+                    return
+                if self._segment is not None and (self._segment.rows >= self.roll_rows or
+                                                  time.time() - self._segment.opened >= self.roll_seconds):
+                    self._roll()
+                if self._segment is None:
+                    self._segment_num += 1
+                    name = f"chains-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{self._segment_num:04d}"
+                    self._segment = SegmentWriter(os.path.join(self.root, f"{name}.{EXTENSIONS[self.fmt]}"),
+                                                  self.fmt)
+                self._segment.write(batch)
+                self.rows_written += len(batch['ts'])
+            except Exception as e:
+                self.error = str(e)
+                print(f"Chain export write failed: {str(e)}", file=sys.stderr, flush=True)
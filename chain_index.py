@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Chain Index Module - Sorted strike/expiry index per underlying
+Answers ATM, strikes-around-spot, strike-for-delta and DTE-window queries
+with bisect instead of scanning or re-fetching the option chain
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+
+class ChainIndex:
+    """Sorted strikes and expiries for one underlying, plus cached deltas"""
+
+    def __init__(self, strikes, expirations):
+        self.strikes = sorted(set(float(s) for s in strikes))
+        self.expirations = sorted(set(expirations))  # 'YYYYMMDD' strings sort chronologically
+        self.deltas = {}  # (expiry, right) -> {strike: delta}
+        self._delta_curves = {}  # (expiry, right) -> (strikes, deltas) sorted by strike
+
+    def nearest_index(self, spot):
+        """Index of the strike closest to spot"""
+        if not self.strikes:
+            return None
+        i = bisect_left(self.strikes, spot)
+        if i == 0:
+            return 0
+        if i == len(self.strikes):
+            return i - 1
+        return i if self.strikes[i] - spot < spot - self.strikes[i - 1] else i - 1
+
+    def atm_strike(self, spot):
+        """Strike closest to spot"""
+        i = self.nearest_index(spot)
+        return None if i is None else self.strikes[i]
+
+    def strikes_around(self, spot, count=12):
+        """`count` strikes centred on the ATM strike (half below, half from ATM up)"""
+        i = self.nearest_index(spot)
+        if i is None:
+            return []
+        start = max(0, min(i - count // 2, len(self.strikes) - count))
+        return self.strikes[start:start + count]
+
+    def expiries_in_window(self, min_dte=0, max_dte=45, today=None):
+        """Expiries with min_dte <= days to expiry <= max_dte"""
+        today = today or datetime.now()
+        low = (today + timedelta(days=min_dte)).strftime('%Y%m%d')
+        high = (today + timedelta(days=max_dte)).strftime('%Y%m%d')
+        return self.expirations[bisect_left(self.expirations, low):bisect_right(self.expirations, high)]
+
+    def nearest_expiry(self, today=None):
+        """First expiry on or after today"""
+        upcoming = self.expiries_in_window(0, 36500, today)
+        return upcoming[0] if upcoming else (self.expirations[0] if self.expirations else None)
+
+    def update_deltas(self, expiry, right, strike_deltas):
+        """Merge cached deltas {strike: delta} for an expiry/right"""
+        key = (expiry, right)
+        deltas = self.deltas.setdefault(key, {})
+        deltas.update({float(k): v for k, v in strike_deltas.items() if v})
+        strikes = sorted(deltas)
+        self._delta_curves[key] = (strikes, [deltas[k] for k in strikes])
+
+    def strike_for_delta(self, expiry, right, target):
+        """
+        Cached strike whose delta is closest to target. Deltas fall as strike rises
+        (calls 1 -> 0, puts 0 -> -1), so the curve is bisected on negated deltas.
+        """
+        curve = self._delta_curves.get((expiry, right))
+        if not curve or not curve[0]:
+            return None
+        strikes, deltas = curve
+        negated = [-d for d in deltas]
+        i = bisect_left(negated, -target)
+        candidates = [j for j in (i - 1, i) if 0 <= j < len(strikes)]
+        best = min(candidates, key=lambda j: abs(deltas[j] - target))
+        return {'strike': strikes[best], 'delta': deltas[best]}
@@ -2,6 +2,8 @@ const { app, BrowserWindow, ipcMain } = require('electron');
 const path = require('path');
 const { spawn } = require('child_process');
 const fs = require('fs');
+const net = require('net');
+const EventEmitter = require('events');
 require('dotenv').config();
 
 let mainWindow;
@@ -14,13 +16,19 @@ let TWS_HOST = process.env.TWS_HOST || '127.0.0.1';
 let TWS_PORT = process.env.TWS_PORT || '4002';
 let TWS_CLIENT_ID = process.env.TWS_CLIENT_ID || '1';
 
+// Optional shared bridge daemon socket (tws_bridge.py --daemon <path>)
+const TWS_BRIDGE_SOCKET = process.env.TWS_BRIDGE_SOCKET || '';
+
+// Watchlist handed to the bridge so it can prefetch at connect time
+let WATCHLIST = [];
+
 function updateEnvFile(host, port, clientId) {
   const envPath = path.join(__dirname, '.env');
   const envContent = `# TWS Connection Settings
 TWS_HOST=${host}
 TWS_PORT=${port}
 TWS_CLIENT_ID=${clientId}
-`;
+${TWS_BRIDGE_SOCKET ? `TWS_BRIDGE_SOCKET=${TWS_BRIDGE_SOCKET}\n` : ''}`;
 
   try {
     fs.writeFileSync(envPath, envContent, 'utf8');
@@ -95,6 +103,20 @@ app.on('activate', function () {
   }
 });
 
+// Attach to a shared bridge daemon instead of spawning a private bridge.
+// Returns an object shaped like the spawned process (stdin/stdout/stderr/kill).
+function connectToDaemon(socketPath) {
+  const socket = net.createConnection(socketPath);
+  const bridge = new EventEmitter();
+  bridge.stdin = socket;
+  bridge.stdout = socket;
+  bridge.stderr = new EventEmitter();
+  bridge.kill = () => socket.end();
+  socket.on('close', () => bridge.emit('close', 0));
+  socket.on('error', (error) => bridge.emit('error', error));
+  return bridge;
+}
+
 // Send command to Python bridge and wait for response
 function sendCommandToBridge(command) {
   return new Promise((resolve, reject) => {
@@ -134,8 +156,12 @@ ipcMain.handle('connect-tws', async (event) => {
     responseHandlers.clear();
     outputBuffer = '';
 
-    const pythonScript = path.join(__dirname, 'tws_bridge.py');
-    pythonProcess = spawn('python3', [pythonScript, TWS_HOST, TWS_PORT, TWS_CLIENT_ID]);
+    if (TWS_BRIDGE_SOCKET) {
+      pythonProcess = connectToDaemon(TWS_BRIDGE_SOCKET);
+    } else {
+      const pythonScript = path.join(__dirname, 'tws_bridge.py');
+      pythonProcess = spawn('python3', [pythonScript, TWS_HOST, TWS_PORT, TWS_CLIENT_ID, WATCHLIST.join(',')]);
+    }
 
     let connectionResolved = false;
 
@@ -154,6 +180,14 @@ ipcMain.handle('connect-tws', async (event) => {
         if (line.trim()) {
           try {
             const response = JSON.parse(line);
+
+            // Forward unsolicited bridge events (e.g. warm-up 'ready') to the renderer
+            if (response.event) {
+              if (mainWindow) {
+                mainWindow.webContents.send('bridge-event', response);
+              }
+              continue;
+            }
             
             // Check if this is the initial connection response
             if (!connectionResolved && response.success !== undefined) {
@@ -244,13 +278,49 @@ ipcMain.handle('place-order', async (event, orderParams) => {
   }
 });
 
+// Handle place combo (multi-leg) order request
+ipcMain.handle('place-combo-order', async (event, comboParams) => {
+  try {
+    const response = await sendCommandToBridge({
+      type: 'place_combo_order',
+      data: comboParams
+    });
+    return response;
+  } catch (error) {
+    return { success: false, message: error.message };
+  }
+});
+
+// Last position table received from the bridge, keyed by conId; refreshed with
+// only the rows that changed since its version
+let positionCache = { epoch: null, version: null, rows: new Map() };
+
+function applyPositionChanges(response) {
+  if (response.full) {
+    positionCache = { epoch: response.epoch, version: response.version, rows: new Map() };
+    response.positions.forEach(row => positionCache.rows.set(row.conId, row));
+    return;
+  }
+  if (!response.unchanged) {
+    // Removals first: a row that left and came back is listed in both
+    response.removed.forEach(conId => positionCache.rows.delete(conId));
+    response.added.concat(response.changed).forEach(row => positionCache.rows.set(row.conId, row));
+  }
+  positionCache.version = response.version;
+}
+
 // Handle get positions request
 ipcMain.handle('get-positions', async () => {
   try {
     const response = await sendCommandToBridge({
-      type: 'get_positions'
+      type: 'get_positions',
+      data: { sinceVersion: positionCache.version, epoch: positionCache.epoch }
     });
-    return response;
+    if (!response.success) {
+      return response;
+    }
+    applyPositionChanges(response);
+    return { success: true, positions: Array.from(positionCache.rows.values()), version: positionCache.version };
   } catch (error) {
     return { success: false, message: error.message, positions: [] };
   }
@@ -293,6 +363,18 @@ ipcMain.handle('get-daily-pnl', async () => {
   }
 });
 
+// Handle get portfolio greeks request
+ipcMain.handle('get-portfolio-greeks', async () => {
+  try {
+    const response = await sendCommandToBridge({
+      type: 'get_portfolio_greeks'
+    });
+    return response;
+  } catch (error) {
+    return { success: false, message: error.message };
+  }
+});
+
 // Handle close all positions request
 ipcMain.handle('close-all-positions', async () => {
   try {
@@ -318,6 +400,19 @@ ipcMain.handle('get-ticker-price', async (event, ticker) => {
   }
 });
 
+// Handle multi-ticker quote request
+ipcMain.handle('get-ticker-prices', async (event, tickers) => {
+  try {
+    const response = await sendCommandToBridge({
+      type: 'get_ticker_prices',
+      data: { tickers }
+    });
+    return response;
+  } catch (error) {
+    return { success: false, message: error.message, prices: {} };
+  }
+});
+
 // Handle validate ticker request
 ipcMain.handle('validate-ticker', async (event, ticker) => {
   try {
@@ -331,12 +426,39 @@ ipcMain.handle('validate-ticker', async (event, ticker) => {
   }
 });
 
+// Handle bulk validate tickers request
+ipcMain.handle('validate-tickers', async (event, tickers) => {
+  try {
+    const response = await sendCommandToBridge({
+      type: 'validate_tickers',
+      data: { tickers }
+    });
+    return response;
+  } catch (error) {
+    return { success: false, message: error.message, results: {} };
+  }
+});
+
+// Handle batch request (several bridge commands in one round trip)
+ipcMain.handle('run-batch', async (event, commands) => {
+  try {
+    const response = await sendCommandToBridge({
+      type: 'batch',
+      data: { commands }
+    });
+    return response;
+  } catch (error) {
+    return { success: false, message: error.message, results: {} };
+  }
+});
+
 // Handle get option chain request
 ipcMain.handle('get-option-chain', async (event, ticker) => {
   try {
     const response = await sendCommandToBridge({
       type: 'get_option_chain',
-      data: { ticker }
+      // A newer chain request for this view supersedes (cancels) a stale one
+      data: { ticker, view: 'option-chain-dialog' }
     });
     return response;
   } catch (error) {
@@ -349,6 +471,7 @@ ipcMain.handle('update-connection-settings', async (event, settings) => {
   TWS_HOST = settings.host || '127.0.0.1';
   TWS_PORT = settings.port || '4002';
   TWS_CLIENT_ID = settings.clientId || '1';
+  WATCHLIST = Array.isArray(settings.watchlist) ? settings.watchlist : [];
 
   const updated = updateEnvFile(TWS_HOST, TWS_PORT, TWS_CLIENT_ID);
 
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Market Calendar Module - Precomputed US equity/options session calendar
+Built once at startup; open/close lookups are dictionary hits instead of
+per-call timezone and weekday arithmetic
+"""
+
+from datetime import date, datetime, time, timedelta
+import pytz
+
+EASTERN = pytz.timezone('US/Eastern')
+
+REGULAR_OPEN = time(9, 30)
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+PRE_MARKET_OPEN = time(4, 0)
+AFTER_HOURS_CLOSE = time(20, 0)
+
+
+def _easter(year):
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th given weekday of a month (n=-1 for the last one)"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year, month + 1, 1) - timedelta(days=1) if month < 12 else date(year, 12, 31)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day):
+    """Weekend holidays move to Friday (Saturday) or Monday (Sunday)"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def exchange_holidays(year):
+    """Full-day NYSE/Cboe holidays for a year"""
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),              # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),              # Presidents' Day
+        _easter(year) - timedelta(days=2),        # Good Friday
+        _nth_weekday(year, 5, 0, -1),             # Memorial Day
+        _observed(date(year, 7, 4)),              # Independence Day
+        _nth_weekday(year, 9, 0, 1),              # Labor Day
+        _nth_weekday(year, 11, 3, 4),             # Thanksgiving
+        _observed(date(year, 12, 25)),            # Christmas
+    }
+    # New Year's Day on a Saturday is not observed on the prior Friday
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays.add(_observed(new_year))
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return holidays
+
+
+def early_closes(year, holidays):
+    """1:00 PM ET early-close days for a year"""
+    candidates = [
+        date(year, 7, 3),                                    # Day before Independence Day
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),    # Day after Thanksgiving
+        date(year, 12, 24),                                  # Christmas Eve
+    ]
+    return {d for d in candidates if d.weekday() < 5 and d not in holidays}
+
+
+class SessionCalendar:
+    """Trading sessions for a range of years, precomputed as UTC datetimes"""
+
+    def __init__(self, years=None):
+        if years is None:
+            this_year = datetime.now(EASTERN).year
+            years = (this_year, this_year + 1)
+
+        self.holidays = set()
+        self.early_closes = set()
+        self.sessions = {}  # date -> dict of UTC open/close/extended bounds
+        for year in years:
+            holidays = exchange_holidays(year)
+            closes = early_closes(year, holidays)
+            self.holidays |= holidays
+            self.early_closes |= closes
+
+            day = date(year, 1, 1)
+            while day.year == year:
+                if day.weekday() < 5 and day not in holidays:
+                    close = EARLY_CLOSE if day in closes else REGULAR_CLOSE
+                    self.sessions[day] = {
+                        'preOpen': self._utc(day, PRE_MARKET_OPEN),
+                        'open': self._utc(day, REGULAR_OPEN),
+                        'close': self._utc(day, close),
+                        'postClose': self._utc(day, AFTER_HOURS_CLOSE),
+                        'earlyClose': day in closes,
+                    }
+                day += timedelta(days=1)
+
+        # For every calendar day, the first session on or after it (O(1) next-open/close)
+        self._next_session = {}
+        upcoming = None
+        first, last = min(self.sessions), max(self.sessions)
+        day = last
+        while day >= first:
+            if day in self.sessions:
+                upcoming = day
+            self._next_session[day] = upcoming
+            day -= timedelta(days=1)
+
+    @staticmethod
+    def _utc(day, at):
+        return EASTERN.localize(datetime.combine(day, at)).astimezone(pytz.utc)
+
+    @staticmethod
+    def _now(now):
+        if now is None:
+            return datetime.now(pytz.utc)
+        if now.tzinfo is None:
+            return EASTERN.localize(now).astimezone(pytz.utc)
+        return now.astimezone(pytz.utc)
+
+    def session(self, day):
+        """Session bounds for a date, or None on weekends/holidays"""
+        return self.sessions.get(day)
+
+    def is_open(self, now=None, extended=False):
+        """True during the regular (or extended-hours) session"""
+        now = self._now(now)
+        session = self.sessions.get(now.astimezone(EASTERN).date())
+        if session is None:
+            return False
+        if extended:
+            return session['preOpen'] <= now < session['postClose']
+        return session['open'] <= now < session['close']
+
+    def _session_at_or_after(self, now):
+        day = now.astimezone(EASTERN).date()
+        next_day = self._next_session.get(day)
+        if next_day is None:
+            return None
+        session = self.sessions[next_day]
+        if session['close'] <= now:
+            following = self._next_session.get(next_day + timedelta(days=1))
+            return self.sessions[following] if following else None
+        return session
+
+    def next_open(self, now=None):
+        """Next regular-session open strictly after now (UTC), or None past the calendar"""
+        now = self._now(now)
+        next_day = self._next_session.get(now.astimezone(EASTERN).date())
+        if next_day is not None and self.sessions[next_day]['open'] <= now:
+            next_day = self._next_session.get(next_day + timedelta(days=1))
+        return self.sessions[next_day]['open'] if next_day else None
+
+    def next_close(self, now=None):
+        """Close of the current session, or of the next one if the market is shut"""
+        session = self._session_at_or_after(self._now(now))
+        return session['close'] if session else None
+
+    def status(self, now=None):
+        """(is_open, message) for the order gate"""
+        now = self._now(now)
+        if self.is_open(now):
+            return True, "Market is open"
+
+        local_now = now.astimezone(EASTERN)
+        current = local_now.strftime('%I:%M %p ET')
+        day = local_now.date()
+        if day in self.holidays:
+            reason = "holiday"
+        elif local_now.weekday() > 4:
+            reason = "weekend"
+        elif day in self.sessions and now >= self.sessions[day]['close']:
+            closed_at = self.sessions[day]['close'].astimezone(EASTERN).strftime('%I:%M %p ET')
+            reason = f"closed at {closed_at}, currently {current}"
+        else:
+            reason = f"currently {current}"
+
+        next_open = self.next_open(now)
+        if next_open is not None:
+            opens = next_open.astimezone(EASTERN).strftime('%a %b %d %I:%M %p ET')
+            return False, f"Market is closed ({reason}; opens {opens})"
+        return False, f"Market is closed ({reason})"
@@ -8,12 +8,14 @@ import sys
 import time
 import threading
 import math
-from datetime import datetime
 from ibapi.client import EClient
 from ibapi.wrapper import EWrapper
 from ibapi.contract import Contract, ContractDetails
 from ibapi.common import TickerId
 
+from chain_index import ChainIndex
+from profiling import span
+
 
 class OptionChainApp(EWrapper, EClient):
     """IBAPI application for fetching option chain data"""
@@ -117,11 +119,28 @@ class OptionChainApp(EWrapper, EClient):
             self.option_data[reqId]['theta'] = theta
 
 
-def get_option_chain_ibapi(ticker, host, port, client_id):
+def get_option_chain_ibapi(ticker, host, port, client_id, cancel_event=None):
     """
     Fetch option chain for ticker using IBAPI
+    cancel_event (threading.Event) aborts the fetch at its next wait and releases its lines
     Returns: dict with success, message, optionChain, currentPrice
     """
+    def cancelled(app, wait, req_ids=()):
+        """Wait `wait` seconds; if cancelled meanwhile, cancel market data and disconnect"""
+        if cancel_event is None:
+            time.sleep(wait)
+            return False
+        if not cancel_event.wait(wait):
+            return False
+        print(f"[IBAPI] Option chain request for {ticker} cancelled", file=sys.stderr)
+        for req_id in req_ids:
+            app.cancelMktData(req_id)
+        app.disconnect()
+        return True
+
+    cancelled_result = {"success": False, "cancelled": True,
+                        "message": f"Option chain request for {ticker} cancelled", "optionChain": []}
+
     try:
         print(f"[IBAPI] Fetching option chain for {ticker}...", file=sys.stderr)
         
@@ -134,7 +153,9 @@ def get_option_chain_ibapi(ticker, host, port, client_id):
         api_thread.start()
         
         # Wait for connection
-        time.sleep(1)
+        with span('connect', 'option_chain', ticker=ticker):
+            if cancelled(app, 1):
+                return cancelled_result
         
         # Create stock contract
         stock_contract = Contract()
@@ -144,8 +165,10 @@ def get_option_chain_ibapi(ticker, host, port, client_id):
         stock_contract.currency = "USD"
         
         # Request market data for current price
-        app.reqMktData(1, stock_contract, "", False, False, [])
-        time.sleep(2)  # Wait for price data
+        with span('underlying_price', 'option_chain', ticker=ticker):
+            app.reqMktData(1, stock_contract, "", False, False, [])
+            if cancelled(app, 2, [1]):  # Wait for price data
+                return cancelled_result
         
         # Get current price
         current_price = None
@@ -165,7 +188,9 @@ def get_option_chain_ibapi(ticker, host, port, client_id):
         app.reqContractDetails(99, stock_contract)
         
         # Wait for contract details
-        if not app.data_ready.wait(10):
+        with span('contract_details', 'option_chain', ticker=ticker):
+            details_ready = app.data_ready.wait(10)
+        if not details_ready:
             app.disconnect()
             return {"success": False, "message": "Timeout getting contract details", "optionChain": []}
         
@@ -184,13 +209,19 @@ def get_option_chain_ibapi(ticker, host, port, client_id):
         app.reqSecDefOptParams(100, ticker, "", "STK", stock_con_id)
         
         # Wait for option parameters
-        if not app.data_ready.wait(10):
+        with span('option_params', 'option_chain', ticker=ticker):
+            params_ready = app.data_ready.wait(10)
+        if not params_ready:
             app.disconnect()
             return {"success": False, "message": "Timeout getting option parameters", "optionChain": []}
         
         if not app.option_params:
             app.disconnect()
             return {"success": False, "message": f"{ticker} does not support options", "optionChain": []}
+
+        # Superseded while resolving the chain: don't open its option lines
+        if cancelled(app, 0, [1]):
+            return cancelled_result
         
         # Get the primary option parameters (usually first one matches ticker trading class)
         primary_params = None
@@ -209,33 +240,14 @@ def get_option_chain_ibapi(ticker, host, port, client_id):
             app.disconnect()
             return {"success": False, "message": "No expirations found", "optionChain": []}
         
-        # Find nearest expiry
-        today = datetime.now().strftime('%Y%m%d')
-        nearest_expiry = None
-        for exp in expirations:
-            if exp >= today:
-                nearest_expiry = exp
-                break
-        
-        if not nearest_expiry:
-            nearest_expiry = expirations[0]
+        # Sorted strike/expiry index (bisect lookups instead of linear scans)
+        index = ChainIndex(all_strikes, expirations)
+        nearest_expiry = index.nearest_expiry()
         
         print(f"[IBAPI] Using expiry: {nearest_expiry}", file=sys.stderr)
         
         # Filter strikes centered around current price (6 ITM, 6 OTM)
-        strikes_list = sorted(all_strikes)
-        closest_idx = min(range(len(strikes_list)), key=lambda i: abs(strikes_list[i] - current_price))
-        
-        start_idx = max(0, closest_idx - 6)
-        end_idx = min(len(strikes_list), closest_idx + 6)
-        
-        if end_idx - start_idx < 12:
-            if start_idx == 0:
-                end_idx = min(len(strikes_list), start_idx + 12)
-            elif end_idx == len(strikes_list):
-                start_idx = max(0, end_idx - 12)
-        
-        selected_strikes = strikes_list[start_idx:end_idx]
+        selected_strikes = index.strikes_around(current_price, 12)
         selected_strikes = sorted(selected_strikes, reverse=True)  # Descending order
         
         print(f"[IBAPI] Selected {len(selected_strikes)} strikes: {selected_strikes}", file=sys.stderr)
@@ -277,7 +289,9 @@ def get_option_chain_ibapi(ticker, host, port, client_id):
             req_id += 2
         
         # Wait for data to populate
-        time.sleep(3)
+        with span('option_quotes', 'option_chain', ticker=ticker, lines=req_id - 2000):
+            if cancelled(app, 3, [1] + list(range(2000, req_id))):
+                return cancelled_result
         
         # Build option chain data
         req_id = 2000
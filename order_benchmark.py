@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Order Benchmark - End-to-end latency of the bridge's order paths on the simulated broker
+Each round trip opens a position with place_order (with or without an SL/TP
+bracket) and closes it with close_position, through the same command handler as
+stdin. Latency is measured in wall time and in the simulator's virtual time
+(what a user would wait at --speed 1); the run fails when the virtual p95
+crosses --max-p95-ms, which is deterministic for a given seed.
+
+Usage: python3 order_benchmark.py [--orders 50] [--fill-latency 0.2] [--max-fill-size 1]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import tws_bridge
+from sim_broker import SimulatedIB
+from soak_harness import ByteCounter
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+def summarize(samples):
+    return {key: round(percentile(samples, fraction), 1)
+            for key, fraction in (('p50', 0.5), ('p95', 0.95), ('max', 1.0))}
+
+
+def timed_command(sim, command):
+    """Run one command through the bridge; returns (result, wall ms, virtual ms)"""
+    started, virtual_start = time.perf_counter(), sim.clock
+    result = tws_bridge.handle_command(command)
+    return (result, (time.perf_counter() - started) * 1000,
+            (sim.clock - virtual_start).total_seconds() * 1000)
+
+
+def run(args):
+    sim = SimulatedIB(seed=args.seed, speed=args.speed, ack_latency=args.ack_latency,
+                      fill_latency=args.fill_latency, latency_jitter=args.latency_jitter,
+                      max_fill_size=args.max_fill_size, reject_rate=args.reject_rate)
+    sim.connect()
+    tws_bridge.ib = sim
+    tws_bridge.sim_settings = {}
+    tws_bridge.JOURNAL_PATH = os.path.join(tempfile.mkdtemp(prefix='tt-bench-'), 'order_journal.db')
+    tws_bridge.connection_state.update(state='connected', since=time.time(), started=True)
+
+    log_sink = ByteCounter()
+    real_stderr, sys.stderr = sys.stderr, log_sink
+    tws_bridge.response_sink = log_sink.send
+    timings = {'place_order': {'wall': [], 'virtual': []}, 'close_position': {'wall': [], 'virtual': []}}
+    failures = {'place_order': 0, 'close_position': 0}
+    expiry = sim.expirations()[1]
+    strikes = sim.strikes(args.symbol)
+    try:
+        tws_bridge.start_order_journal()
+        for seq in range(args.orders):
+            data = {'action': 'BUY', 'ticker': args.symbol, 'quantity': args.quantity, 'expiry': expiry,
+                    'strike': strikes[len(strikes) // 2], 'optionType': 'C'}
+            if args.brackets:
+                data.update(stopLoss='50', takeProfit='100')
+            result, wall, virtual = timed_command(sim, {'type': 'place_order', 'requestId': seq, 'data': data})
+            if not result or not result.get('success'):
+                failures['place_order'] += 1
+                continue
+            timings['place_order']['wall'].append(wall)
+            timings['place_order']['virtual'].append(virtual)
+
+            for trade in sim.openTrades():
+                sim.cancelOrder(trade.order)
+            position = next(pos for pos in sim.positions() if pos.contract.strike == data['strike'])
+            symbol = (f"{args.symbol} {expiry} {position.contract.strike}{position.contract.right}")
+            result, wall, virtual = timed_command(sim, {'type': 'close_position', 'requestId': seq,
+                                                        'data': {'symbol': symbol, 'position': position.position}})
+            if not result or not result.get('success'):
+                failures['close_position'] += 1
+                continue
+            timings['close_position']['wall'].append(wall)
+            timings['close_position']['virtual'].append(virtual)
+    finally:
+        sys.stderr = real_stderr
+        tws_bridge.response_sink = None
+        tws_bridge.sim_settings = None
+
+    report = {name: {'wallMs': summarize(times['wall']), 'virtualMs': summarize(times['virtual']),
+                     'count': len(times['wall']), 'failed': failures[name]}
+              for name, times in timings.items()}
+    slow = [name for name, row in report.items() if row['virtualMs']['p95'] > args.max_p95_ms]
+    report['passed'] = not slow
+    print(json.dumps(report))
+    return 0 if not slow else 1
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end order latency of tws_bridge against a simulated TWS")
+    parser.add_argument('--orders', type=int, default=50, help="open/close round trips")
+    parser.add_argument('--symbol', default='SPY')
+    parser.add_argument('--quantity', type=int, default=2)
+    parser.add_argument('--brackets', action='store_true', help="attach SL/TP orders to every entry")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--speed', type=float, default=1.0, help="virtual seconds per wall second")
+    parser.add_argument('--ack-latency', type=float, default=0.02, help="virtual seconds to acknowledge")
+    parser.add_argument('--fill-latency', type=float, default=0.1, help="virtual seconds to each execution")
+    parser.add_argument('--latency-jitter', type=float, default=0.5, help="+/- fraction on every latency")
+    parser.add_argument('--max-fill-size', type=int, help="split executions into partial fills of this size")
+    parser.add_argument('--reject-rate', type=float, default=0.0)
+    parser.add_argument('--max-p95-ms', type=float, default=5000.0, help="fail above this virtual-time p95")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
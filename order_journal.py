@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Order Journal Module - Append-only order/fill journal in WAL-mode SQLite
+Every order intent, submission, status change and fill is appended as one
+row, so a restarted bridge can replay its orders (OCA groups, bracket links,
+fill prices) and reconcile them against TWS in a single pass
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+# Statuses after which an order can no longer change
+TERMINAL_STATUSES = {'Filled', 'Cancelled', 'ApiCancelled', 'Inactive'}
+
+
+class OrderJournal:
+    """Append-only event log keyed by orderRef"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                kind TEXT NOT NULL,
+                order_ref TEXT NOT NULL,
+                order_id INTEGER,
+                perm_id INTEGER,
+                payload TEXT NOT NULL
+            )''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS events_ref ON events (order_ref)')
+        self.exec_ids = {row[0] for row in self.conn.execute(
+            "SELECT json_extract(payload, '$.execId') FROM events WHERE kind = 'fill'")}
+
+    def record(self, kind, order_ref, order_id=None, perm_id=None, **payload):
+        """Append one event (intent / submitted / status / fill / bracket)"""
+        if kind == 'fill':
+            if payload.get('execId') in self.exec_ids:
+                return False
+            self.exec_ids.add(payload.get('execId'))
+        self.conn.execute(
+            'INSERT INTO events (ts, kind, order_ref, order_id, perm_id, payload) VALUES (?, ?, ?, ?, ?, ?)',
+            (time.time(), kind, order_ref, order_id, perm_id, json.dumps(payload)))
+        return True
+
+    def replay(self):
+        """Fold the journal into the latest state per orderRef"""
+        orders = {}
+        for kind, order_ref, order_id, perm_id, payload in self.conn.execute(
+                'SELECT kind, order_ref, order_id, perm_id, payload FROM events ORDER BY seq'):
+            data = json.loads(payload)
+            order = orders.setdefault(order_ref, {'orderRef': order_ref, 'status': 'Intent', 'fills': []})
+            if order_id:
+                order['orderId'] = order_id
+            if perm_id:
+                order['permId'] = perm_id
+            if kind == 'fill':
+                order['fills'].append(data)
+            elif kind == 'status':
+                order['status'] = data.get('status', order['status'])
+                order.update({k: v for k, v in data.items() if k != 'status'})
+            else:
+                if kind == 'submitted' and order['status'] == 'Intent':
+                    order['status'] = 'Submitted'
+                order.update(data)
+        return orders
+
+    def reconcile(self, open_trades, fills):
+        """
+        One pass over TWS state: journal fills TWS reports that we missed, and
+        classify journaled orders against the open trades
+        """
+        for fill in fills:
+            order_ref = fill.execution.orderRef
+            if order_ref:
+                self.record('fill', order_ref, fill.execution.orderId, fill.execution.permId,
+                            execId=fill.execution.execId, shares=fill.execution.shares,
+                            price=fill.execution.price, time=str(fill.execution.time))
+
+        open_refs = {trade.order.orderRef: trade for trade in open_trades if trade.order.orderRef}
+        orders = self.replay()
+        summary = {'open': [], 'filled': [], 'closed': [], 'missing': [], 'untracked': []}
+        for order_ref, order in orders.items():
+            if order_ref in open_refs:
+                trade = open_refs[order_ref]
+                if trade.orderStatus.status != order['status']:
+                    self.record('status', order_ref, trade.order.orderId, trade.order.permId,
+                                status=trade.orderStatus.status)
+                summary['open'].append(order_ref)
+            elif order['status'] == 'Filled' or sum(f['shares'] for f in order['fills']) >= order.get('quantity', float('inf')):
+                summary['filled'].append(order_ref)
+            elif order['status'] in TERMINAL_STATUSES:
+                summary['closed'].append(order_ref)
+            else:
+                # Journal says live, TWS has no open order and no complete fill
+                summary['missing'].append(order_ref)
+        summary['untracked'] = [ref for ref in open_refs if ref not in orders]
+        return summary
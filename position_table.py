@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Position Table Module - Versioned position rows for incremental get_positions
+Rows are keyed by conId and updated from portfolio events as they arrive. Every
+change bumps one monotonically increasing version and stamps the row with it,
+so a client that sends its last-seen version gets back only the rows added,
+changed or removed since then ("unchanged" when there are none). The epoch
+changes with every bridge start, so versions from a previous run are never
+mistaken for current ones
+"""
+
+import time
+from collections import deque
+
+MAX_TOMBSTONES = 1000
+
+
+class PositionTable:
+    """Current position rows plus enough history to answer 'what changed since version N'"""
+
+    def __init__(self, max_tombstones=MAX_TOMBSTONES):
+        self.epoch = int(time.time() * 1000)
+        self.version = 0
+        self.loaded = False
+        self.rows = {}                              # conId -> row
+        self._created = {}                          # conId -> version the row appeared at
+        self._changed = {}                          # conId -> version of its last change
+        self._removed = deque(maxlen=max_tombstones)  # (version, conId, created version)
+        self._horizon = 0                           # oldest version deltas can be computed from
+
+    def update(self, con_id, row):
+        """Insert or replace one row; returns True if anything changed"""
+        if self.rows.get(con_id) == row:
+            return False
+        self.version += 1
+        if con_id not in self.rows:
+            self._created[con_id] = self.version
+        self.rows[con_id] = row
+        self._changed[con_id] = self.version
+        return True
+
+    def remove(self, con_id):
+        if con_id not in self.rows:
+            return False
+        self.version += 1
+        if len(self._removed) == self._removed.maxlen:
+            self._horizon = self._removed[0][0]
+        self._removed.append((self.version, con_id, self._created.pop(con_id)))
+        del self.rows[con_id]
+        del self._changed[con_id]
+        return True
+
+    def replace(self, rows):
+        """Make the table match a full {conId: row} listing (only the differences bump the version)"""
+        for con_id in [con_id for con_id in self.rows if con_id not in rows]:
+            self.remove(con_id)
+        for con_id, row in rows.items():
+            self.update(con_id, row)
+        self.loaded = True
+
+    def snapshot(self):
+        return {"epoch": self.epoch, "version": self.version, "full": True, "positions": list(self.rows.values())}
+
+    def changes_since(self, version=None, epoch=None):
+        """Delta since a client's version, or a full snapshot when the delta cannot be computed"""
+        if version is None or epoch != self.epoch or not self._horizon <= version <= self.version:
+            return self.snapshot()
+        if version == self.version:
+            return {"epoch": self.epoch, "version": self.version, "unchanged": True}
+        added, changed = [], []
+        for con_id, changed_at in self._changed.items():
+            if changed_at > version:
+                (added if self._created[con_id] > version else changed).append(self.rows[con_id])
+        # Rows that came and went after `version` were never seen by the client
+        removed = [con_id for removed_at, con_id, created in self._removed
+                   if removed_at > version and created <= version]
+        return {"epoch": self.epoch, "version": self.version, "added": added, "changed": changed,
+                "removed": removed}
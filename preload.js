@@ -12,14 +12,20 @@ contextBridge.exposeInMainWorld(
 
     // Trading methods
     placeOrder: (orderParams) => ipcRenderer.invoke('place-order', orderParams),
+    placeComboOrder: (comboParams) => ipcRenderer.invoke('place-combo-order', comboParams),
     getPositions: () => ipcRenderer.invoke('get-positions'),
     getBalance: () => ipcRenderer.invoke('get-balance'),
     getDailyPnL: () => ipcRenderer.invoke('get-daily-pnl'),
+    runBatch: (commands) => ipcRenderer.invoke('run-batch', commands),
+    getPortfolioGreeks: () => ipcRenderer.invoke('get-portfolio-greeks'),
     closePosition: (positionParams) => ipcRenderer.invoke('close-position', positionParams),
     closeAllPositions: () => ipcRenderer.invoke('close-all-positions'),
     getTickerPrice: (ticker) => ipcRenderer.invoke('get-ticker-price', ticker),
+    getTickerPrices: (tickers) => ipcRenderer.invoke('get-ticker-prices', tickers),
     validateTicker: (ticker) => ipcRenderer.invoke('validate-ticker', ticker),
+    validateTickers: (tickers) => ipcRenderer.invoke('validate-tickers', tickers),
     getOptionChain: (ticker) => ipcRenderer.invoke('get-option-chain', ticker),
+    onBridgeEvent: (callback) => ipcRenderer.on('bridge-event', (event, message) => callback(message)),
 
     // Window management methods
     getWindowBounds: () => ipcRenderer.invoke('get-window-bounds'),
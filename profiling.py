@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Profiling Module - On-demand profiling and tracing of the running bridge
+A profile session runs for a bounded window, either with cProfile (pstats file)
+or with a sampling thread that walks the bridge thread's stack (collapsed-stack
+file for flame graphs). Tracing spans cost one flag check while off; when on
+they are kept in a ring buffer and exported in Chrome trace format
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+MAX_PROFILE_SECONDS = 300
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval from a background thread"""
+
+    def __init__(self, thread_id, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def enable(self):
+        self._thread.start()
+
+    def disable(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump_stats(self, path):
+        """Collapsed stacks ('frame;frame;frame count'), as read by flamegraph.pl / speedscope"""
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfileSession:
+    """One bounded profiling window of the thread that starts it"""
+
+    def __init__(self, directory, mode='cprofile', seconds=30, interval=DEFAULT_SAMPLE_INTERVAL):
+        if mode not in ('cprofile', 'sample'):
+            raise ValueError(f"Unknown profile mode: {mode}")
+        os.makedirs(directory, exist_ok=True)
+        self.mode = mode
+        self.seconds = min(float(seconds), MAX_PROFILE_SECONDS)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.path = os.path.join(directory, f"profile-{stamp}.{'pstats' if mode == 'cprofile' else 'folded'}")
+        if mode == 'cprofile':
+            self.profiler = cProfile.Profile()
+        else:
+            self.profiler = SamplingProfiler(threading.get_ident(), interval)
+        self.started = time.time()
+        self.profiler.enable()
+
+    def expired(self):
+        return time.time() - self.started >= self.seconds
+
+    def stop(self):
+        """Stop profiling and write the output file"""
+        self.profiler.disable()
+        self.profiler.dump_stats(self.path)
+        result = {"mode": self.mode, "path": self.path, "seconds": round(time.time() - self.started, 2)}
+        if self.mode == 'sample':
+            result['samples'] = sum(self.profiler.stacks.values())
+        return result
+
+
+# Tracing spans (Chrome trace 'complete' events)
+tracing = {'enabled': False, 'events': deque(maxlen=100000)}
+
+
+def start_tracing(max_events=100000):
+    tracing['events'] = deque(maxlen=int(max_events))
+    tracing['enabled'] = True
+
+
+def stop_tracing(path):
+    """Turn tracing off and write the buffered spans as a Chrome trace JSON file"""
+    tracing['enabled'] = False
+    events = list(tracing['events'])
+    tracing['events'].clear()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
+
+
+@contextmanager
+def span(name, category='bridge', **args):
+    """Record the enclosed block as one trace event while tracing is on"""
+    if not tracing['enabled']:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        tracing['events'].append({
+            "name": name, "cat": category, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+            "ts": round(start * 1e6, 1), "dur": round((time.perf_counter() - start) * 1e6, 1),
+            "args": args,
+        })
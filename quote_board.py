@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Quote Board Module - Latest quote, greeks and position per conId in shared memory
+A fixed-layout memory-mapped file: a 64-byte header followed by fixed-size slots.
+Each slot is guarded by a seqlock counter (odd while the bridge is writing it),
+so local readers poll thousands of instruments with plain memory reads and no
+round trips to the bridge
+
+Header: magic 'TTQB', layout version, capacity, slot size, slots in use (all uint32)
+Slot:   see SLOT_DTYPE (little-endian, packed)
+"""
+
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b'TTQB'
+LAYOUT_VERSION = 1
+HEADER = struct.Struct('<4sIIII')
+HEADER_SIZE = 64
+
+SLOT_DTYPE = np.dtype([
+    ('seq', '<u8'),            # seqlock: odd while being written
+    ('conId', '<i8'),
+    ('symbol', 'S24'),         # localSymbol (or symbol), ASCII
+    ('updated', '<f8'),        # epoch seconds of the last write
+    ('bid', '<f8'),
+    ('ask', '<f8'),
+    ('last', '<f8'),
+    ('mark', '<f8'),           # ib_insync marketPrice()
+    ('bidSize', '<f8'),
+    ('askSize', '<f8'),
+    ('iv', '<f8'),
+    ('delta', '<f8'),
+    ('gamma', '<f8'),
+    ('theta', '<f8'),
+    ('vega', '<f8'),
+    ('undPrice', '<f8'),
+    ('position', '<f8'),
+    ('avgCost', '<f8'),
+    ('marketValue', '<f8'),
+    ('unrealizedPNL', '<f8'),
+])
+QUOTE_FIELDS = ('bid', 'ask', 'last', 'mark', 'bidSize', 'askSize')
+GREEK_FIELDS = ('iv', 'delta', 'gamma', 'theta', 'vega', 'undPrice')
+POSITION_FIELDS = ('position', 'avgCost', 'marketValue', 'unrealizedPNL')
+
+DEFAULT_PATH = '/dev/shm/turbo-trader-quotes' if os.path.isdir('/dev/shm') else None
+
+
+def _map(path, size=None):
+    """Writable map of `size` bytes (file created or resized), or a read-only map of an existing file"""
+    if size is None:
+        with open(path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    with open(path, 'a+b') as f:
+        f.truncate(size)
+        return mmap.mmap(f.fileno(), size, access=mmap.ACCESS_WRITE)
+
+
+class QuoteBoard:
+    """Single writer (the bridge); slots are assigned to conIds on first write and never move"""
+
+    def __init__(self, path, capacity=4096):
+        self.path = path
+        self.capacity = capacity
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._mm = _map(path, HEADER_SIZE + capacity * SLOT_DTYPE.itemsize)
+        self._mm[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        self.slots = np.ndarray(capacity, dtype=SLOT_DTYPE, buffer=self._mm, offset=HEADER_SIZE)
+        self.slots[:] = np.zeros(1, dtype=SLOT_DTYPE)
+        for name in QUOTE_FIELDS + GREEK_FIELDS + POSITION_FIELDS:
+            self.slots[name] = np.nan
+        self.index = {}  # conId -> slot
+        self._write_header()
+
+    def _write_header(self):
+        self._mm[:HEADER.size] = HEADER.pack(MAGIC, LAYOUT_VERSION, self.capacity, SLOT_DTYPE.itemsize,
+                                             len(self.index))
+
+    def _slot(self, con_id, symbol):
+        slot = self.index.get(con_id)
+        if slot is None:
+            if len(self.index) >= self.capacity:
+                return None
+            slot = self.index[con_id] = len(self.index)
+            self.slots['conId'][slot] = con_id
+            self.slots['symbol'][slot] = symbol.encode('ascii', 'replace')[:24]
+            self._write_header()
+        return slot
+
+    def write(self, con_id, symbol, values):
+        """Seqlock write of some fields of one instrument's slot"""
+        if not con_id:
+            return False
+        slot = self._slot(con_id, symbol)
+        if slot is None:
+            return False
+        record = self.slots[slot:slot + 1]
+        record['seq'] += 1
+        for name, value in values.items():
+            record[name] = np.nan if value is None else value
+        record['updated'] = time.time()
+        record['seq'] += 1
+        return True
+
+    def update_ticker(self, ticker):
+        """Quote (and model greeks, for options) from an ib_insync Ticker"""
+        contract = ticker.contract
+        values = {'bid': ticker.bid, 'ask': ticker.ask, 'last': ticker.last, 'mark': ticker.marketPrice(),
+                  'bidSize': ticker.bidSize, 'askSize': ticker.askSize}
+        greeks = ticker.modelGreeks
+        if greeks is not None:
+            values.update(iv=greeks.impliedVol, delta=greeks.delta, gamma=greeks.gamma,
+                          theta=greeks.theta, vega=greeks.vega, undPrice=greeks.undPrice)
+        return self.write(contract.conId, contract.localSymbol or contract.symbol, values)
+
+    def update_position(self, item):
+        """Position values from an ib_insync PortfolioItem"""
+        contract = item.contract
+        return self.write(contract.conId, contract.localSymbol or contract.symbol,
+                          {'position': item.position, 'avgCost': item.averageCost,
+                           'marketValue': item.marketValue, 'unrealizedPNL': item.unrealizedPNL})
+
+    def close(self):
+        del self.slots
+        self._mm.close()
+
+
+class QuoteBoardReader:
+    """Lock-free reader for a board written by another process"""
+
+    def __init__(self, path):
+        self._mm = _map(path)
+        magic, version, capacity, slot_size, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION or slot_size != SLOT_DTYPE.itemsize:
+            raise ValueError(f"{path} is not a version {LAYOUT_VERSION} quote board")
+        self.slots = np.ndarray(capacity, dtype=SLOT_DTYPE, buffer=self._mm, offset=HEADER_SIZE)
+        self.index = {}
+        self._known = 0
+
+    def refresh_index(self):
+        """Pick up slots the writer has assigned since the last call"""
+        in_use = HEADER.unpack_from(self._mm, 0)[4]
+        for slot in range(self._known, in_use):
+            self.index[int(self.slots['conId'][slot])] = slot
+        self._known = in_use
+        return in_use
+
+    def read(self, con_id, retries=100):
+        """Consistent copy of one slot as a dict, or None if the conId is not on the board"""
+        slot = self.index.get(con_id)
+        if slot is None:
+            self.refresh_index()
+            slot = self.index.get(con_id)
+            if slot is None:
+                return None
+        record = self.slots[slot:slot + 1]
+        for _ in range(retries):
+            before = int(record['seq'][0])
+            if before % 2:
+                continue
+            copy = record.copy()
+            if int(record['seq'][0]) == before:
+                row = {name: copy[name][0].item() for name in SLOT_DTYPE.names}
+                row['symbol'] = row['symbol'].decode('ascii', 'replace')
+                return row
+        return None
+
+    def snapshot(self, retries=100):
+        """Consistent copy of every slot in use (torn slots are re-read)"""
+        in_use = self.refresh_index()
+        rows = self.slots[:in_use]
+        before = rows['seq'].copy()
+        copy = rows.copy()
+        torn = np.nonzero((before % 2 == 1) | (rows['seq'] != before))[0]
+        for slot in torn:
+            for _ in range(retries):
+                seq = int(rows['seq'][slot])
+                if seq % 2:
+                    continue
+                copy[slot] = rows[slot]
+                if int(rows['seq'][slot]) == seq:
+                    break
+        return copy
+
+    def close(self):
+        del self.slots
+        self._mm.close()
@@ -196,6 +196,11 @@ async function initializeSettings() {
     window.api.onWindowBoundsChanged((bounds) => {
         saveWindowBounds(bounds);
     });
+
+    // Listen for unsolicited bridge events
+    window.api.onBridgeEvent((message) => {
+        handleBridgeEvent(message);
+    });
     
     return settings;
 }
@@ -456,6 +461,11 @@ async function showOptionChain() {
     try {
         const result = await window.api.getOptionChain(ticker);
         
+        // Superseded by a newer chain request; its response will render instead
+        if (result.cancelled) {
+            return;
+        }
+        
         if (result.success && result.optionChain && result.optionChain.length > 0) {
             renderOptionChain(result.optionChain, result.currentPrice);
         } else {
@@ -593,8 +603,7 @@ async function handleConnect() {
 
             tradingSection.style.display = 'block';
 
-            await refreshBalance();
-            await refreshDailyPnL();
+            await refreshAccount();
 
             startAutoRefresh();
         } else {
@@ -740,8 +749,7 @@ async function executeBuyOrder(orderData) {
             showStatus(result.message, 'success');
 
             // Refresh balance and Daily P&L
-            await refreshBalance();
-            await refreshDailyPnL();
+            await refreshAccount();
         } else {
             showStatus(result.message, 'error');
         }
@@ -767,8 +775,7 @@ async function executeCloseAll() {
             showStatus(result.message, 'success');
             
             // Refresh balance and Daily P&L
-            await refreshBalance();
-            await refreshDailyPnL();
+            await refreshAccount();
         } else {
             showStatus(result.message, 'error');
         }
@@ -783,13 +790,7 @@ async function executeCloseAll() {
 // Balance and Daily P&L refresh
 async function refreshBalance() {
     try {
-        const result = await window.api.getBalance();
-        
-        if (result.success) {
-            portfolioBalance.textContent = `Balance: $${formatNumber(result.balance)}`;
-        } else {
-            console.error('Failed to fetch balance:', result.message);
-        }
+        renderBalance(await window.api.getBalance());
     } catch (error) {
         console.error('Error fetching balance:', error);
     }
@@ -797,29 +798,59 @@ async function refreshBalance() {
 
 async function refreshDailyPnL() {
     try {
-        const result = await window.api.getDailyPnL();
-        
-        if (result.success) {
-            const pnl = result.dailyPnL;
-            const formattedPnL = formatNumber(Math.abs(pnl));
-            const sign = pnl >= 0 ? '+' : '-';
-            
-            dailyPnLElement.textContent = `Daily P&L: ${sign}$${formattedPnL}`;
-            
-            // Remove previous classes
-            dailyPnLElement.classList.remove('positive', 'negative');
-            
-            // Add appropriate class
-            if (pnl >= 0) {
-                dailyPnLElement.classList.add('positive');
-            } else {
-                dailyPnLElement.classList.add('negative');
-            }
+        renderDailyPnL(await window.api.getDailyPnL());
+    } catch (error) {
+        console.error('Error fetching daily P&L:', error);
+    }
+}
+
+// Fetch balance and Daily P&L in a single bridge round trip
+async function refreshAccount() {
+    try {
+        const result = await window.api.runBatch([
+            { id: 'balance', type: 'get_balance' },
+            { id: 'dailyPnL', type: 'get_daily_pnl' }
+        ]);
+        const results = result.results || {};
+
+        if (results.balance && results.dailyPnL) {
+            renderBalance(results.balance);
+            renderDailyPnL(results.dailyPnL);
         } else {
-            console.error('Failed to fetch daily P&L:', result.message);
+            console.error('Failed to refresh account:', result.message);
         }
     } catch (error) {
-        console.error('Error fetching daily P&L:', error);
+        console.error('Error refreshing account:', error);
+    }
+}
+
+function renderBalance(result) {
+    if (result.success) {
+        portfolioBalance.textContent = `Balance: $${formatNumber(result.balance)}`;
+    } else {
+        console.error('Failed to fetch balance:', result.message);
+    }
+}
+
+function renderDailyPnL(result) {
+    if (result.success) {
+        const pnl = result.dailyPnL;
+        const formattedPnL = formatNumber(Math.abs(pnl));
+        const sign = pnl >= 0 ? '+' : '-';
+        
+        dailyPnLElement.textContent = `Daily P&L: ${sign}$${formattedPnL}`;
+        
+        // Remove previous classes
+        dailyPnLElement.classList.remove('positive', 'negative');
+        
+        // Add appropriate class
+        if (pnl >= 0) {
+            dailyPnLElement.classList.add('positive');
+        } else {
+            dailyPnLElement.classList.add('negative');
+        }
+    } else {
+        console.error('Failed to fetch daily P&L:', result.message);
     }
 }
 
@@ -828,8 +859,7 @@ function startAutoRefresh() {
     // Refresh every 5 seconds
     refreshInterval = setInterval(async () => {
         if (isConnected) {
-            await refreshBalance();
-            await refreshDailyPnL();
+            await refreshAccount();
         }
     }, 5000);
 }
@@ -841,6 +871,21 @@ function stopAutoRefresh() {
     }
 }
 
+// Bridge events
+function handleBridgeEvent(message) {
+    if (message.event === 'ready') {
+        console.log('Bridge warm-up complete:', message.timings);
+    } else if (message.event === 'connection_state') {
+        if (message.state === 'connected') {
+            showStatus(`Reconnected to TWS after ${message.outageSeconds}s`, 'success');
+        } else if (message.state === 'reconnecting') {
+            showStatus(`<span class="spinner"></span>TWS connection lost, reconnecting (attempt ${message.attempt})...`, 'connecting');
+        } else {
+            showStatus('TWS connection lost' + (message.retryIn ? `, retrying in ${message.retryIn}s` : ''), 'error');
+        }
+    }
+}
+
 // Helper functions
 function showStatus(message, type) {
     statusMessage.innerHTML = message;
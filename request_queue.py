@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Request Queue Module - Prioritized, cancellable queue of bridge commands
+Orders and closes run ahead of data requests. A 'cancel' command, or a newer
+request for the same view, cancels a queued or running request by setting its
+cancel event; long-running handlers poll the event and release their lines.
+Identical data requests are single-flighted: later copies attach to the one
+already pending and are answered with its result
+"""
+
+import heapq
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+# Lanes, lowest runs first
+LANE_CONTROL = 0
+LANE_ORDER = 1
+LANE_DATA = 2
+LANE_BULK = 3
+
+# Optional per-command 'priority' field
+LANES = {
+    'high': LANE_ORDER,
+    'normal': LANE_DATA,
+    'low': LANE_BULK,
+}
+
+# Bridge controls that act at once, ahead of any queued work
+CONTROL_COMMANDS = {'cancel', 'profile_start', 'profile_stop', 'trace_start', 'trace_stop'}
+ORDER_COMMANDS = {'place_order', 'place_combo_order', 'close_position', 'close_all_positions'}
+BULK_COMMANDS = {'get_option_chain', 'build_vol_surface', 'get_historical_bars', 'validate_tickers',
+                 'get_ticker_prices', 'run_scenario'}
+
+# A new request of these types replaces the caller's pending one for the same view
+SUPERSEDE_COMMANDS = {'get_option_chain'}
+
+# Read-only requests that share one in-flight fetch, and how long (seconds) a
+# successful result keeps answering identical requests afterwards
+COALESCE_TTL = {
+    'get_ticker_price': 0.5,
+    'validate_ticker': 5.0,
+    'get_option_chain': 0.0,
+}
+
+# Arguments that don't change the result (e.g. which dialog asked)
+IGNORED_ARGS = {'view'}
+
+
+def coalesce_key(command):
+    """(command, normalized args) for single-flighting, or None if the command never coalesces"""
+    cmd_type = command.get('type')
+    if cmd_type not in COALESCE_TTL:
+        return None
+    args = {}
+    for name, value in command.get('data', {}).items():
+        if name in IGNORED_ARGS:
+            continue
+        args[name] = value.strip().upper() if isinstance(value, str) else value
+    return cmd_type, json.dumps(args, sort_keys=True)
+
+
+def command_lane(command):
+    """Lane for a command; a client may promote a request but never demote orders"""
+    cmd_type = command.get('type')
+    if cmd_type in CONTROL_COMMANDS:
+        return LANE_CONTROL
+    if cmd_type == 'batch':
+        lane = min((command_lane(sub) for sub in command.get('data', {}).get('commands', [])),
+                   default=LANE_DATA)
+    elif cmd_type in ORDER_COMMANDS:
+        lane = LANE_ORDER
+    elif cmd_type in BULK_COMMANDS:
+        lane = LANE_BULK
+    else:
+        lane = LANE_DATA
+    return min(lane, LANES.get(command.get('priority'), lane))
+
+
+class Request:
+    """One queued or running command"""
+
+    def __init__(self, command, owner, seq):
+        self.command = command
+        self.owner = owner            # daemon client (None for stdin)
+        self.lane = command_lane(command)
+        self.seq = seq
+        self.state = 'queued'         # queued -> running -> done
+        self.cancel_event = threading.Event()
+        self.cancel_reason = None
+        self.found = None             # for 'cancel' commands: whether the target was pending
+        self.key = coalesce_key(command)
+        self.followers = []           # identical requests waiting on this one's result
+        self.result = None            # shared result for a follower (answered without running)
+
+    @property
+    def request_id(self):
+        return self.command.get('requestId')
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def __lt__(self, other):
+        return (self.lane, self.seq) < (other.lane, other.seq)
+
+
+class RequestQueue:
+    """
+    Thread-safe priority queue. put() runs on the reader side so cancels and
+    supersedes take effect even while the main thread is busy with a request.
+    """
+
+    def __init__(self, result_ttl=None):
+        self._lock = threading.Lock()
+        self._heap = []
+        self._seq = itertools.count()
+        self._pending = {}     # (owner, requestId) -> Request, queued or running
+        self._views = {}       # (owner, type, view) -> Requests pending for that view
+        self._ready = deque()  # cancelled or already answered, sent ahead of everything
+        self._flights = {}     # coalesce key -> Request whose result identical requests share
+        self._results = {}     # coalesce key -> (time, result) kept for its TTL
+        self.result_ttl = dict(COALESCE_TTL, **(result_ttl or {}))
+        self.closed = False
+
+    def put(self, command, owner=None):
+        request = Request(command, owner, next(self._seq))
+        cmd_type = command.get('type')
+        with self._lock:
+            if request.request_id is not None:
+                self._pending[(owner, request.request_id)] = request
+            if cmd_type == 'cancel':
+                target = self._pending.get((owner, command.get('data', {}).get('requestId')))
+                request.found = target is not None and self._cancel(target, 'cancelled')
+            elif cmd_type in SUPERSEDE_COMMANDS:
+                view = (owner, cmd_type, command.get('data', {}).get('view', 'default'))
+                pending = self._views.setdefault(view, [])
+                # An identical request for the view keeps running; anything else is stale
+                if not any(stale.key == request.key and not stale.cancelled for stale in pending):
+                    for stale in list(pending):
+                        self._cancel(stale, f"superseded by {request.request_id}")
+                pending.append(request)
+            if cmd_type != 'cancel' and self._share(request):
+                return request
+            self._admit(request)
+        return request
+
+    def _share(self, request):
+        """Answer from a fresh cached result or attach to an identical pending request"""
+        if request.key is None:
+            return False
+        cached = self._results.get(request.key)
+        if cached is not None:
+            if time.monotonic() - cached[0] <= self.result_ttl.get(request.key[0], 0.0):
+                request.result = cached[1]
+                request.state = 'ready'
+                self._ready.append(request)
+                return True
+            del self._results[request.key]
+        leader = self._flights.get(request.key)
+        if leader is None or leader.cancelled:
+            return False
+        request.state = 'attached'
+        leader.followers.append(request)
+        return True
+
+    def _admit(self, request):
+        if request.key is not None:
+            self._flights[request.key] = request
+        request.state = 'queued'
+        heapq.heappush(self._heap, request)
+
+    def _cancel(self, request, reason):
+        if request.state == 'done' or request.cancelled:
+            return False
+        request.cancel_reason = reason
+        request.cancel_event.set()
+        if request.state == 'attached':
+            for flight in self._flights.values():
+                if request in flight.followers:
+                    flight.followers.remove(request)
+        if request.state in ('queued', 'attached'):
+            request.state = 'ready'
+            self._ready.append(request)
+        if self._flights.get(request.key) is request:
+            del self._flights[request.key]
+        # Whoever was waiting on the cancelled request runs on its own instead
+        followers, request.followers = request.followers, []
+        for follower in followers:
+            if not self._share(follower):
+                self._admit(follower)
+        return True
+
+    def cancel(self, owner, request_id, reason='cancelled'):
+        """Cancel a pending request from the main thread (e.g. its client went away)"""
+        with self._lock:
+            target = self._pending.get((owner, request_id))
+            return target is not None and self._cancel(target, reason)
+
+    def cancel_owner(self, owner, reason='client disconnected'):
+        """Cancel everything a daemon client still has pending"""
+        with self._lock:
+            for (request_owner, _), request in list(self._pending.items()):
+                if request_owner is owner:
+                    self._cancel(request, reason)
+
+    def get_nowait(self):
+        """Next request to run: cancelled-while-queued first, then by lane and arrival"""
+        with self._lock:
+            if self._ready:
+                request = self._ready.popleft()
+            else:
+                while self._heap and self._heap[0].state != 'queued':
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    raise queue.Empty
+                request = heapq.heappop(self._heap)
+            request.state = 'running'
+            return request
+
+    def finish(self, request, result=None):
+        """Mark a request answered; its followers are queued to get the same result"""
+        with self._lock:
+            request.state = 'done'
+            key = (request.owner, request.request_id)
+            if self._pending.get(key) is request:
+                del self._pending[key]
+            for view, pending in list(self._views.items()):
+                if request in pending:
+                    pending.remove(request)
+                if not pending:
+                    del self._views[view]
+            if self._flights.get(request.key) is request:
+                del self._flights[request.key]
+                if result is not None and result.get('success') and self.result_ttl.get(request.key[0]):
+                    now = time.monotonic()
+                    self._results = {key: cached for key, cached in self._results.items()
+                                     if now - cached[0] <= self.result_ttl.get(key[0], 0.0)}
+                    self._results[request.key] = (now, result)
+            for follower in request.followers:
+                if result is None:
+                    self._admit(follower)
+                    continue
+                follower.result = result
+                follower.state = 'ready'
+                self._ready.append(follower)
+            request.followers = []
+
+    def close(self):
+        self.closed = True
+
+    def __len__(self):
+        with self._lock:
+            return sum(1 for request in self._heap if request.state == 'queued') + len(self._ready)
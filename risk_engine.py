@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Risk Engine Module - Incremental portfolio greeks
+Keeps each leg's position-weighted delta/gamma/theta/vega and running totals
+per underlying and for the account; a tick or fill on one leg swaps only that
+leg's contribution, so totals are never recomputed from scratch
+"""
+
+import math
+
+GREEKS = ('delta', 'gamma', 'theta', 'vega')
+
+
+class RiskEngine:
+    """Net greeks per underlying and account-wide, maintained leg by leg"""
+
+    def __init__(self):
+        self.legs = {}         # conId -> leg dict (per-unit greeks, position, multiplier)
+        self.underlyings = {}  # symbol -> {greek: total}
+        self.totals = dict.fromkeys(GREEKS, 0.0)
+        self.version = 0       # bumps on every change (used for throttled pushes)
+
+    @staticmethod
+    def _exposure(leg):
+        """Position-weighted greeks for one leg (share-equivalent delta, $ theta/vega)"""
+        size = leg['position'] * leg['multiplier']
+        return {greek: leg[greek] * size for greek in GREEKS}
+
+    def _apply(self, leg, sign):
+        exposure = self._exposure(leg)
+        bucket = self.underlyings.setdefault(leg['symbol'], dict.fromkeys(GREEKS, 0.0))
+        for greek in GREEKS:
+            bucket[greek] += sign * exposure[greek]
+            self.totals[greek] += sign * exposure[greek]
+
+    def _replace(self, con_id, **changes):
+        leg = self.legs[con_id]
+        self._apply(leg, -1)
+        leg.update(changes)
+        self._apply(leg, +1)
+        self.version += 1
+
+    def update_position(self, con_id, symbol, sec_type, position, multiplier=1):
+        """New or changed position (fills); stock legs carry delta 1"""
+        if con_id not in self.legs:
+            if not position:
+                return
+            self.legs[con_id] = {'symbol': symbol, 'secType': sec_type, 'position': 0.0,
+                                 'multiplier': float(multiplier or 1),
+                                 'delta': 1.0 if sec_type == 'STK' else 0.0,
+                                 'gamma': 0.0, 'theta': 0.0, 'vega': 0.0}
+        self._replace(con_id, position=float(position))
+        if not position:
+            # Flat leg contributes nothing; drop it (and its underlying once empty)
+            self.legs.pop(con_id)
+            if not any(leg['symbol'] == symbol for leg in self.legs.values()):
+                self.underlyings.pop(symbol, None)
+
+    def update_greeks(self, con_id, delta=None, gamma=None, theta=None, vega=None):
+        """Per-unit greeks from an option-computation tick on a held contract (missing values keep the last)"""
+        if con_id not in self.legs:
+            return
+        changes = {greek: float(value) for greek, value in
+                   (('delta', delta), ('gamma', gamma), ('theta', theta), ('vega', vega))
+                   if value is not None and not math.isnan(value)}
+        if changes:
+            self._replace(con_id, **changes)
+
+    def snapshot(self):
+        """Rounded per-underlying and account totals"""
+        def rounded(greeks):
+            return {greek: round(value, 4) for greek, value in greeks.items()}
+        return {
+            'version': self.version,
+            'account': rounded(self.totals),
+            'underlyings': {symbol: rounded(greeks) for symbol, greeks in self.underlyings.items()}
+        }
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Scanner Module - Ranked market-scanner results and the changes between updates
+TWS runs the scan server-side (reqScannerSubscription) and re-sends the whole
+ranked list every time it refreshes; ScanRanking keeps the last list per scanner
+and reduces each refresh to the rows that entered, left or changed, so only
+those are pushed to clients
+"""
+
+# Named scans; any other TWS scanCode can be passed through as-is
+PRESETS = {
+    'hot_option_volume': {'scanCode': 'HOT_BY_OPT_VOLUME'},
+    'option_volume': {'scanCode': 'OPT_VOLUME_MOST_ACTIVE'},
+    'option_open_interest': {'scanCode': 'OPT_OPEN_INTEREST_MOST_ACTIVE'},
+    'high_iv': {'scanCode': 'HIGH_OPT_IMP_VOLAT'},
+    # TWS has no IV-rank scan code; IV over historical volatility is the closest server-side rank
+    'high_iv_rank': {'scanCode': 'HIGH_OPT_IMP_VOLAT_OVER_HIST'},
+    'iv_gainers': {'scanCode': 'TOP_OPT_IMP_VOLAT_GAIN'},
+    'put_call_ratio': {'scanCode': 'HIGH_OPT_VOLUME_PUT_CALL_RATIO'},
+}
+
+# TWS allows at most 10 scanner subscriptions per client
+MAX_SCANNERS = 10
+MAX_ROWS = 50
+
+# Fields whose change on an instrument that stays in the list is reported
+VALUE_FIELDS = ('rank', 'distance', 'benchmark', 'projection')
+
+
+def scan_row(scan_data):
+    """Plain dict for one ib_insync ScanData"""
+    contract = scan_data.contractDetails.contract
+    return {
+        'conId': contract.conId,
+        'symbol': contract.symbol,
+        'secType': contract.secType,
+        'exchange': contract.primaryExchange or contract.exchange,
+        'rank': scan_data.rank,
+        'distance': scan_data.distance,
+        'benchmark': scan_data.benchmark,
+        'projection': scan_data.projection,
+    }
+
+
+class ScanRanking:
+    """Last ranked list of one scanner; update() returns what changed since the previous list"""
+
+    def __init__(self):
+        self.rows = {}      # conId -> row
+        self.version = 0    # bumps on every update that changed something
+
+    def update(self, rows):
+        """Replace the list; returns {added, removed, changed} or None when nothing changed"""
+        current = {row['conId']: row for row in rows}
+        added = [row for con_id, row in current.items() if con_id not in self.rows]
+        removed = [{'conId': con_id, 'symbol': row['symbol'], 'rank': row['rank']}
+                   for con_id, row in self.rows.items() if con_id not in current]
+        changed = []
+        for con_id, row in current.items():
+            old = self.rows.get(con_id)
+            if old is not None and any(old[field] != row[field] for field in VALUE_FIELDS):
+                change = {'conId': con_id, 'symbol': row['symbol'], 'previousRank': old['rank']}
+                change.update({field: row[field] for field in VALUE_FIELDS})
+                changed.append(change)
+        self.rows = current
+        if not (added or removed or changed):
+            return None
+        self.version += 1
+        return {
+            'version': self.version,
+            'added': sorted(added, key=lambda row: row['rank']),
+            'removed': removed,
+            'changed': sorted(changed, key=lambda row: row['rank']),
+        }
+
+    def ranked(self):
+        return sorted(self.rows.values(), key=lambda row: row['rank'])
@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+"""
+Simulated Broker Module - Local stand-in for TWS behind the ib_insync IB API
+Implements the IB calls the bridge makes against an in-memory account:
+random-walk quotes (Black-Scholes for options), contract qualification, option
+parameters, market scanners, positions/portfolio/account values and order
+matching. Time runs on a virtual clock that ib.sleep() advances, optionally
+faster than wall time
+
+The matching engine acknowledges orders and executes them after configurable
+virtual latencies, can split executions into partial fills, rejects invalid
+(or a random share of) orders the way TWS does (error 201, status Cancelled),
+re-matches resting orders on every clock step and applies OCA groups
+"""
+
+import asyncio
+import heapq
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+from eventkit import Event
+from ib_insync import (AccountValue, CommissionReport, ContractDetails, Execution, Fill, OptionChain,
+                       OptionComputation, OrderStatus, PortfolioItem, Position, PriceIncrement, ScanData,
+                       ScanDataList, Stock, Ticker, Trade, TradeLogEntry)
+
+from scenario import black_scholes, norm_cdf
+
+ACCOUNT = 'DU0000000'
+ANNUAL_VOL = 0.25
+OPTION_IV = 0.30
+RATE = 0.04
+SECONDS_PER_YEAR = 365.0 * 24 * 3600
+COMMISSION_PER_CONTRACT = 0.65
+UNSET_DOUBLE = 1.7976931348623157e+308
+
+WORKING_STATES = ('Submitted', 'PartiallyFilled')
+
+# Symbols the simulated market scanners rank, and how often (virtual seconds) they re-rank
+SCANNER_SYMBOLS = ['SPY', 'QQQ', 'IWM', 'AAPL', 'MSFT', 'NVDA', 'AMZN', 'META', 'TSLA', 'AMD', 'NFLX', 'JPM']
+SCANNER_REFRESH = 30.0
+
+
+# Settings accepted by parse_settings (the bridge's --sim option), with their types
+SETTINGS = {'seed': int, 'speed': float, 'cash': float, 'ack_latency': float, 'fill_latency': float,
+            'latency_jitter': float, 'max_fill_size': int, 'reject_rate': float}
+
+
+def parse_settings(spec):
+    """'fill_latency=0.2,max_fill_size=1' -> SimulatedIB keyword arguments ('default' for none)"""
+    settings = {}
+    for item in (spec or '').split(','):
+        if not item.strip() or item.strip() == 'default':
+            continue
+        name, _, value = item.partition('=')
+        name = name.strip().replace('-', '_')
+        if name not in SETTINGS or not value:
+            raise ValueError(f"Unknown simulator setting: {item.strip()} (expected name=value, one of "
+                             f"{', '.join(SETTINGS)})")
+        settings[name] = SETTINGS[name](value)
+    return settings
+
+
+class SimulatedIB:
+    """ib_insync.IB look-alike backed by a local random-walk market and matching engine"""
+
+    def __init__(self, seed=None, speed=1.0, cash=100000.0, account=ACCOUNT, ack_latency=0.0,
+                 fill_latency=0.0, latency_jitter=0.0, max_fill_size=None, reject_rate=0.0):
+        self.random = random.Random(seed)
+        self.speed = float(speed)         # virtual seconds per wall second
+        self.ack_latency = float(ack_latency)        # placeOrder/cancelOrder -> acknowledged (virtual s)
+        self.fill_latency = float(fill_latency)      # marketable -> each execution (virtual s)
+        self.latency_jitter = float(latency_jitter)  # +/- fraction applied to every latency
+        self.max_fill_size = max_fill_size           # largest single execution (None: all at once)
+        self.reject_rate = float(reject_rate)        # share of valid new orders rejected anyway
+        self.account = account
+        self.cash = float(cash)
+        self.realized = 0.0
+        self.clock = datetime.now(timezone.utc)
+        self._connected = False
+        self._next_con_id = 1000
+        self._next_order_id = 1
+        self._next_exec_id = 1
+        self._contracts = {}     # (symbol, secType, expiry, strike, right) -> conId
+        self._by_con_id = {}     # conId -> qualified Contract
+        self._spots = {}         # symbol -> underlying price
+        self._tickers = {}       # conId -> live Ticker (one market-data line each)
+        self._positions = {}     # conId -> [contract, position, avgCost]
+        self._trades = {}        # orderId -> Trade (kept forever, like ib_insync)
+        self._scheduled = []     # heap of (due clock, seq, callback, args)
+        self._next_event = 0
+        self._in_flight = set()  # orderIds with an execution scheduled
+        self._scanners = set()   # open ScanDataLists
+        self._next_req_id = 1
+
+        self.connectedEvent = Event('connectedEvent')
+        self.disconnectedEvent = Event('disconnectedEvent')
+        self.errorEvent = Event('errorEvent')
+        self.orderStatusEvent = Event('orderStatusEvent')
+        self.execDetailsEvent = Event('execDetailsEvent')
+        self.updatePortfolioEvent = Event('updatePortfolioEvent')
+        self.pendingTickersEvent = Event('pendingTickersEvent')
+
+    # Connection and event loop
+
+    def connect(self, host='127.0.0.1', port=7497, clientId=1, timeout=4, **kwargs):
+        self._connected = True
+        self.connectedEvent.emit()
+        return self
+
+    async def connectAsync(self, host='127.0.0.1', port=7497, clientId=1, timeout=4, **kwargs):
+        return self.connect(host, port, clientId, timeout, **kwargs)
+
+    def disconnect(self):
+        if self._connected:
+            self._connected = False
+            # Market-data lines and scanners end with the session; their objects stop updating
+            self._tickers.clear()
+            self._scanners.clear()
+            self.disconnectedEvent.emit()
+
+    def isConnected(self):
+        return self._connected
+
+    def run(self, awaitable=None):
+        return asyncio.get_event_loop().run_until_complete(awaitable)
+
+    def sleep(self, secs=0.02):
+        """Advance the virtual clock by secs (waiting secs / speed of wall time)"""
+        self.run(asyncio.sleep(secs / self.speed))
+        self.advance(secs)
+        return True
+
+    def advance(self, secs):
+        """
+        Move every quote one random-walk step of `secs` virtual seconds, run the
+        order events that came due and re-match resting orders
+        """
+        target = self.clock + timedelta(seconds=secs)
+        scale = ANNUAL_VOL * math.sqrt(max(secs, 1e-6) / SECONDS_PER_YEAR)
+        for symbol in self._spots:
+            self._spots[symbol] *= math.exp(self.random.gauss(0.0, scale))
+        for ticker in list(self._tickers.values()):
+            self._quote(ticker)
+        # Events run at their due times, so follow-ups they schedule can also fall inside this step
+        while self._scheduled and self._scheduled[0][0] <= target:
+            due, _, callback, args = heapq.heappop(self._scheduled)
+            self.clock = max(self.clock, due)
+            callback(*args)
+        self.clock = target
+        if self._tickers:
+            self.pendingTickersEvent.emit(set(self._tickers.values()))
+        for trade in self.openTrades():
+            self._match(trade)
+
+    def _latency(self, base):
+        if base <= 0:
+            return 0.0
+        return base * (1.0 + self.latency_jitter * self.random.uniform(-1.0, 1.0))
+
+    def _schedule(self, delay, callback, *args):
+        """Run callback after `delay` virtual seconds (at once when there is no delay)"""
+        if delay <= 0:
+            callback(*args)
+            return
+        self._next_event += 1
+        heapq.heappush(self._scheduled, (self.clock + timedelta(seconds=delay), self._next_event, callback, args))
+
+    # Contracts and reference data
+
+    def _con_id(self, contract):
+        key = (contract.symbol, contract.secType, contract.lastTradeDateOrContractMonth,
+               float(contract.strike or 0), contract.right)
+        if key not in self._contracts:
+            self._contracts[key] = self._next_con_id
+            self._next_con_id += 1
+        return self._contracts[key]
+
+    @staticmethod
+    def is_valid_symbol(symbol):
+        return bool(symbol) and symbol.isalpha() and len(symbol) <= 5
+
+    def spot(self, symbol):
+        if symbol not in self._spots:
+            # Deterministic per symbol so reruns with one seed see the same book
+            self._spots[symbol] = 20.0 + (sum(map(ord, symbol)) * 7919 % 480)
+        return self._spots[symbol]
+
+    def _resolve(self, contract):
+        """Fill in a conId-only contract from the one qualified earlier"""
+        known = self._by_con_id.get(contract.conId)
+        if known is not None and not contract.symbol:
+            for field in ('symbol', 'secType', 'lastTradeDateOrContractMonth', 'strike', 'right', 'multiplier',
+                          'localSymbol'):
+                setattr(contract, field, getattr(known, field))
+
+    def qualifyContracts(self, *contracts):
+        qualified = []
+        for contract in contracts:
+            self._resolve(contract)
+            if not self.is_valid_symbol(contract.symbol):
+                continue
+            contract.conId = self._con_id(contract)
+            contract.exchange = contract.exchange or 'SMART'
+            contract.currency = contract.currency or 'USD'
+            if contract.secType == 'OPT':
+                contract.multiplier = contract.multiplier or '100'
+                contract.localSymbol = (f"{contract.symbol} {contract.lastTradeDateOrContractMonth[2:]}"
+                                        f"{contract.right}{int(float(contract.strike) * 1000):08d}")
+            else:
+                contract.localSymbol = contract.symbol
+                contract.primaryExchange = 'ARCA'
+            self._by_con_id.setdefault(contract.conId, contract)
+            qualified.append(contract)
+        return qualified
+
+    async def qualifyContractsAsync(self, *contracts):
+        return self.qualifyContracts(*contracts)
+
+    def expirations(self, count=8):
+        """Weekly Friday expiries from the virtual date"""
+        day = self.clock.date()
+        first = day + timedelta(days=(4 - day.weekday()) % 7)
+        return [(first + timedelta(weeks=i)).strftime('%Y%m%d') for i in range(count)]
+
+    def strikes(self, symbol):
+        spot = self.spot(symbol)
+        step = 1.0 if spot < 100 else 5.0
+        center = round(spot / step) * step
+        return [center + step * i for i in range(-20, 21) if center + step * i > 0]
+
+    def reqSecDefOptParams(self, underlyingSymbol, futFopExchange, underlyingSecType, underlyingConId):
+        if not self.is_valid_symbol(underlyingSymbol):
+            return []
+        return [OptionChain('SMART', underlyingConId, underlyingSymbol, '100',
+                            self.expirations(), self.strikes(underlyingSymbol))]
+
+    async def reqSecDefOptParamsAsync(self, *args):
+        return self.reqSecDefOptParams(*args)
+
+    def reqContractDetails(self, contract):
+        if not self.qualifyContracts(contract):
+            return []
+        return [ContractDetails(contract=contract, minTick=0.01, marketRuleIds='', validExchanges='SMART')]
+
+    def reqMarketRule(self, marketRuleId):
+        return [PriceIncrement(0.0, 0.01)]
+
+    # Market data
+
+    def _fair_value(self, contract):
+        spot = self.spot(contract.symbol)
+        if contract.secType != 'OPT':
+            return spot, None
+        expires = datetime.strptime(contract.lastTradeDateOrContractMonth, '%Y%m%d').replace(
+            hour=20, tzinfo=timezone.utc)
+        years = max((expires - self.clock).total_seconds() / SECONDS_PER_YEAR, 0.0)
+        strike = float(contract.strike)
+        is_call = contract.right == 'C'
+        price = float(black_scholes(spot, strike, years, OPTION_IV, RATE, is_call))
+        if years <= 0:
+            return price, None
+        sqrt_t = math.sqrt(years)
+        d1 = (math.log(spot / strike) + (RATE + 0.5 * OPTION_IV ** 2) * years) / (OPTION_IV * sqrt_t)
+        pdf = math.exp(-0.5 * d1 * d1) / math.sqrt(2 * math.pi)
+        delta = float(norm_cdf(d1)) - (0.0 if is_call else 1.0)
+        gamma = pdf / (spot * OPTION_IV * sqrt_t)
+        vega = spot * pdf * sqrt_t / 100
+        theta = -spot * pdf * OPTION_IV / (2 * sqrt_t) / 365
+        return price, OptionComputation(0, OPTION_IV, delta, price, 0.0, gamma, vega, theta, spot)
+
+    def _quote(self, ticker):
+        value, greeks = self._fair_value(ticker.contract)
+        half_spread = max(0.01, round(value * 0.002, 2))
+        ticker.time = self.clock
+        ticker.bid = max(round(value - half_spread, 2), 0.0)
+        ticker.ask = round(value + half_spread, 2)
+        ticker.last = round(value, 2)
+        ticker.close = ticker.close if ticker.close == ticker.close else ticker.last
+        ticker.bidSize = ticker.askSize = 100
+        if greeks is not None:
+            ticker.modelGreeks = greeks
+        ticker.updateEvent.emit(ticker)
+
+    def reqMktData(self, contract, genericTickList='', snapshot=False, regulatorySnapshot=False,
+                   mktDataOptions=None):
+        if not contract.conId:
+            self.qualifyContracts(contract)
+        self._resolve(contract)
+        ticker = self._tickers.get(contract.conId)
+        if ticker is None:
+            ticker = Ticker(contract=contract)
+            self._tickers[contract.conId] = ticker
+            self._quote(ticker)
+        return ticker
+
+    def cancelMktData(self, contract):
+        self._tickers.pop(contract.conId, None)
+
+    def tickers(self):
+        return list(self._tickers.values())
+
+    # Market scanners
+
+    def reqScannerSubscription(self, subscription, scannerSubscriptionOptions=None,
+                               scannerSubscriptionFilterOptions=None):
+        """SCANNER_SYMBOLS in a random order, re-ranked every SCANNER_REFRESH virtual seconds"""
+        data_list = ScanDataList()
+        data_list.reqId = self._next_req_id
+        self._next_req_id += 1
+        data_list.subscription = subscription
+        data_list.scannerSubscriptionOptions = scannerSubscriptionOptions or []
+        data_list.scannerSubscriptionFilterOptions = scannerSubscriptionFilterOptions or []
+        self._scanners.add(data_list)
+        # The first list arrives asynchronously, as from TWS
+        self._schedule(max(self._latency(self.ack_latency), 0.01), self._scan, data_list)
+        return data_list
+
+    def cancelScannerSubscription(self, dataList):
+        self._scanners.discard(dataList)
+
+    def _scan(self, data_list):
+        if data_list not in self._scanners:
+            return
+        rows = data_list.subscription.numberOfRows
+        rows = min(rows if rows > 0 else 50, len(SCANNER_SYMBOLS))
+        data_list[:] = [ScanData(rank, ContractDetails(contract=self.qualifyContracts(Stock(symbol, 'SMART', 'USD'))[0]),
+                                 '', '', '', '')
+                        for rank, symbol in enumerate(self.random.sample(SCANNER_SYMBOLS, rows))]
+        data_list.updateEvent.emit(data_list)
+        self._schedule(SCANNER_REFRESH, self._scan, data_list)
+
+    # Account
+
+    def _mark(self, contract):
+        ticker = self._tickers.get(contract.conId)
+        return ticker.marketPrice() if ticker is not None else self._fair_value(contract)[0]
+
+    def _multiplier(self, contract):
+        return float(contract.multiplier or 1)
+
+    def positions(self):
+        return [Position(self.account, contract, position, avg_cost)
+                for contract, position, avg_cost in self._positions.values()]
+
+    async def reqPositionsAsync(self):
+        return self.positions()
+
+    def portfolio(self):
+        items = []
+        for contract, position, avg_cost in self._positions.values():
+            price = self._mark(contract)
+            value = price * position * self._multiplier(contract)
+            items.append(PortfolioItem(contract, position, price, value, avg_cost,
+                                       value - avg_cost * position, 0.0, self.account))
+        return items
+
+    def accountValues(self):
+        unrealized = sum(item.unrealizedPNL for item in self.portfolio())
+        net_liquidation = self.cash + sum(item.marketValue for item in self.portfolio())
+        return [AccountValue(self.account, tag, str(round(value, 2)), 'USD', '')
+                for tag, value in (('NetLiquidation', net_liquidation),
+                                   ('LookAheadAvailableFunds', self.cash),
+                                   ('RealizedPnL', self.realized),
+                                   ('UnrealizedPnL', unrealized),
+                                   ('DailyPnL', self.realized + unrealized))]
+
+    async def accountSummaryAsync(self, account=''):
+        return self.accountValues()
+
+    # Orders
+
+    def trades(self):
+        return list(self._trades.values())
+
+    def openTrades(self):
+        return [trade for trade in self._trades.values() if not trade.isDone()]
+
+    def fills(self):
+        return [fill for trade in self._trades.values() for fill in trade.fills]
+
+    def _set_status(self, trade, status, message='', error_code=0):
+        trade.orderStatus.status = status
+        trade.log.append(TradeLogEntry(self.clock, status, message, error_code))
+        trade.statusEvent.emit(trade)
+        self.orderStatusEvent.emit(trade)
+        if status == 'Cancelled':
+            trade.cancelledEvent.emit(trade)
+
+    def placeOrder(self, contract, order):
+        """New order or modification of a live one (same orderId); acknowledged after ack_latency"""
+        if not contract.conId:
+            self.qualifyContracts(contract)
+        trade = self._trades.get(order.orderId)
+        if trade is None or not order.orderId:
+            order.orderId = self._next_order_id
+            order.permId = 900000 + self._next_order_id
+            order.clientId = 1
+            self._next_order_id += 1
+            trade = Trade(contract, order, OrderStatus(orderId=order.orderId, status='PendingSubmit',
+                                                       remaining=order.totalQuantity, permId=order.permId))
+            self._trades[order.orderId] = trade
+            self._schedule(self._latency(self.ack_latency), self._acknowledge, trade)
+        elif trade.orderStatus.status in WORKING_STATES:
+            self._match(trade)
+        return trade
+
+    def _reject_reason(self, trade):
+        order = trade.order
+        if not trade.contract.conId:
+            return "No security definition has been found for the request"
+        if order.totalQuantity <= 0:
+            return "Order quantity must be positive"
+        if order.orderType == 'LMT' and order.lmtPrice == UNSET_DOUBLE:
+            return "Limit price is missing"
+        if order.orderType == 'STP' and order.auxPrice == UNSET_DOUBLE:
+            return "Stop price is missing"
+        if order.orderType not in ('MKT', 'LMT', 'STP'):
+            return f"Order type {order.orderType} is not supported by the simulator"
+        if self.random.random() < self.reject_rate:
+            return "Simulated rejection"
+        return None
+
+    def _acknowledge(self, trade):
+        if trade.orderStatus.status != 'PendingSubmit':
+            return
+        reason = self._reject_reason(trade)
+        if reason:
+            message = f"Order rejected - reason:{reason}"
+            self._set_status(trade, 'Cancelled', f"Error 201, reqId {trade.order.orderId}: {message}", 201)
+            self.errorEvent.emit(trade.order.orderId, 201, message, trade.contract)
+            return
+        self._set_status(trade, 'Submitted')
+        self._match(trade)
+
+    def cancelOrder(self, order, manualCancelOrderTime=''):
+        trade = self._trades.get(order.orderId)
+        if trade is not None and not trade.isDone():
+            self._set_status(trade, 'PendingCancel')
+            self._schedule(self._latency(self.ack_latency), self._cancel, trade, 'Cancelled by client')
+        return trade
+
+    def _cancel(self, trade, message):
+        if not trade.isDone():
+            self._in_flight.discard(trade.order.orderId)
+            self._set_status(trade, 'Cancelled', message)
+
+    def _marketable_price(self, trade):
+        """Execution price if the order can trade against the current quote, else None"""
+        order = trade.order
+        ticker = self._tickers.get(trade.contract.conId)
+        if ticker is None:
+            # Quote without opening a market-data line
+            ticker = Ticker(contract=trade.contract)
+            self._quote(ticker)
+        buy = order.action == 'BUY'
+        touch = ticker.ask if buy else ticker.bid
+        if order.orderType == 'MKT':
+            return touch
+        if order.orderType == 'LMT':
+            return touch if (touch <= order.lmtPrice if buy else touch >= order.lmtPrice) else None
+        if order.orderType == 'STP':
+            return touch if (ticker.last >= order.auxPrice if buy else ticker.last <= order.auxPrice) else None
+        return None
+
+    def _match(self, trade):
+        """Execute (after fill_latency) a working order that can trade against the current quote"""
+        if trade.orderStatus.status not in WORKING_STATES or trade.order.orderId in self._in_flight:
+            return
+        # Child orders rest until their parent has filled
+        parent = self._trades.get(trade.order.parentId) if trade.order.parentId else None
+        if parent is not None and parent.orderStatus.status != 'Filled':
+            return
+        if self._marketable_price(trade) is None:
+            return
+        self._in_flight.add(trade.order.orderId)
+        self._schedule(self._latency(self.fill_latency), self._execute, trade)
+
+    def _execute(self, trade):
+        """One execution at the then-current touch: the whole remainder, or up to max_fill_size"""
+        self._in_flight.discard(trade.order.orderId)
+        if trade.orderStatus.status not in WORKING_STATES:
+            return
+        price = self._marketable_price(trade)
+        if price is None:
+            return
+        shares = trade.orderStatus.remaining
+        if self.max_fill_size:
+            shares = min(shares, self.max_fill_size)
+        self._fill(trade, shares, price)
+        self._match(trade)  # next slice of a partial fill
+
+    def _fill(self, trade, shares, price):
+        contract, order = trade.contract, trade.order
+        side = 1 if order.action == 'BUY' else -1
+        status = trade.orderStatus
+        status.avgFillPrice = (status.avgFillPrice * status.filled + price * shares) / (status.filled + shares)
+        status.filled += shares
+        status.remaining -= shares
+        status.lastFillPrice = price
+
+        execution = Execution(execId=f"sim.{self._next_exec_id:08d}", time=self.clock, acctNumber=self.account,
+                              exchange='SMART', side='BOT' if side > 0 else 'SLD', shares=shares, price=price,
+                              permId=order.permId, clientId=order.clientId, orderId=order.orderId,
+                              cumQty=status.filled, avgPrice=status.avgFillPrice, orderRef=order.orderRef)
+        self._next_exec_id += 1
+        commission = COMMISSION_PER_CONTRACT * shares if contract.secType == 'OPT' else 0.0
+        fill = Fill(contract, execution, CommissionReport(execution.execId, commission, 'USD'), self.clock)
+        trade.fills.append(fill)
+        self._book(contract, side * shares, price, commission)
+
+        self._set_status(trade, 'Filled' if status.remaining <= 0 else 'PartiallyFilled')
+        trade.fillEvent.emit(trade, fill)
+        self.execDetailsEvent.emit(trade, fill)
+        if order.ocaGroup:
+            self._apply_oca(trade, shares)
+        if status.remaining <= 0:
+            trade.filledEvent.emit(trade)
+            for child in list(self._trades.values()):
+                if child.order.parentId == order.orderId and not child.isDone():
+                    self._match(child)
+
+    def _apply_oca(self, trade, shares):
+        """
+        One-cancels-all: ocaType 1 cancels the rest of the group on any fill,
+        types 2 and 3 reduce their quantities by the filled amount
+        """
+        for other in list(self._trades.values()):
+            if other is trade or other.isDone() or other.order.ocaGroup != trade.order.ocaGroup:
+                continue
+            if trade.order.ocaType == 1:
+                self._cancel(other, f"OCA group {trade.order.ocaGroup} filled by order {trade.order.orderId}")
+            else:
+                other.order.totalQuantity = max(other.order.totalQuantity - shares, 0)
+                other.orderStatus.remaining = max(other.orderStatus.remaining - shares, 0)
+                if other.orderStatus.remaining <= 0:
+                    self._cancel(other, f"OCA group {trade.order.ocaGroup} quantity exhausted")
+
+    def _book(self, contract, quantity, price, commission):
+        """Apply a fill to cash and the position (average cost per contract includes the multiplier)"""
+        multiplier = self._multiplier(contract)
+        self.cash -= quantity * price * multiplier + commission
+        entry = self._positions.get(contract.conId)
+        if entry is None:
+            entry = self._positions[contract.conId] = [contract, 0.0, 0.0]
+        _, position, avg_cost = entry
+        if position and (position > 0) != (quantity > 0):
+            closed = min(abs(quantity), abs(position)) * (1 if position > 0 else -1)
+            self.realized += closed * (price * multiplier - avg_cost)
+        new_position = position + quantity
+        if new_position == 0:
+            del self._positions[contract.conId]
+        else:
+            if not position or (position > 0) == (quantity > 0):
+                avg_cost = (avg_cost * position + price * multiplier * quantity) / new_position
+            elif (new_position > 0) != (position > 0):
+                avg_cost = price * multiplier
+            entry[1], entry[2] = new_position, avg_cost
+        mark = self._mark(contract)
+        value = mark * new_position * multiplier
+        self.updatePortfolioEvent.emit(PortfolioItem(contract, new_position, mark, value, avg_cost,
+                                                     value - avg_cost * new_position, self.realized, self.account))
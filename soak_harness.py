@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Soak Harness - Drives the bridge for hours of simulated trading at accelerated speed
+The bridge runs in-process against sim_broker.SimulatedIB while a weighted mix of
+commands goes through the same request queue as stdin. RSS, tracemalloc, live
+market-data lines, object counts, cache sizes and log volume are sampled on the
+virtual clock; the run fails when growth after warm-up crosses a threshold.
+
+Usage: python3 soak_harness.py [--hours 6.5] [--speed 600] [--report soak.jsonl]
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import tws_bridge
+from sim_broker import SimulatedIB
+
+UNIVERSE = ['SPY', 'QQQ', 'IWM', 'DIA', 'AAPL', 'MSFT', 'NVDA', 'AMZN', 'META', 'GOOGL', 'TSLA', 'AMD',
+            'NFLX', 'JPM', 'BAC', 'XOM', 'CVX', 'KO', 'PEP', 'WMT', 'COST', 'DIS', 'INTC', 'ORCL', 'CRM',
+            'ADBE', 'PYPL', 'UBER', 'SHOP', 'SQ', 'COIN', 'PLTR', 'SOFI', 'RIVN', 'LCID', 'F', 'GM', 'T',
+            'VZ', 'PFE', 'MRK', 'ABBV', 'LLY', 'UNH', 'CVS', 'BA', 'CAT', 'DE', 'GE', 'MMM']
+WATCHLIST = UNIVERSE[:8]
+
+# Relative frequency of each command in the generated session
+COMMAND_MIX = {
+    'get_ticker_price': 30,
+    'get_balance': 12,
+    'get_daily_pnl': 12,
+    'get_positions': 12,
+    'get_portfolio_greeks': 8,
+    'get_market_session': 4,
+    'validate_ticker': 6,
+    'get_ticker_prices': 3,
+    'batch': 6,
+    'place_order': 4,
+    'close_position': 3,
+}
+
+# Bridge globals whose sizes are tracked over the run
+TRACKED_CACHES = ['contract_cache', 'ticker_cache', 'option_params_cache', 'option_conid_cache',
+                  'quote_cache', 'chain_indexes', 'risk_tickers', 'contract_rule_cache']
+
+# Bridge globals an in-process run swaps out, and the module caches it fills
+BRIDGE_GLOBALS = ['ib', 'sim_settings', 'JOURNAL_PATH', 'is_market_open', 'response_sink', 'order_journal',
+                  'chain_exporter', 'position_table', 'risk_engine', 'MARKET_DATA_LINES', 'watchlist']
+BRIDGE_CACHES = TRACKED_CACHES + ['vol_surfaces', 'scanners', 'market_rule_cache', 'connection_state',
+                                  'last_risk_push']
+
+
+@contextmanager
+def bridge_session(**overrides):
+    """
+    Run the bridge in-process with some globals replaced (e.g. ib=SimulatedIB());
+    every global and cache in BRIDGE_GLOBALS / BRIDGE_CACHES is put back afterwards
+    """
+    saved = {name: getattr(tws_bridge, name) for name in BRIDGE_GLOBALS}
+    caches = {name: dict(getattr(tws_bridge, name)) for name in BRIDGE_CACHES}
+    for name, value in overrides.items():
+        setattr(tws_bridge, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(tws_bridge, name, value)
+        for name, contents in caches.items():
+            cache = getattr(tws_bridge, name)
+            cache.clear()
+            cache.update(contents)
+
+
+class ByteCounter:
+    """Write-only stream that counts what it is given (stands in for stderr / the Electron pipe)"""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, text):
+        self.bytes += len(text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def send(self, line):
+        self.bytes += len(line) + 1
+
+
+def rss_mb():
+    """Resident set size in MB (/proc on Linux, peak RSS elsewhere)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+def make_command(sim, rng, seq):
+    """One random command from COMMAND_MIX with plausible arguments"""
+    cmd_type = rng.choices(list(COMMAND_MIX), weights=list(COMMAND_MIX.values()))[0]
+    symbol = rng.choice(UNIVERSE)
+    data = {}
+    if cmd_type in ('get_ticker_price', 'validate_ticker'):
+        data = {'ticker': symbol}
+    elif cmd_type == 'get_ticker_prices':
+        data = {'tickers': rng.sample(UNIVERSE, 10)}
+    elif cmd_type == 'batch':
+        data = {'commands': [{'id': name, 'type': name} for name in ('get_balance', 'get_daily_pnl', 'get_positions')]}
+    elif cmd_type == 'place_order':
+        symbol = rng.choice(WATCHLIST)
+        strikes = sim.strikes(symbol)
+        data = {'action': 'BUY', 'ticker': symbol, 'quantity': rng.randint(1, 3),
+                'expiry': rng.choice(sim.expirations()[:3]), 'strike': strikes[len(strikes) // 2 + rng.randint(-3, 3)],
+                'optionType': rng.choice('CP'), 'stopLoss': '20', 'takeProfit': '30'}
+    elif cmd_type == 'close_position':
+        positions = sim.positions()
+        if not positions:
+            return make_command(sim, rng, seq)
+        pos = rng.choice(positions)
+        data = {'symbol': f"{pos.contract.symbol} {pos.contract.lastTradeDateOrContractMonth} "
+                          f"{pos.contract.strike}{pos.contract.right}",
+                'position': pos.position}
+    return {'type': cmd_type, 'requestId': seq, 'data': data}
+
+
+def sample(sim, started, log_sink, response_sink, commands, baseline_snapshot=None):
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    row = {
+        'virtualHours': round((sim.clock - started).total_seconds() / 3600, 3),
+        'commands': commands,
+        'rssMb': round(rss_mb(), 2),
+        'tracedMb': round(current / 1e6, 2),
+        'tracedPeakMb': round(peak / 1e6, 2),
+        'objects': len(gc.get_objects()),
+        'subscriptions': len(sim.tickers()),
+        'trades': len(sim.trades()),
+        'openTrades': len(sim.openTrades()),
+        'caches': {name: len(getattr(tws_bridge, name)) for name in TRACKED_CACHES},
+        'logMb': round(log_sink.bytes / 1e6, 3),
+        'responseMb': round(response_sink.bytes / 1e6, 3),
+    }
+    if baseline_snapshot is not None:
+        diff = tracemalloc.take_snapshot().compare_to(baseline_snapshot, 'lineno')
+        row['topGrowth'] = [{'where': str(stat.traceback), 'kb': round(stat.size_diff / 1e3, 1),
+                             'count': stat.count_diff} for stat in diff[:5]]
+    return row
+
+
+def check(baseline, final, args):
+    """Threshold violations between the post-warm-up baseline and the last sample"""
+    failures = []
+    if final['rssMb'] - baseline['rssMb'] > args.max_rss_growth_mb:
+        failures.append(f"RSS grew {final['rssMb'] - baseline['rssMb']:.1f} MB (limit {args.max_rss_growth_mb})")
+    if final['tracedMb'] - baseline['tracedMb'] > args.max_traced_growth_mb:
+        failures.append(f"Traced memory grew {final['tracedMb'] - baseline['tracedMb']:.1f} MB "
+                        f"(limit {args.max_traced_growth_mb})")
+    if final['subscriptions'] > args.max_subscriptions:
+        failures.append(f"{final['subscriptions']} live market-data lines (limit {args.max_subscriptions})")
+    growth = (final['objects'] - baseline['objects']) / max(baseline['objects'], 1)
+    if growth > args.max_object_growth:
+        failures.append(f"Object count grew {growth:.0%} (limit {args.max_object_growth:.0%})")
+    hours = max(final['virtualHours'], 1e-9)
+    if final['logMb'] / hours > args.max_log_mb_per_hour:
+        failures.append(f"Logging {final['logMb'] / hours:.1f} MB per hour (limit {args.max_log_mb_per_hour})")
+    return failures
+
+
+def run(args):
+    import random
+    rng = random.Random(args.seed)
+    sim = SimulatedIB(seed=args.seed, speed=args.speed)
+    sim.connect()
+
+    # Bridge state lives in a scratch directory; orders are accepted around the clock
+    scratch = tempfile.mkdtemp(prefix='tt-soak-')
+    tws_bridge.ib = sim
+    tws_bridge.JOURNAL_PATH = os.path.join(scratch, 'order_journal.db')
+    tws_bridge.is_market_open = lambda: (True, "Market is open (soak run)")
+    tws_bridge.connection_state.update(state='connected', since=time.time(), started=True)
+
+    log_sink, response_sink = ByteCounter(), ByteCounter()
+    real_stderr, sys.stderr = sys.stderr, log_sink
+    tws_bridge.response_sink = response_sink.send
+
+    report = open(args.report, 'w') if args.report else None
+    samples = []
+
+    def emit(row):
+        samples.append(row)
+        line = json.dumps(row)
+        real_stderr.write(line + '\n')
+        if report:
+            report.write(line + '\n')
+            report.flush()
+
+    tracemalloc.start(args.trace_depth)
+    started = sim.clock
+    baseline_snapshot = None
+    commands = 0
+    duration = args.hours * 3600
+    warmup = duration * args.warmup_fraction
+    next_sample = 0.0
+    try:
+        tws_bridge.warm_up(WATCHLIST)
+        tws_bridge.start_risk_engine()
+        tws_bridge.start_order_journal()
+
+        while True:
+            elapsed = (sim.clock - started).total_seconds()
+            if elapsed >= next_sample:
+                if baseline_snapshot is None and elapsed >= warmup:
+                    baseline_snapshot = tracemalloc.take_snapshot()
+                    emit(dict(sample(sim, started, log_sink, response_sink, commands), baseline=True))
+                else:
+                    emit(sample(sim, started, log_sink, response_sink, commands, baseline_snapshot))
+                next_sample += args.sample_every
+            if elapsed >= duration:
+                break
+
+            commands += 1
+            tws_bridge.request_queue.put(make_command(sim, rng, commands))
+            request = tws_bridge.request_queue.get_nowait()
+            tws_bridge.run_request(request)
+            sim.sleep(rng.expovariate(1.0 / args.interval))
+            tws_bridge.run_periodic_tasks()
+    finally:
+        sys.stderr = real_stderr
+        tws_bridge.response_sink = None
+        tracemalloc.stop()
+        if report:
+            report.close()
+
+    baseline = next(row for row in samples if row.get('baseline'))
+    failures = check(baseline, samples[-1], args)
+    summary = {'commands': commands, 'virtualHours': samples[-1]['virtualHours'],
+               'passed': not failures, 'failures': failures}
+    print(json.dumps(summary))
+    return 0 if not failures else 1
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Long-session soak test of tws_bridge against a simulated TWS")
+    parser.add_argument('--hours', type=float, default=6.5, help="virtual session length")
+    parser.add_argument('--speed', type=float, default=600.0, help="virtual seconds per wall second")
+    parser.add_argument('--interval', type=float, default=2.0, help="mean virtual seconds between commands")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--sample-every', type=float, default=900.0, help="virtual seconds between samples")
+    parser.add_argument('--warmup-fraction', type=float, default=0.1, help="share of the run before the baseline")
+    parser.add_argument('--trace-depth', type=int, default=1, help="tracemalloc frames per allocation")
+    parser.add_argument('--report', help="write every sample as a JSON line to this file")
+    parser.add_argument('--max-rss-growth-mb', type=float, default=50.0)
+    parser.add_argument('--max-traced-growth-mb', type=float, default=25.0)
+    parser.add_argument('--max-subscriptions', type=int, default=100)
+    parser.add_argument('--max-object-growth', type=float, default=0.5, help="fractional growth allowed")
+    parser.add_argument('--max-log-mb-per-hour', type=float, default=20.0)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
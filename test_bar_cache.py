@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for the memory-mapped historical bar store
+"""
+import os
+import tempfile
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+from bar_cache import BarStore, bar_timestamp, gap_duration
+
+
+def bar(day, close, volume=1000.0):
+    return SimpleNamespace(date=date(2026, 10, day), open=close - 1, high=close + 1, low=close - 2,
+                           close=close, volume=volume)
+
+
+def make_store():
+    return BarStore(tempfile.mkdtemp())
+
+
+def test_append_only_adds_new_bars():
+    store = make_store()
+    assert store.append(1, '1 day', [bar(13, 10.0), bar(14, 11.0), bar(15, 12.0)]) == 3
+    assert store.append(1, '1 day', [bar(14, 11.0), bar(15, 12.0), bar(16, 13.0)]) == 2
+    assert store.count(1, '1 day') == 4
+    assert list(store.query(1, '1 day')['close']) == [10.0, 11.0, 12.0, 13.0]
+    assert store.append(1, '1 day', []) == 0
+
+
+def test_partial_last_bar_is_corrected():
+    store = make_store()
+    store.append(1, '1 day', [bar(16, 13.0), bar(19, 14.0, volume=200.0)])
+    assert store.append(1, '1 day', [bar(19, 14.5, volume=5000.0)]) == 1
+    columns = store.query(1, '1 day')
+    assert list(columns['close']) == [13.0, 14.5] and list(columns['volume']) == [1000.0, 5000.0]
+    assert store.append(1, '1 day', [bar(19, 14.6), bar(20, 15.0)]) == 2
+    assert list(store.query(1, '1 day')['close']) == [13.0, 14.6, 15.0]
+
+
+def test_torn_tail_is_trimmed():
+    store = make_store()
+    store.append(2, '1 day', [bar(13, 10.0), bar(14, 11.0)])
+    # Simulate a crash after only the time column got its next row
+    path = store._dir(2, '1 day')
+    with open(os.path.join(path, 'time.bin'), 'ab') as f:
+        f.write((bar_timestamp(date(2026, 10, 15))).to_bytes(8, 'little'))
+    assert store.count(2, '1 day') == 2
+    store.append(2, '1 day', [bar(15, 12.0)])
+    assert store.count(2, '1 day') == 3
+    sizes = {name: os.path.getsize(os.path.join(path, f"{name}.bin")) for name in ('time', 'close')}
+    assert sizes['time'] == sizes['close'] == 3 * 8
+
+
+def test_query_range_is_inclusive():
+    store = make_store()
+    store.append(3, '1 day', [bar(day, float(day)) for day in range(12, 17)])
+    start, end = bar_timestamp(date(2026, 10, 13)), bar_timestamp(date(2026, 10, 15))
+    assert list(store.query(3, '1 day', start, end)['close']) == [13.0, 14.0, 15.0]
+    assert list(store.query(3, '1 day', end + 1)['close']) == [16.0]
+    assert len(store.query(99, '1 day')['time']) == 0
+
+
+def test_bar_timestamp():
+    assert bar_timestamp(date(1970, 1, 2)) == 86400
+    assert bar_timestamp(datetime(1970, 1, 1, 1, tzinfo=timezone.utc)) == 3600
+
+
+def test_gap_duration_units():
+    assert gap_duration(30, '1 min') == '60 S'
+    assert gap_duration(3600, '5 mins') == '3600 S'
+    assert gap_duration(3 * 86400, '1 min') == '4 D'
+    assert gap_duration(3600, '1 day') == '1 D'
+    assert gap_duration(3 * 86400, '1 day') == '4 D'
+    assert gap_duration(40 * 86400, '1 day') == '6 W'
+    assert gap_duration(400 * 86400, '1 day') == '2 Y'
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
+    print("\n✅ All bar cache tests passed!")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming chain export (CSV always, Arrow/Parquet when pyarrow is installed)
+"""
+import csv
+import math
+import tempfile
+from unittest import SkipTest
+
+from chain_export import COLUMNS, ChainExporter, pa
+
+ROWS = [
+    {'strike': 100.0, 'expiryRaw': '20261023', 'callMid': 2.5, 'callIV': 25.0, 'callDelta': 0.52,
+     'callTheta': -0.04, 'putMid': 2.1, 'putIV': 26.0, 'putDelta': -0.48, 'putTheta': -0.03},
+    {'strike': 105.0, 'expiryRaw': '20261023', 'callMid': 0, 'callIV': 0, 'callDelta': 0.31,
+     'callTheta': -0.03, 'putMid': 5.4, 'putIV': 27.5, 'putDelta': -0.69, 'putTheta': -0.02},
+]
+
+
+def export(fmt, **kwargs):
+    exporter = ChainExporter(tempfile.mkdtemp(), fmt, batch_rows=3, **kwargs)
+    exporter.add_chain('SPY', ROWS, 101.25)
+    exporter.add_chain('SPY', ROWS[:1], 101.5)
+    return exporter.close()
+
+
+def test_csv_export():
+    status = export('csv')
+    assert status['rowsWritten'] == 6 and status['rowsBuffered'] == 0
+    assert len(status['files']) == 1 and status['files'][0].endswith('.csv')
+    with open(status['files'][0]) as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == COLUMNS
+    first = dict(zip(COLUMNS, rows[1]))
+    assert first['symbol'] == 'SPY' and first['right'] == 'C' and float(first['iv']) == 0.25
+    # Zero placeholders from the chain reply are exported as missing
+    second_call = dict(zip(COLUMNS, rows[3]))
+    assert math.isnan(float(second_call['mid'])) and math.isnan(float(second_call['iv']))
+
+
+def test_segments_roll_by_rows():
+    status = export('csv', roll_rows=2)
+    assert len(status['files']) == 2
+    assert sum(1 for path in status['files'] for _ in open(path)) - 2 == 6
+
+
+def test_arrow_export_is_memory_mappable():
+    if pa is None:
+        raise SkipTest("pyarrow is not installed")
+    status = export('arrow')
+    table = pa.ipc.open_file(pa.memory_map(status['files'][0])).read_all()
+    assert table.column_names == COLUMNS
+    assert table.num_rows == 6
+    assert table.column('underlying').to_pylist()[-1] == 101.5
+
+    parquet = export('parquet')
+    assert pa.parquet.read_table(parquet['files'][0], memory_map=True).num_rows == 6
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            try:
+                func()
+            except SkipTest as e:
+                print(f"- {name} skipped: {e}")
+                continue
+            print(f"✓ {name}")
+    print("\n✅ All chain export tests passed!")
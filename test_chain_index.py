@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-underlying strike/expiry index
+"""
+from datetime import datetime
+
+from chain_index import ChainIndex
+
+index = ChainIndex([float(s) for s in range(80, 125, 5)],
+                   ['20261218', '20261023', '20261030', '20261120'])
+
+
+def test_atm_strike():
+    assert index.atm_strike(101) == 100.0
+    assert index.atm_strike(103) == 105.0
+    assert index.atm_strike(10) == 80.0
+    assert index.atm_strike(500) == 120.0
+
+
+def test_strikes_around():
+    assert index.strikes_around(100, 4) == [90.0, 95.0, 100.0, 105.0]
+    assert index.strikes_around(81, 4) == [80.0, 85.0, 90.0, 95.0]
+    assert index.strikes_around(119, 4) == [105.0, 110.0, 115.0, 120.0]
+
+
+def test_expiries_in_window():
+    today = datetime(2026, 10, 19)
+    assert index.expiries_in_window(0, 14, today) == ['20261023', '20261030']
+    assert index.expiries_in_window(30, 90, today) == ['20261120', '20261218']
+    assert index.nearest_expiry(today) == '20261023'
+
+
+def test_strike_for_delta():
+    index.update_deltas('20261023', 'C', {95.0: 0.72, 100.0: 0.52, 105.0: 0.31, 110.0: 0.15})
+    index.update_deltas('20261023', 'P', {95.0: -0.28, 100.0: -0.48, 105.0: -0.69})
+    assert index.strike_for_delta('20261023', 'C', 0.30)['strike'] == 105.0
+    assert index.strike_for_delta('20261023', 'C', 0.50)['strike'] == 100.0
+    assert index.strike_for_delta('20261023', 'P', -0.25)['strike'] == 95.0
+    assert index.strike_for_delta('20261030', 'C', 0.30) is None
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
+    print("\n✅ All chain index tests passed!")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for the precomputed exchange session calendar
+"""
+from datetime import date, datetime
+
+from market_calendar import SessionCalendar, exchange_holidays, early_closes
+
+calendar = SessionCalendar(years=(2025, 2026))
+
+
+def test_holidays():
+    holidays = exchange_holidays(2026)
+    assert date(2026, 4, 3) in holidays    # Good Friday
+    assert date(2026, 7, 3) in holidays    # Independence Day observed (Saturday)
+    assert date(2026, 11, 26) in holidays  # Thanksgiving
+    assert date(2026, 6, 19) in holidays   # Juneteenth
+    # New Year's Day on a Saturday is not observed on the Friday before
+    assert date(2021, 12, 31) not in exchange_holidays(2021)
+
+
+def test_early_closes():
+    assert early_closes(2026, exchange_holidays(2026)) == {date(2026, 11, 27), date(2026, 12, 24)}
+    assert date(2025, 7, 3) in early_closes(2025, exchange_holidays(2025))
+
+
+def test_is_open():
+    assert calendar.is_open(datetime(2026, 10, 19, 9, 30))
+    assert not calendar.is_open(datetime(2026, 10, 19, 9, 29))
+    assert not calendar.is_open(datetime(2026, 10, 19, 16, 0))
+    assert not calendar.is_open(datetime(2026, 10, 17, 11, 0))   # Saturday
+    assert not calendar.is_open(datetime(2026, 11, 26, 11, 0))   # Thanksgiving
+    assert calendar.is_open(datetime(2026, 11, 27, 12, 59))      # Early close day
+    assert not calendar.is_open(datetime(2026, 11, 27, 13, 0))
+    assert calendar.is_open(datetime(2026, 10, 19, 7, 0), extended=True)
+
+
+def test_next_open_and_close():
+    friday_close = datetime(2026, 11, 27, 14, 0)
+    assert calendar.next_open(friday_close).strftime('%Y-%m-%d %H:%M') == '2026-11-30 14:30'
+    assert calendar.next_close(friday_close).strftime('%Y-%m-%d %H:%M') == '2026-11-30 21:00'
+    assert calendar.next_close(datetime(2026, 11, 27, 10, 0)).strftime('%H:%M') == '18:00'
+
+
+def test_status_message():
+    is_open, message = calendar.status(datetime(2026, 7, 3, 10, 0))
+    assert not is_open
+    assert 'holiday' in message
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
+    print("\n✅ All session calendar tests passed!")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for the order journal's replay and its reconcile pass against TWS state
+"""
+import os
+import tempfile
+
+from ib_insync import CommissionReport, Contract, Execution, Fill, Order, OrderStatus, Trade
+
+from order_journal import OrderJournal
+
+
+def new_journal():
+    return OrderJournal(os.path.join(tempfile.mkdtemp(prefix='tt-journal-'), 'order_journal.db'))
+
+
+def open_trade(order_ref, order_id, status='Submitted'):
+    return Trade(order=Order(orderId=order_id, permId=order_id + 1000, orderRef=order_ref),
+                 orderStatus=OrderStatus(orderId=order_id, status=status))
+
+
+def execution(order_ref, order_id, exec_id, shares, price):
+    return Fill(Contract(), Execution(execId=exec_id, orderId=order_id, permId=order_id + 1000,
+                                      orderRef=order_ref, shares=shares, price=price),
+                CommissionReport(), None)
+
+
+def test_replay_folds_events_per_order():
+    journal = new_journal()
+    journal.record('intent', 'TT-1', action='BUY', quantity=2, orderType='LMT')
+    journal.record('submitted', 'TT-1', 7, 1007, conId=123, orderType='LMT')
+    journal.record('fill', 'TT-1', 7, 1007, execId='e1', shares=1, price=1.10)
+    journal.record('fill', 'TT-1', 7, 1007, execId='e2', shares=1, price=1.20)
+    journal.record('status', 'TT-1', 7, 1007, status='Filled', avgFillPrice=1.15)
+    journal.record('intent', 'TT-2', action='SELL', quantity=1, orderType='MKT')
+
+    orders = journal.replay()
+    first = orders['TT-1']
+    assert first['status'] == 'Filled' and first['orderId'] == 7 and first['permId'] == 1007
+    assert first['conId'] == 123 and first['avgFillPrice'] == 1.15 and first['orderType'] == 'LMT'
+    assert [fill['execId'] for fill in first['fills']] == ['e1', 'e2']
+    assert orders['TT-2']['status'] == 'Intent' and 'orderId' not in orders['TT-2']
+
+
+def test_fills_are_journaled_once_across_restarts():
+    journal = new_journal()
+    assert journal.record('fill', 'TT-1', 7, execId='e1', shares=1, price=1.0)
+    assert not journal.record('fill', 'TT-1', 7, execId='e1', shares=1, price=1.0)
+    path = journal.conn.execute('PRAGMA database_list').fetchone()[2]
+    journal.conn.close()
+
+    reopened = OrderJournal(path)
+    assert not reopened.record('fill', 'TT-1', 7, execId='e1', shares=1, price=1.0)
+    assert len(reopened.replay()['TT-1']['fills']) == 1
+
+
+def test_reconcile_classifies_orders():
+    journal = new_journal()
+    for order_ref, order_id in (('TT-OPEN', 1), ('TT-OFFLINE', 2), ('TT-GONE', 3), ('TT-DONE', 4)):
+        journal.record('intent', order_ref, quantity=2)
+        journal.record('submitted', order_ref, order_id, order_id + 1000)
+    journal.record('status', 'TT-DONE', 4, 1004, status='Cancelled')
+
+    summary = journal.reconcile(
+        open_trades=[open_trade('TT-OPEN', 1, 'PreSubmitted'), open_trade('TT-MANUAL', 9)],
+        # TT-OFFLINE filled while the bridge was down; only TWS's executions know it
+        fills=[execution('TT-OFFLINE', 2, 'x1', 1, 2.0), execution('TT-OFFLINE', 2, 'x2', 1, 2.1)])
+
+    assert summary['open'] == ['TT-OPEN']
+    assert summary['filled'] == ['TT-OFFLINE']
+    assert summary['closed'] == ['TT-DONE']
+    assert summary['missing'] == ['TT-GONE']      # journal says live, TWS has no such order
+    assert summary['untracked'] == ['TT-MANUAL']  # open in TWS, never journaled
+
+    orders = journal.replay()
+    assert orders['TT-OPEN']['status'] == 'PreSubmitted'
+    assert [fill['execId'] for fill in orders['TT-OFFLINE']['fills']] == ['x1', 'x2']
+
+    # A second pass over the same TWS state changes nothing
+    again = journal.reconcile([open_trade('TT-OPEN', 1, 'PreSubmitted')],
+                              [execution('TT-OFFLINE', 2, 'x1', 1, 2.0)])
+    assert again['filled'] == ['TT-OFFLINE'] and len(journal.replay()['TT-OFFLINE']['fills']) == 2
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
+    print("\n✅ All order journal tests passed!")
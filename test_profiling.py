@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for on-demand profiling and tracing spans
+"""
+import json
+import os
+import pstats
+import tempfile
+import time
+
+import profiling
+from profiling import ProfileSession, span, start_tracing, stop_tracing
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+
+def test_cprofile_session_writes_pstats():
+    session = ProfileSession(tempfile.mkdtemp(), 'cprofile', seconds=1000)
+    assert session.seconds == profiling.MAX_PROFILE_SECONDS and not session.expired()
+    busy(0.02)
+    result = session.stop()
+    assert result['path'].endswith('.pstats') and os.path.exists(result['path'])
+    stats = pstats.Stats(result['path'])
+    assert any(func[2] == 'busy' for func in stats.stats)
+
+
+def test_sampling_session_writes_collapsed_stacks():
+    session = ProfileSession(tempfile.mkdtemp(), 'sample', seconds=0.05, interval=0.001)
+    busy(0.1)
+    assert session.expired()
+    result = session.stop()
+    assert result['samples'] > 0
+    with open(result['path']) as f:
+        lines = f.read().splitlines()
+    assert lines and all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    assert any('busy (test_profiling.py' in line for line in lines)
+
+
+def test_unknown_mode_is_rejected():
+    try:
+        ProfileSession(tempfile.mkdtemp(), 'perf')
+        assert False
+    except ValueError:
+        pass
+
+
+def test_spans_export_chrome_trace():
+    with span('ignored'):
+        pass
+    start_tracing(max_events=2)
+    with span('outer', 'command', requestId=7):
+        with span('inner', 'place_order'):
+            busy(0.002)
+    with span('last'):
+        pass
+    path = os.path.join(tempfile.mkdtemp(), 'trace.json')
+    assert stop_tracing(path) == 2
+    with open(path) as f:
+        events = json.load(f)['traceEvents']
+    assert [event['name'] for event in events] == ['outer', 'last']
+    outer = events[0]
+    assert outer['ph'] == 'X' and outer['args'] == {'requestId': 7} and outer['dur'] >= 2000
+    with span('after'):
+        pass
+    assert not profiling.tracing['events']
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
+    print("\n✅ All profiling tests passed!")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared-memory seqlock quote board
+"""
+import math
+import os
+import tempfile
+
+from quote_board import QuoteBoard, QuoteBoardReader
+
+
+def make_board(capacity=4):
+    path = os.path.join(tempfile.mkdtemp(), 'quotes')
+    return QuoteBoard(path, capacity), path
+
+
+def test_write_and_read_back():
+    board, path = make_board()
+    board.write(756733, 'SPY', {'bid': 501.1, 'ask': 501.2, 'mark': 501.15})
+    board.write(756733, 'SPY', {'position': 100, 'avgCost': 498.0})
+    reader = QuoteBoardReader(path)
+    row = reader.read(756733)
+    assert row['symbol'] == 'SPY' and row['bid'] == 501.1 and row['position'] == 100
+    assert row['seq'] == 4 and row['seq'] % 2 == 0
+    assert math.isnan(row['delta'])
+    assert reader.read(1) is None
+
+
+def test_reader_sees_new_slots_and_updates():
+    board, path = make_board()
+    reader = QuoteBoardReader(path)
+    assert len(reader.snapshot()) == 0
+    board.write(1, 'AAA', {'last': 10.0})
+    board.write(2, 'BBB', {'last': 20.0})
+    snapshot = reader.snapshot()
+    assert list(snapshot['conId']) == [1, 2] and list(snapshot['last']) == [10.0, 20.0]
+    board.write(2, 'BBB', {'last': 21.0})
+    assert reader.read(2)['last'] == 21.0
+
+
+def test_torn_slot_is_not_returned():
+    board, path = make_board()
+    board.write(1, 'AAA', {'last': 10.0})
+    reader = QuoteBoardReader(path)
+    board.slots['seq'][0] += 1  # writer mid-update
+    assert reader.read(1, retries=3) is None
+    board.slots['seq'][0] += 1
+    assert reader.read(1)['last'] == 10.0
+
+
+def test_capacity_is_bounded():
+    board, _ = make_board(capacity=2)
+    assert board.write(1, 'A', {'last': 1.0}) and board.write(2, 'B', {'last': 2.0})
+    assert not board.write(3, 'C', {'last': 3.0})
+    assert not board.write(0, 'unqualified', {'last': 3.0})
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
+    print("\n✅ All quote board tests passed!")
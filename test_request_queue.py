@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests for the prioritized, cancellable bridge request queue
+"""
+import queue
+
+from request_queue import RequestQueue
+
+
+def drain(requests):
+    order = []
+    while True:
+        try:
+            request = requests.get_nowait()
+        except queue.Empty:
+            return order
+        order.append((request.request_id, request.cancelled))
+        requests.finish(request)
+
+
+def test_orders_run_ahead_of_data():
+    requests = RequestQueue()
+    requests.put({'type': 'get_option_chain', 'requestId': 1, 'data': {'ticker': 'SPY', 'view': 'a'}})
+    requests.put({'type': 'get_ticker_price', 'requestId': 2})
+    requests.put({'type': 'close_position', 'requestId': 3})
+    requests.put({'type': 'get_balance', 'requestId': 4, 'priority': 'high'})
+    assert [rid for rid, _ in drain(requests)] == [3, 4, 2, 1]
+
+
+def test_orders_cannot_be_demoted():
+    requests = RequestQueue()
+    requests.put({'type': 'get_positions', 'requestId': 1})
+    requests.put({'type': 'place_order', 'requestId': 2, 'priority': 'low'})
+    requests.put({'type': 'batch', 'requestId': 3, 'data': {'commands': [{'type': 'close_all_positions'}]}})
+    assert [rid for rid, _ in drain(requests)] == [2, 3, 1]
+
+
+def test_cancel_queued_and_running():
+    requests = RequestQueue()
+    running = requests.put({'type': 'get_option_chain', 'requestId': 1, 'data': {'ticker': 'SPY'}})
+    assert requests.get_nowait() is running
+    requests.put({'type': 'get_historical_bars', 'requestId': 2})
+
+    ack = requests.put({'type': 'cancel', 'requestId': 3, 'data': {'requestId': 1}})
+    assert ack.found and running.cancel_event.is_set()
+    requests.finish(running)
+
+    requests.put({'type': 'cancel', 'requestId': 4, 'data': {'requestId': 2}})
+    missing = requests.put({'type': 'cancel', 'requestId': 5, 'data': {'requestId': 99}})
+    assert not missing.found
+    # The cancelled queued request is answered first, then the acks
+    assert drain(requests) == [(2, True), (3, False), (4, False), (5, False)]
+
+
+def test_supersede_same_view():
+    requests = RequestQueue()
+    stale = requests.put({'type': 'get_option_chain', 'requestId': 1, 'data': {'ticker': 'SPY'}})
+    requests.put({'type': 'get_option_chain', 'requestId': 2, 'data': {'ticker': 'QQQ'}})
+    other = requests.put({'type': 'get_option_chain', 'requestId': 3, 'data': {'ticker': 'IWM', 'view': 'x'}})
+    assert stale.cancelled and stale.cancel_reason == 'superseded by 2'
+    assert not other.cancelled
+    assert drain(requests) == [(1, True), (2, False), (3, False)]
+
+
+def test_owners_are_isolated():
+    requests = RequestQueue()
+    a, b = object(), object()
+    mine = requests.put({'type': 'get_option_chain', 'requestId': 1, 'data': {}}, owner=a)
+    theirs = requests.put({'type': 'get_option_chain', 'requestId': 1, 'data': {}}, owner=b)
+    assert not mine.cancelled
+    requests.cancel_owner(b)
+    assert theirs.cancelled and not mine.cancelled
+    assert len(requests) == 2
+
+
+def test_identical_requests_share_one_flight():
+    requests = RequestQueue()
+    leader = requests.put({'type': 'validate_ticker', 'requestId': 1, 'data': {'ticker': 'spy'}})
+    follower = requests.put({'type': 'validate_ticker', 'requestId': 2, 'data': {'ticker': ' SPY '}})
+    other = requests.put({'type': 'validate_ticker', 'requestId': 3, 'data': {'ticker': 'QQQ'}})
+    assert follower.state == 'attached' and other.state == 'queued'
+
+    assert requests.get_nowait() is leader
+    requests.finish(leader, {'success': True, 'message': 'SPY is valid'})
+    assert requests.get_nowait() is follower
+    assert follower.result == {'success': True, 'message': 'SPY is valid'}
+    requests.finish(follower)
+
+    # Within the TTL a repeat is answered from the cached result
+    repeat = requests.put({'type': 'validate_ticker', 'requestId': 4, 'data': {'ticker': 'SPY'}})
+    assert repeat.result['message'] == 'SPY is valid'
+    assert drain(requests) == [(4, False), (3, False)]
+
+
+def test_failed_results_are_not_cached():
+    requests = RequestQueue(result_ttl={'get_ticker_price': 60.0})
+    first = requests.put({'type': 'get_ticker_price', 'requestId': 1, 'data': {'ticker': 'SPY'}})
+    requests.get_nowait()
+    requests.finish(first, {'success': False, 'message': 'timeout'})
+    again = requests.put({'type': 'get_ticker_price', 'requestId': 2, 'data': {'ticker': 'SPY'}})
+    assert again.result is None and again.state == 'queued'
+
+
+def test_cancelled_leader_hands_off_to_follower():
+    requests = RequestQueue()
+    leader = requests.put({'type': 'get_ticker_price', 'requestId': 1, 'data': {'ticker': 'SPY'}})
+    follower = requests.put({'type': 'get_ticker_price', 'requestId': 2, 'data': {'ticker': 'SPY'}})
+    requests.cancel(None, 1)
+    assert leader.cancelled and follower.state == 'queued'
+    assert drain(requests) == [(1, True), (2, False)]
+
+
+def test_same_chain_for_view_is_shared_not_superseded():
+    requests = RequestQueue()
+    first = requests.put({'type': 'get_option_chain', 'requestId': 1, 'data': {'ticker': 'SPY'}})
+    again = requests.put({'type': 'get_option_chain', 'requestId': 2, 'data': {'ticker': 'SPY'}})
+    assert not first.cancelled and again.state == 'attached'
+    newer = requests.put({'type': 'get_option_chain', 'requestId': 3, 'data': {'ticker': 'QQQ'}})
+    assert first.cancelled and again.cancelled and not newer.cancelled
+    assert drain(requests) == [(1, True), (2, True), (3, False)]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
+    print("\n✅ All request queue tests passed!")
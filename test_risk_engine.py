@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for incremental portfolio greeks
+"""
+from ib_insync import Option, Order
+
+import tws_bridge
+from risk_engine import RiskEngine
+from sim_broker import SimulatedIB
+from soak_harness import bridge_session
+
+
+def test_aggregates_per_underlying_and_account():
+    engine = RiskEngine()
+    engine.update_position(1, 'SPY', 'STK', 100)
+    engine.update_position(2, 'SPY', 'OPT', -2, 100)
+    engine.update_greeks(2, delta=0.4, gamma=0.02, theta=-0.05, vega=0.1)
+    engine.update_position(3, 'QQQ', 'OPT', 1, 100)
+    engine.update_greeks(3, delta=-0.3, vega=0.2)
+    snapshot = engine.snapshot()
+    assert snapshot['underlyings']['SPY'] == {'delta': 20.0, 'gamma': -4.0, 'theta': 10.0, 'vega': -20.0}
+    assert snapshot['underlyings']['QQQ']['delta'] == -30.0
+    assert snapshot['account']['delta'] == -10.0 and snapshot['account']['vega'] == 0.0
+
+
+def test_leg_changes_replace_only_their_contribution():
+    engine = RiskEngine()
+    engine.update_position(2, 'SPY', 'OPT', 1, 100)
+    engine.update_greeks(2, delta=0.5)
+    engine.update_greeks(2, delta=float('nan'), gamma=0.01)  # NaN keeps the last value
+    assert engine.snapshot()['account']['delta'] == 50.0 and engine.snapshot()['account']['gamma'] == 1.0
+    engine.update_position(2, 'SPY', 'OPT', 3, 100)
+    assert engine.snapshot()['account']['delta'] == 150.0
+    engine.update_position(2, 'SPY', 'OPT', 0, 100)
+    assert engine.legs == {} and engine.snapshot()['underlyings'] == {}
+    assert engine.snapshot()['account']['delta'] == 0.0
+    engine.update_greeks(99, delta=1.0)  # unknown legs are ignored
+    assert engine.version == 5
+
+
+def test_position_opened_after_startup_streams_greeks():
+    sim = SimulatedIB(seed=5, speed=1e6)
+    sim.connect()
+    option = Option('SPY', sim.expirations()[1], sim.strikes('SPY')[20], 'C', 'SMART')
+    sim.qualifyContracts(option)
+
+    with bridge_session(ib=sim, risk_engine=RiskEngine()):
+        tws_bridge.risk_tickers.clear()
+        tws_bridge.start_risk_engine()
+
+        # Inside an ib_insync event handler the blocking calls raise; the hook must not need them
+        def running_loop(*contracts):
+            raise RuntimeError('This event loop is already running')
+        sim.qualifyContracts = running_loop
+        sim.placeOrder(option, Order(action='BUY', orderType='MKT', totalQuantity=2))
+        sim.sleep(1)
+
+        assert option.conId in tws_bridge.risk_tickers
+        greeks = tws_bridge.get_portfolio_greeks()['underlyings']['SPY']
+        assert 0 < greeks['delta'] < 200 and greeks['vega'] > 0
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
+    print("\n✅ All risk engine tests passed!")
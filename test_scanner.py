@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for scanner result diffing
+"""
+from types import SimpleNamespace
+
+from scanner import ScanRanking, scan_row
+
+
+def row(con_id, rank, symbol=None, distance=''):
+    return {'conId': con_id, 'symbol': symbol or f'S{con_id}', 'secType': 'STK', 'exchange': 'NASDAQ',
+            'rank': rank, 'distance': distance, 'benchmark': '', 'projection': ''}
+
+
+def test_first_update_adds_everything_in_rank_order():
+    ranking = ScanRanking()
+    changes = ranking.update([row(2, 1), row(1, 0)])
+    assert changes['version'] == 1
+    assert [r['conId'] for r in changes['added']] == [1, 2]
+    assert changes['removed'] == [] and changes['changed'] == []
+
+
+def test_only_changes_are_reported():
+    ranking = ScanRanking()
+    ranking.update([row(1, 0), row(2, 1), row(3, 2)])
+    assert ranking.update([row(1, 0), row(2, 1), row(3, 2)]) is None
+    assert ranking.version == 1
+
+    changes = ranking.update([row(3, 0), row(1, 1), row(4, 2)])
+    assert changes['version'] == 2
+    assert [r['conId'] for r in changes['added']] == [4]
+    assert changes['removed'] == [{'conId': 2, 'symbol': 'S2', 'rank': 1}]
+    assert [(c['conId'], c['previousRank'], c['rank']) for c in changes['changed']] == [(3, 2, 0), (1, 0, 1)]
+    assert [r['conId'] for r in ranking.ranked()] == [3, 1, 4]
+
+
+def test_value_change_without_rank_move():
+    ranking = ScanRanking()
+    ranking.update([row(1, 0, distance='1.5')])
+    changes = ranking.update([row(1, 0, distance='2.5')])
+    assert changes['changed'][0]['distance'] == '2.5' and changes['changed'][0]['previousRank'] == 0
+
+
+def test_scan_row_from_scan_data():
+    contract = SimpleNamespace(conId=265598, symbol='AAPL', secType='STK', primaryExchange='NASDAQ',
+                               exchange='SMART')
+    data = SimpleNamespace(rank=3, contractDetails=SimpleNamespace(contract=contract),
+                           distance='', benchmark='', projection='', legsStr='')
+    assert scan_row(data) == {'conId': 265598, 'symbol': 'AAPL', 'secType': 'STK', 'exchange': 'NASDAQ',
+                              'rank': 3, 'distance': '', 'benchmark': '', 'projection': ''}
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
+    print("\n✅ All scanner tests passed!")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the Black-Scholes pricer and the what-if P&L grid
+"""
+import math
+
+import numpy as np
+
+import scenario
+from scenario import black_scholes, norm_cdf, scenario_grid
+
+SPOT_SHOCKS = [-0.10, -0.05, 0.0, 0.05, 0.10]
+VOL_SHOCKS = [-0.05, 0.0, 0.05]
+DAYS_FORWARD = [0, 7, 30]
+
+
+def test_norm_cdf_matches_erf():
+    x = np.linspace(-6.0, 6.0, 241)
+    exact = np.array([0.5 * (1.0 + math.erf(v / math.sqrt(2.0))) for v in x])
+    assert np.max(np.abs(norm_cdf(x) - exact)) < 1.5e-7
+    assert norm_cdf(0.0) == 0.5
+    assert np.allclose(norm_cdf(x) + norm_cdf(-x), 1.0)
+
+
+def test_black_scholes_known_value():
+    assert round(float(black_scholes(100.0, 100.0, 1.0, 0.20, 0.04, True)), 3) == 9.925
+    # Expired legs price at intrinsic
+    assert float(black_scholes(110.0, 100.0, 0.0, 0.20, 0.04, True)) == 10.0
+    assert float(black_scholes(110.0, 100.0, -0.1, 0.20, 0.04, False)) == 0.0
+
+
+def test_put_call_parity():
+    spot = np.array([80.0, 95.0, 100.0, 105.0, 130.0])
+    strike, years, vol, rate = 100.0, 0.5, 0.35, 0.04
+    call = black_scholes(spot, strike, years, vol, rate, True)
+    put = black_scholes(spot, strike, years, vol, rate, False)
+    assert np.allclose(call - put, spot - strike * math.exp(-rate * years), atol=1e-5)
+
+
+def random_legs(count, seed=3):
+    rng = np.random.default_rng(seed)
+    legs = []
+    for i in range(count):
+        spot = float(rng.uniform(20, 500))
+        if i % 10 == 0:
+            legs.append({'spot': spot, 'position': float(rng.integers(-200, 200)), 'right': ''})
+            continue
+        legs.append({'spot': spot, 'strike': round(spot * float(rng.uniform(0.8, 1.2))),
+                     'years': float(rng.uniform(0.01, 2.0)), 'iv': float(rng.uniform(0.1, 0.9)),
+                     'right': 'C' if i % 2 else 'P', 'position': float(rng.integers(-10, 10)),
+                     'multiplier': 100.0})
+    return legs
+
+
+def test_grid_shape_and_zero_shock():
+    grid = scenario_grid(random_legs(20), SPOT_SHOCKS, VOL_SHOCKS, DAYS_FORWARD)
+    assert grid.shape == (5, 3, 3)
+    assert abs(grid[2, 1, 0]) < 1e-6
+    assert scenario_grid([], SPOT_SHOCKS, VOL_SHOCKS, DAYS_FORWARD).shape == (5, 3, 3)
+
+    stock = scenario_grid([{'spot': 100.0, 'position': 10, 'right': ''}], SPOT_SHOCKS, VOL_SHOCKS, DAYS_FORWARD)
+    assert np.allclose(stock[:, 1, 0], [-100.0, -50.0, 0.0, 50.0, 100.0])
+
+
+def test_process_pool_matches_serial():
+    legs = random_legs(scenario.POOL_THRESHOLD + 200)
+    try:
+        pooled = scenario_grid(legs, SPOT_SHOCKS, VOL_SHOCKS, DAYS_FORWARD)
+        assert scenario._pool is not None
+        assert scenario._pool._mp_context.get_start_method() == 'spawn'
+        serial = scenario_grid(legs[:scenario.POOL_THRESHOLD - 1], SPOT_SHOCKS, VOL_SHOCKS, DAYS_FORWARD) + \
+            scenario_grid(legs[scenario.POOL_THRESHOLD - 1:], SPOT_SHOCKS, VOL_SHOCKS, DAYS_FORWARD)
+        assert np.allclose(pooled, serial, rtol=1e-9, atol=1e-6)
+    finally:
+        if scenario._pool is not None:
+            scenario._pool.shutdown()
+            scenario._pool = None
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
+    print("\n✅ All scenario tests passed!")
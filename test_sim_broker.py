@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Tests for the simulated broker's matching engine and the bridge order paths on it
+"""
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from ib_insync import Option, Order
+
+import option_chain_ibapi
+import order_benchmark
+import tws_bridge
+from chain_export import ChainExporter
+from sim_broker import SimulatedIB, parse_settings
+from soak_harness import bridge_session
+from vol_surface import VolSurface
+
+
+def make_sim(**settings):
+    sim = SimulatedIB(seed=7, speed=1e6, **settings)
+    sim.connect()
+    contract = Option('SPY', sim.expirations()[1], sim.strikes('SPY')[20], 'C', 'SMART')
+    sim.qualifyContracts(contract)
+    return sim, contract
+
+
+def run_until(sim, condition, step=0.05, limit=10000):
+    for _ in range(limit):
+        if condition():
+            return True
+        sim.sleep(step)
+    return False
+
+
+def test_latency_and_partial_fills():
+    sim, contract = make_sim(ack_latency=0.1, fill_latency=0.2, max_fill_size=2)
+    trade = sim.placeOrder(contract, Order(action='BUY', orderType='MKT', totalQuantity=5))
+    assert trade.orderStatus.status == 'PendingSubmit'
+    sim.sleep(0.15)
+    assert trade.orderStatus.status == 'Submitted' and not trade.fills
+    assert run_until(sim, trade.isDone)
+    assert [fill.execution.shares for fill in trade.fills] == [2, 2, 1]
+    assert trade.orderStatus.status == 'Filled' and sim.positions()[0].position == 5
+    assert 'PartiallyFilled' in [entry.status for entry in trade.log]
+
+
+def test_rejections_cancel_with_error_201():
+    sim, contract = make_sim()
+    errors = []
+    sim.errorEvent += lambda *args: errors.append(args)
+    trade = sim.placeOrder(contract, Order(action='BUY', orderType='LMT', totalQuantity=1))
+    assert trade.orderStatus.status == 'Cancelled' and trade.log[-1].errorCode == 201
+    assert errors[0][:2] == (trade.order.orderId, 201)
+
+    sim, contract = make_sim(reject_rate=1.0)
+    trade = sim.placeOrder(contract, Order(action='BUY', orderType='MKT', totalQuantity=1))
+    assert trade.orderStatus.status == 'Cancelled' and not trade.fills
+
+
+def test_cancel_before_acknowledgement():
+    sim, contract = make_sim(ack_latency=0.5)
+    trade = sim.placeOrder(contract, Order(action='BUY', orderType='MKT', totalQuantity=1))
+    sim.cancelOrder(trade.order)
+    assert trade.orderStatus.status == 'PendingCancel'
+    sim.sleep(1.0)
+    assert trade.orderStatus.status == 'Cancelled' and not trade.fills and not sim.positions()
+
+
+def test_oca_group_cancels_the_other_leg():
+    sim, contract = make_sim()
+    entry = sim.placeOrder(contract, Order(action='BUY', orderType='MKT', totalQuantity=2))
+    price = entry.orderStatus.avgFillPrice
+    stop = sim.placeOrder(contract, Order(action='SELL', orderType='STP', totalQuantity=2,
+                                          auxPrice=round(price * 0.98, 2), ocaGroup='bracket', ocaType=1))
+    target = sim.placeOrder(contract, Order(action='SELL', orderType='LMT', totalQuantity=2,
+                                            lmtPrice=round(price * 1.02, 2), ocaGroup='bracket', ocaType=1))
+    assert stop.orderStatus.status == target.orderStatus.status == 'Submitted'
+    assert run_until(sim, lambda: stop.isDone() and target.isDone(), step=5)
+    filled, cancelled = (stop, target) if stop.orderStatus.status == 'Filled' else (target, stop)
+    assert filled.orderStatus.status == 'Filled' and cancelled.orderStatus.status == 'Cancelled'
+    assert 'OCA group bracket' in cancelled.log[-1].message
+    assert not sim.positions()
+
+
+def test_oca_reduce_quantity():
+    sim, contract = make_sim()
+    first = sim.placeOrder(contract, Order(action='BUY', orderType='LMT', totalQuantity=3, lmtPrice=1e6,
+                                           ocaGroup='reduce', ocaType=2, transmit=True))
+    assert first.orderStatus.status == 'Filled'
+    sim, contract = make_sim()
+    resting = sim.placeOrder(contract, Order(action='BUY', orderType='LMT', totalQuantity=3, lmtPrice=0.01,
+                                             ocaGroup='reduce', ocaType=2))
+    sim.placeOrder(contract, Order(action='BUY', orderType='MKT', totalQuantity=2, ocaGroup='reduce', ocaType=2))
+    assert resting.orderStatus.status == 'Submitted' and resting.orderStatus.remaining == 1
+
+
+def test_parse_settings():
+    assert parse_settings('default') == {}
+    assert parse_settings('fill_latency=0.2,max-fill-size=1,seed=3') == {
+        'fill_latency': 0.2, 'max_fill_size': 1, 'seed': 3}
+    try:
+        parse_settings('latency')
+        assert False
+    except ValueError:
+        pass
+
+
+def brackets_for(action, fill_price):
+    sim, contract = make_sim()
+    with bridge_session(ib=sim):
+        tws_bridge.place_bracket_orders(contract, action, 2, fill_price, '20', '50', [(0.0, 0.01)], 'TT-TEST')
+    return {trade.order.orderType: trade for trade in sim.trades()}
+
+
+def test_bracket_prices_follow_the_entry_direction():
+    long_exits = brackets_for('BUY', 2.00)
+    assert long_exits['STP'].order.action == long_exits['LMT'].order.action == 'SELL'
+    assert long_exits['STP'].order.auxPrice == 1.60 and long_exits['LMT'].order.lmtPrice == 3.00
+
+    short_exits = brackets_for('SELL', 2.00)
+    assert short_exits['STP'].order.action == short_exits['LMT'].order.action == 'BUY'
+    assert short_exits['STP'].order.auxPrice == 2.40 and short_exits['LMT'].order.lmtPrice == 1.00
+    assert short_exits['STP'].order.ocaGroup == short_exits['LMT'].order.ocaGroup
+
+    # Net-credit combo fills: percentages apply to the magnitude
+    credit_exits = brackets_for('SELL', -1.00)
+    assert credit_exits['STP'].order.auxPrice == -0.80 and credit_exits['LMT'].order.lmtPrice == -1.50
+
+
+def test_bracket_exits_are_journaled_and_reconciled():
+    sim, contract = make_sim()
+    journal_path = os.path.join(tempfile.mkdtemp(prefix='tt-journal-'), 'order_journal.db')
+    with bridge_session(ib=sim, JOURNAL_PATH=journal_path):
+        tws_bridge.start_order_journal()
+        tws_bridge.place_bracket_orders(contract, 'BUY', 2, 1.00, '50', '400', [(0.0, 0.01)], 'TT-ENTRY')
+        summary = tws_bridge.order_journal.reconcile(sim.openTrades(), sim.fills())
+        orders = tws_bridge.order_journal.replay()
+    assert sorted(trade.order.orderRef for trade in sim.openTrades()) == ['TT-ENTRY-SL', 'TT-ENTRY-TP']
+    assert sorted(summary['open']) == ['TT-ENTRY-SL', 'TT-ENTRY-TP']
+    assert not summary['missing'] and not summary['untracked']
+    assert orders['TT-ENTRY-SL']['status'] == orders['TT-ENTRY-TP']['status'] == 'Submitted'
+    assert orders['TT-ENTRY-SL']['parentRef'] == 'TT-ENTRY'
+
+
+def test_partial_fill_cut_short_is_bracketed_for_the_filled_quantity():
+    sim, contract = make_sim(fill_latency=0.03, max_fill_size=1)
+    with bridge_session(ib=sim, sim_settings={}):
+        tws_bridge.quote_cache.clear()
+        # Marketable at once, one contract per 0.03s, cancelled at the first deadline check
+        result = tws_bridge.place_order('BUY', 'SPY', 5, contract.lastTradeDateOrContractMonth, contract.strike,
+                                        'C', '20', '50', {'mode': 'limit', 'offset': 1000, 'deadline': 0})
+    entry = next(trade for trade in sim.trades() if not trade.order.ocaGroup)
+    filled = int(entry.orderStatus.filled)
+    assert entry.orderStatus.status == 'Cancelled' and 0 < filled < 5
+    assert result['success'] and result['filledQuantity'] == filled
+    assert result['execution']['status'] == 'Cancelled'
+    assert f"{filled} of 5" in result['message']
+    exits = [trade for trade in sim.trades() if trade.order.ocaGroup]
+    assert len(exits) == 2 and all(trade.order.totalQuantity == filled for trade in exits)
+
+
+def test_quote_lines_are_bounded():
+    sim, contract = make_sim()
+    contracts = []
+    for strike in sim.strikes('SPY')[:tws_bridge.MAX_QUOTE_LINES + 3]:
+        option = Option('SPY', contract.lastTradeDateOrContractMonth, strike, 'C', 'SMART')
+        sim.qualifyContracts(option)
+        contracts.append(option)
+    with bridge_session(ib=sim):
+        tws_bridge.quote_cache.clear()
+        for option in contracts[:-1]:
+            tws_bridge.get_quote(option, wait=0)
+        tws_bridge.get_quote(contracts[2], wait=0)  # most recently used again
+        tws_bridge.get_quote(contracts[-1], wait=0)
+        assert len(tws_bridge.quote_cache) == len(sim.tickers()) == tws_bridge.MAX_QUOTE_LINES
+        assert contracts[2].conId in tws_bridge.quote_cache
+        assert contracts[0].conId not in tws_bridge.quote_cache and contracts[3].conId not in tws_bridge.quote_cache
+
+
+def supervised():
+    tws_bridge.supervise_connection()
+    return tws_bridge.connection_state['state']
+
+
+def test_first_connect_is_retried_by_the_supervisor():
+    messages = []
+    journal_path = os.path.join(tempfile.mkdtemp(prefix='tt-journal-'), 'order_journal.db')
+    with bridge_session(sim_settings={'seed': 7, 'speed': 1e6}, watchlist=['SPY'], JOURNAL_PATH=journal_path,
+                        response_sink=lambda line: messages.append(json.loads(line))):
+        sim = tws_bridge.create_client()
+        connect = sim.connect
+        refusals = [ConnectionRefusedError(111, 'Connect call failed')]
+
+        def flaky_connect(*args, **kwargs):
+            if refusals:
+                raise refusals.pop()
+            return connect(*args, **kwargs)
+
+        sim.connect = flaky_connect
+        # The attempt runs on the event loop; the supervisor returns without waiting for it
+        assert supervised() == 'disconnected' and tws_bridge.connection_state['pending'] is not None
+        assert run_until(sim, lambda: supervised() and messages)
+        assert messages[0]['success'] is False
+        assert messages[1] == {'event': 'connection_state', 'state': 'disconnected', 'retryIn': 2.0}
+        assert tws_bridge.order_journal is None and not tws_bridge.ticker_cache
+
+        tws_bridge.connection_state['nextAttempt'] = 0
+        assert run_until(sim, lambda: supervised() == 'connected')
+        assert messages[2] == {'success': True, 'message': 'Connected to TWS'}
+        assert [message.get('event') for message in messages[3:]] == ['ready', 'journal_reconciled',
+                                                                      'connection_state']
+        assert tws_bridge.order_journal is not None and list(tws_bridge.ticker_cache) == ['SPY']
+
+        # Later drops restore the session instead of starting it again
+        del messages[:]
+        sim.disconnect()
+        tws_bridge.connection_state['delay'] = 0
+        assert run_until(sim, lambda: supervised() == 'disconnected' and messages)
+        tws_bridge.connection_state['nextAttempt'] = 0
+        assert run_until(sim, lambda: supervised() == 'connected')
+        assert messages[-1]['restoredSubscriptions'] == 1
+        assert 'ready' not in [message.get('event') for message in messages]
+
+
+def test_quote_lines_are_renewed_after_a_reconnect():
+    sim, contract = make_sim()
+    with bridge_session(ib=sim):
+        tws_bridge.quote_cache.clear()
+        tws_bridge.connection_state.update(state='connected', started=True)
+        stale = tws_bridge.get_quote(contract, wait=0)
+        sim.disconnect()
+        tws_bridge.supervise_connection()
+        assert tws_bridge.connection_state['state'] == 'disconnected'
+        tws_bridge.connection_state['nextAttempt'] = 0
+        assert run_until(sim, lambda: supervised() == 'connected')
+
+        quote = tws_bridge.quote_cache[contract.conId]
+        assert quote is not stale and quote in sim.tickers()
+        for _ in range(3):
+            sim.sleep(60)
+        assert quote.time > stale.time  # only the renewed line still ticks
+        assert tws_bridge.get_quote(contract, wait=0) is quote
+
+
+def test_batch_runs_in_submitted_order():
+    sim, contract = make_sim()
+    order = {'action': 'BUY', 'ticker': 'SPY', 'quantity': 3, 'expiry': contract.lastTradeDateOrContractMonth,
+             'strike': contract.strike, 'optionType': 'C'}
+    with bridge_session(ib=sim, sim_settings={}, position_table=tws_bridge.PositionTable()):
+        result = tws_bridge.run_batch([{'id': 'order', 'type': 'place_order', 'data': order},
+                                       {'id': 'positions', 'type': 'get_positions'},
+                                       {'id': 'balance', 'type': 'get_balance'}])
+    assert list(result['results']) == ['order', 'positions', 'balance']
+    assert result['results']['order']['success']
+    assert [row['position'] for row in result['results']['positions']['positions']] == [3.0]
+
+
+def test_batch_passes_its_cancel_to_sub_commands():
+    cancel_event = threading.Event()
+
+    def chain_cancelled_midway(ticker, host, port, client_id, cancel_event=None):
+        cancel_event.set()  # as a cancel from the client would while the chain loads
+        return {'success': False, 'cancelled': True, 'message': 'cancelled', 'optionChain': []}
+
+    sim, _ = make_sim()
+    fetch = option_chain_ibapi.get_option_chain_ibapi
+    option_chain_ibapi.get_option_chain_ibapi = chain_cancelled_midway
+    try:
+        with bridge_session(ib=sim):
+            result = tws_bridge.execute_command('batch', {'commands': [
+                {'id': 'chain', 'type': 'get_option_chain', 'data': {'ticker': 'SPY'}},
+                {'id': 'positions', 'type': 'get_positions'}]}, 1, cancel_event)
+    finally:
+        option_chain_ibapi.get_option_chain_ibapi = fetch
+    assert not result['success']
+    assert result['results']['chain']['cancelled'] and result['results']['positions']['cancelled']
+
+
+def test_vol_surfaces_share_the_line_budget():
+    sim, _ = make_sim()
+    with bridge_session(ib=sim, MARKET_DATA_LINES=200):
+        for cache in (tws_bridge.ticker_cache, tws_bridge.risk_tickers, tws_bridge.quote_cache,
+                      tws_bridge.vol_surfaces):
+            cache.clear()
+        assert tws_bridge.build_vol_surface('SPY', timeout=0)['success']
+        assert tws_bridge.build_vol_surface('QQQ', timeout=0)['success']
+        assert tws_bridge.market_data_lines() == len(sim.tickers()) == 162
+
+        # SPY was used last, so QQQ is released to make room for IWM
+        tws_bridge.get_implied_vol('SPY', 250, sim.expirations()[1])
+        assert tws_bridge.build_vol_surface('IWM', timeout=0)['success']
+        assert list(tws_bridge.vol_surfaces) == ['SPY', 'IWM']
+        assert tws_bridge.market_data_lines() == len(sim.tickers()) == 163
+
+        # Nothing left to release: the surface is cut to the free lines
+        tws_bridge.MARKET_DATA_LINES = 50
+        assert tws_bridge.build_vol_surface('IWM', timeout=0)['success']
+        assert list(tws_bridge.vol_surfaces) == ['IWM']
+        assert len(tws_bridge.vol_surfaces['IWM']['tickers']) == 47
+
+        assert tws_bridge.release_vol_surface('iwm')['lines'] == 47
+        assert not tws_bridge.vol_surfaces and len(sim.tickers()) == 3
+        assert not tws_bridge.release_vol_surface('IWM')['success']
+
+
+def chain_reply(ticker, *args):
+    rows = [{'strike': strike, 'expiryRaw': '20261120', 'callMid': 2.0, 'callIV': 25.0 + i, 'callDelta': 0.5,
+             'callTheta': -0.03, 'putMid': 2.0, 'putIV': 26.0 + i, 'putDelta': -0.5, 'putTheta': -0.03}
+            for i, strike in enumerate([95.0, 100.0, 105.0])]
+    return {'success': True, 'optionChain': rows, 'currentPrice': 100.0}
+
+
+def chain_without_index(ticker, **session):
+    """get_option_chain for a symbol TWS has no option parameters for (no ChainIndex)"""
+    sim, _ = make_sim()
+    fetch = option_chain_ibapi.get_option_chain_ibapi
+    option_chain_ibapi.get_option_chain_ibapi = chain_reply
+    try:
+        with bridge_session(ib=sim, **session):
+            tws_bridge.vol_surfaces.clear()
+            tws_bridge.vol_surfaces['NO1'] = {'surface': VolSurface(100.0), 'tickers': [], 'onTick': None}
+            result = tws_bridge.get_option_chain(ticker)
+            assert 'NO1' not in tws_bridge.chain_indexes
+            return result, tws_bridge.vol_surfaces['NO1']['surface']
+    finally:
+        option_chain_ibapi.get_option_chain_ibapi = fetch
+
+
+def test_option_chain_without_chain_index():
+    result, surface = chain_without_index('no1')
+    assert result['success'] and len(result['optionChain']) == 3
+    # Folded into the upper-case surface even though the request was lower case
+    assert len(surface.smiles['20261120'].points) == 6
+
+
+def test_chain_export_without_chain_index():
+    exporter = ChainExporter(tempfile.mkdtemp(prefix='tt-export-'), 'csv')
+    result, _ = chain_without_index('NO1', chain_exporter=exporter)
+    status = exporter.close()
+    assert result['success']
+    assert status['rowsWritten'] == 6 and len(status['files']) == 1
+
+
+def run_daemon(sim, client, **session):
+    """serve_daemon on `sim` with client(sock, messages) talking to it from a thread; returns the messages"""
+    socket_path = os.path.join(tempfile.mkdtemp(prefix='tt-daemon-'), 'bridge.sock')
+    messages, done = [], threading.Event()
+    deadline = time.time() + 10
+
+    def talk():
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            while True:
+                try:
+                    sock.connect(socket_path)
+                    break
+                except OSError:
+                    time.sleep(0.01)
+            lines = sock.makefile('r')
+            messages.append(json.loads(lines.readline()))  # greeting
+
+            def send(command):
+                sock.sendall(json.dumps(command).encode() + b'\n')
+
+            def wait_for(condition):
+                while not any(condition(message) for message in messages):
+                    messages.append(json.loads(lines.readline()))
+
+            client(send, wait_for)
+            lines.close()
+            sock.close()
+        finally:
+            done.set()
+
+    def sleep(secs=0.02):
+        if done.is_set() or time.time() > deadline:
+            raise KeyboardInterrupt
+        return SimulatedIB.sleep(sim, secs)
+
+    sim.sleep = sleep
+    thread = threading.Thread(target=talk, daemon=True)
+    thread.start()
+    with bridge_session(ib=sim, **session):
+        tws_bridge.serve_daemon(socket_path)
+        tws_bridge.scanners.clear()
+        assert tws_bridge.event_sink is None and not os.path.exists(socket_path)
+    thread.join(1)
+    return messages
+
+
+def test_daemon_pushes_scanner_updates_while_idle():
+    def client(send, wait_for):
+        # timeout 0: the response goes out before TWS's first list, which arrives on the idle loop
+        send({'type': 'start_scanner', 'requestId': 1, 'data': {'preset': 'high_iv', 'rows': 5, 'timeout': 0}})
+        wait_for(lambda message: message.get('event') == 'scanner_update')
+
+    received = run_daemon(make_sim()[0], client)
+    assert received[1]['requestId'] == 1 and received[1]['success'] and received[1]['version'] == 0
+    update = received[-1]
+    assert update['event'] == 'scanner_update' and update['scanner'] == 'high_iv' and len(update['added']) == 5
+
+
+def test_daemon_cancels_a_running_request():
+    started = threading.Event()
+
+    def slow_chain(ticker, host, port, client_id, cancel_event=None):
+        started.set()
+        if cancel_event.wait(5):
+            return {'success': False, 'cancelled': True, 'message': 'cancelled', 'optionChain': []}
+        return chain_reply(ticker)
+
+    def client(send, wait_for):
+        send({'type': 'get_option_chain', 'requestId': 1, 'data': {'ticker': 'SPY', 'view': 'chain'}})
+        started.wait(5)
+        send({'type': 'cancel', 'requestId': 2, 'data': {'requestId': 1}})
+        wait_for(lambda message: message.get('requestId') == 1)
+        started.clear()
+        send({'type': 'get_option_chain', 'requestId': 3, 'data': {'ticker': 'SPY', 'view': 'chain'}})
+        started.wait(5)
+        # A newer request for the same view supersedes the running one
+        send({'type': 'get_option_chain', 'requestId': 4, 'data': {'ticker': 'QQQ', 'view': 'chain'}})
+        wait_for(lambda message: message.get('requestId') == 3)
+
+    fetch = option_chain_ibapi.get_option_chain_ibapi
+    option_chain_ibapi.get_option_chain_ibapi = slow_chain
+    try:
+        start = time.time()
+        responses = {message.get('requestId'): message for message in run_daemon(make_sim()[0], client)}
+    finally:
+        option_chain_ibapi.get_option_chain_ibapi = fetch
+    assert time.time() - start < 5
+    assert responses[1]['cancelled'] and responses[3]['cancelled']
+
+
+def test_bridge_order_paths_on_the_simulator():
+    args = order_benchmark.parse_args(['--orders', '3', '--speed', '1000', '--brackets',
+                                       '--max-fill-size', '1', '--max-p95-ms', '60000'])
+    with bridge_session():
+        assert order_benchmark.run(args) == 0
+        sim = tws_bridge.ib
+        assert not sim.positions()
+        assert len([trade for trade in sim.trades() if trade.order.ocaGroup]) == 6
+        assert tws_bridge.sim_settings is None
+    assert tws_bridge.ib is not sim and tws_bridge.connection_state['state'] == 'disconnected'
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
+    print("\n✅ All simulated broker tests passed!")
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Short smoke run of the soak harness against the simulated broker
+"""
+import json
+import os
+import tempfile
+
+import soak_harness
+
+
+def test_short_soak_run_passes():
+    report = os.path.join(tempfile.mkdtemp(), 'soak.jsonl')
+    args = soak_harness.parse_args(['--hours', '0.1', '--speed', '5000', '--sample-every', '120',
+                                    '--report', report])
+    with soak_harness.bridge_session():
+        assert soak_harness.run(args) == 0
+    assert soak_harness.tws_bridge.ib is None
+
+    with open(report) as f:
+        samples = [json.loads(line) for line in f]
+    assert samples[-1]['virtualHours'] >= 0.1
+    assert any(row.get('baseline') for row in samples)
+    assert samples[-1]['commands'] > 50
+    assert samples[-1]['subscriptions'] <= len(soak_harness.UNIVERSE) + samples[-1]['caches']['risk_tickers']
+
+
+if __name__ == "__main__":
+    test_short_soak_run_passes()
+    print("✓ test_short_soak_run_passes")
+    print("\n✅ Soak harness smoke test passed!")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Tests for price-band tick sizes and rounding to them
+"""
+from tws_bridge import DEFAULT_PRICE_INCREMENTS, round_to_tick, tick_size_at
+
+# Penny-pilot style rule: 0.01 below 3.00, 0.05 from 3.00
+PENNY = [(0.0, 0.01), (3.0, 0.05)]
+
+
+def test_band_lookup_at_edges():
+    assert tick_size_at(0.0, PENNY) == 0.01
+    assert tick_size_at(2.99, PENNY) == 0.01
+    assert tick_size_at(3.0, PENNY) == 0.05   # a low edge belongs to its own band
+    assert tick_size_at(250.0, PENNY) == 0.05
+    assert tick_size_at(-1.5, PENNY) == 0.01  # net credits use the first band
+    assert tick_size_at(2.99) == 0.05 and tick_size_at(3.0) == 0.10
+
+
+def test_round_to_tick_per_band():
+    assert round_to_tick(2.996, PENNY) == 3.0
+    assert round_to_tick(2.984, PENNY) == 2.98
+    assert round_to_tick(3.02, PENNY) == 3.0
+    assert round_to_tick(3.03, PENNY) == 3.05
+    assert round_to_tick(1.23, DEFAULT_PRICE_INCREMENTS) == 1.25
+    assert round_to_tick(4.14) == 4.1
+    assert round_to_tick(-1.234, PENNY) == -1.23
+
+
+def test_non_positive_increment_falls_back_to_default_bands():
+    # A minTick of 0 must not divide by zero
+    assert tick_size_at(1.0, [(0.0, 0.0)]) == 0.05
+    assert round_to_tick(1.23, [(0.0, 0.0)]) == 1.25
+    assert round_to_tick(4.14, [(0.0, 0.01), (3.0, -0.05)]) == 4.1
+    assert round_to_tick(1.234, []) == 1.25
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
+    print("\n✅ All tick size tests passed!")
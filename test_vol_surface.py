@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental smile fits and expiry interpolation of the vol surface
+"""
+import math
+from datetime import datetime
+
+import numpy as np
+
+from vol_surface import VolSurface, year_fraction
+
+NOW = datetime(2026, 10, 19, 10, 0)
+STRIKES = [80.0, 90.0, 95.0, 100.0, 105.0, 110.0, 120.0]
+
+
+def smile_iv(strike, spot=100.0):
+    x = math.log(strike / spot)
+    return 0.20 - 0.10 * x + 0.50 * x * x
+
+
+def test_quadratic_smile_is_recovered():
+    surface = VolSurface(100.0)
+    for strike in STRIKES:
+        surface.update('20261120', strike, 'C', smile_iv(strike))
+    fitted = surface.implied_vol([85.0, 100.0, 115.0], '20261120', NOW)
+    assert np.allclose(fitted, [smile_iv(85.0), smile_iv(100.0), smile_iv(115.0)])
+
+
+def test_tick_replaces_its_point():
+    surface = VolSurface(100.0)
+    for strike in STRIKES:
+        surface.update('20261120', strike, 'C', 0.5)
+    # Every point re-ticks onto the true smile: same fit as loading it fresh
+    for strike in STRIKES:
+        surface.update('20261120', strike, 'C', smile_iv(strike))
+    assert len(surface.smiles['20261120'].points) == len(STRIKES)
+    assert np.allclose(surface.implied_vol([92.5], '20261120', NOW), [smile_iv(92.5)])
+
+    assert not surface.update('20261120', 100.0, 'C', float('nan'))
+    assert not surface.update('20261120', 100.0, 'C', 0.0)
+
+
+def test_sparse_smile_is_flat():
+    surface = VolSurface(100.0)
+    surface.update('20261120', 95.0, 'P', 0.22)
+    surface.update('20261120', 105.0, 'C', 0.18)
+    assert np.allclose(surface.implied_vol([80.0, 100.0, 120.0], '20261120', NOW), 0.20)
+
+
+def test_interpolation_is_linear_in_total_variance():
+    surface = VolSurface(100.0)
+    for strike in STRIKES:
+        surface.update('20261120', strike, 'C', 0.20)
+        surface.update('20261218', strike, 'C', 0.30)
+    t0, t1, t = (year_fraction(expiry, NOW) for expiry in ('20261120', '20261218', '20261204'))
+    w0, w1 = 0.20 ** 2 * t0, 0.30 ** 2 * t1
+    expected = math.sqrt((w0 + (t - t0) / (t1 - t0) * (w1 - w0)) / t)
+    assert np.allclose(surface.implied_vol([100.0], '20261204', NOW), expected)
+    assert 0.20 < expected < 0.30
+
+    # Outside the listed expiries the nearest smile is used as-is
+    assert np.allclose(surface.implied_vol([100.0], '20261030', NOW), 0.20)
+    assert np.allclose(surface.implied_vol([100.0], '20270115', NOW), 0.30)
+    assert VolSurface(100.0).implied_vol([100.0], '20261120', NOW) is None
+
+
+def test_bulk_load_matches_single_updates():
+    single, bulk = VolSurface(100.0), VolSurface(100.0)
+    expiries = ['20261120'] * len(STRIKES) + ['20261218'] * len(STRIKES)
+    strikes = STRIKES * 2
+    rights = ['P' if strike < 100 else 'C' for strike in strikes]
+    ivs = [smile_iv(strike) + (0.05 if expiry == '20261218' else 0.0) for expiry, strike in zip(expiries, strikes)]
+    ivs[3] = float('nan')
+    for expiry, strike, right, iv in zip(expiries, strikes, rights, ivs):
+        single.update(expiry, strike, right, iv)
+    bulk.update_many(expiries, strikes, rights, ivs)
+    assert bulk.expiries() == single.expiries() == ['20261120', '20261218']
+    for expiry, row in single.grid(STRIKES, NOW).items():
+        assert np.allclose(bulk.grid(STRIKES, NOW)[expiry], row)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✓ {name}")
+    print("\n✅ All vol surface tests passed!")
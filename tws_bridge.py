@@ -3,10 +3,14 @@
 TWS Bridge Script - Connects to Interactive Brokers TWS/IB Gateway using ib_insync
 """
 
+import os
 import sys
 import json
 import time
+import queue
+import threading
 import traceback
+from bisect import bisect_right
 from datetime import datetime
 
 # Fix for Python 3.14+ event loop compatibility
@@ -18,76 +22,807 @@ except RuntimeError:
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
 
-from ib_insync import IB, Contract, Order, Trade, Stock
+from ib_insync import IB, Contract, Order, Trade, Stock, Option, ComboLeg, ScannerSubscription, TagValue
+
+from market_calendar import SessionCalendar
+from chain_index import ChainIndex
+from bar_cache import BarStore, INITIAL_DURATIONS, gap_duration
+from vol_surface import VolSurface, year_fraction
+from risk_engine import RiskEngine
+from scenario import scenario_grid
+from order_journal import OrderJournal
+from request_queue import RequestQueue
+from chain_export import ChainExporter
+from quote_board import QuoteBoard
+from profiling import ProfileSession, span, start_tracing, stop_tracing, tracing
+from scanner import PRESETS, MAX_SCANNERS, MAX_ROWS, ScanRanking, scan_row
+from sim_broker import SimulatedIB, parse_settings
+from position_table import PositionTable
 
 # Global IB connection
 ib = None
 
+# SimulatedIB keyword arguments when started with --sim (a local matching engine instead of TWS)
+sim_settings = None
+
+# Connection parameters (set in main), reused by the IBAPI option chain module
+connection_params = {'host': '127.0.0.1', 'port': 4002, 'client_id': 1}
+
+# Symbols warmed up on the first connect (set in main)
+watchlist = []
+
+# Local historical bar store (memory-mapped columns per conId and bar size)
+bar_store = BarStore(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'bars'))
+
+# Durable order/fill journal (opened in main)
+order_journal = None
+JOURNAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'order_journal.db')
+order_ref_counter = 0
+
+# Optional shared-memory board of latest quotes/greeks/positions (--quote-board)
+quote_board = None
+
+# Optional streaming export of chain snapshots / live option ticks (see start_chain_export)
+chain_exporter = None
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'chains')
+
+# On-demand profiling window and trace output (see profile_start / trace_start)
+profile_session = None
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'profiles')
+
+# Exchange session calendar (built once in main)
+session_calendar = None
+
+# Connection supervisor: first connect, and reconnect with exponential backoff after a TWS/Gateway drop
+RECONNECT_INITIAL_DELAY = 1.0
+RECONNECT_MAX_DELAY = 30.0
+CONNECT_TIMEOUT = 5.0     # seconds per attempt; attempts run on the event loop, not in the request loop
+connection_state = {'state': 'disconnected', 'delay': RECONNECT_INITIAL_DELAY,
+                    'nextAttempt': 0.0, 'attempt': 0, 'since': 0.0,
+                    'pending': None,      # connectAsync task of the attempt in progress
+                    'started': False}     # whether the first connect's session start has run
+
+# Commands answered from local state, allowed while reconnecting
+OFFLINE_COMMANDS = {'get_market_session', 'get_order_journal', 'get_portfolio_greeks', 'batch',
+                    'start_chain_export', 'stop_chain_export', 'get_chain_export', 'get_quote_board',
+                    'profile_start', 'profile_stop', 'trace_start', 'trace_stop', 'get_scanners'}
+
+# Where responses/events are written; the daemon points this at the current client socket
+response_sink = None
+# Where events fired from IB callbacks are written; the daemon points this at every client
+event_sink = None
+
+# Pending commands by lane (orders ahead of data); cancels/supersedes act on it
+request_queue = RequestQueue()
+
+# Warm caches filled at connect time (see warm_up) and reused by the data commands
+contract_cache = {}       # symbol -> qualified Stock contract
+ticker_cache = {}         # symbol -> live ib_insync Ticker
+option_params_cache = {}  # symbol -> list of OptionChain from reqSecDefOptParams
+option_conid_cache = {}   # (symbol, expiry, strike, right) -> option conId
+quote_cache = {}          # conId -> live bid/ask Ticker for contracts we trade (least recently used first)
+MAX_QUOTE_LINES = 10      # market-data lines kept open for quote_cache
+chain_indexes = {}        # symbol -> ChainIndex of sorted strikes/expiries and cached deltas
+vol_surfaces = {}         # symbol -> {'surface': VolSurface, 'tickers': [live option Tickers], 'onTick': handler}
+                          # (least recently used first)
+MARKET_DATA_LINES = 100   # TWS's default simultaneous market-data line allowance
+scanners = {}             # scanner id -> {'ranking': ScanRanking, 'data': ScanDataList, 'onUpdate': handler, ...}
+
+# Position rows for get_positions, versioned so clients can fetch only what changed
+position_table = PositionTable()
+
+# Portfolio greeks, fed by option-computation ticks on held contracts and portfolio updates
+risk_engine = RiskEngine()
+risk_tickers = {}         # conId -> live Ticker for a held option
+RISK_PUSH_INTERVAL = 2.0  # seconds between 'portfolio_greeks' events
+last_risk_push = {'time': 0.0, 'version': 0}
+
+# Tick-size tables from market rules: ruleId -> [(lowEdge, increment), ...] and conId -> ruleId
+market_rule_cache = {}
+contract_rule_cache = {}
+
+# Used when a contract's market rule cannot be fetched (classic option tick sizes)
+DEFAULT_PRICE_INCREMENTS = [(0.0, 0.05), (3.0, 0.10)]
+
 def log(message):
     """Log to stderr"""
     print(message, file=sys.stderr, flush=True)
 
+def write_message(message):
+    """Write one JSON message line to stdout, or to the active daemon client"""
+    line = json.dumps(message)
+    if response_sink is not None:
+        response_sink(line)
+    else:
+        print(line, flush=True)
+    return line
+
 def send_response(response, request_id=None):
     """Send JSON response to stdout"""
     if request_id is not None:
         response['requestId'] = request_id
-    print(json.dumps(response), flush=True)
-    log(f"Sent response: {json.dumps(response)}")
+    line = write_message(response)
+    log(f"Sent response: {line}")
 
-def connect(host, port, client_id):
-    """Connect to TWS/IB Gateway using ib_insync"""
+def send_event(event, data=None, broadcast=False):
+    """
+    Send unsolicited JSON event to stdout (no requestId). Events raised from IB
+    callbacks pass broadcast: they can fire during any ib.sleep, so in daemon mode
+    they go to every client rather than whichever one is being answered.
+    """
+    message = {"event": event}
+    if data:
+        message.update(data)
+    if broadcast and event_sink is not None:
+        event_sink(json.dumps(message))
+    else:
+        write_message(message)
+    log(f"Sent event: {event}")
+
+def create_client():
+    """The IB client, or the simulator with --sim; supervise_connection connects it"""
     global ib
-    try:
+    if sim_settings is not None:
+        ib = SimulatedIB(**sim_settings)
+        log(f"Using the simulated broker ({sim_settings or 'default settings'})")
+    else:
         ib = IB()
-        log(f"Attempting to connect to {host}:{port} with client ID {client_id}...")
-        
-        ib.connect(host, port, clientId=client_id, timeout=10)
-        
-        if ib.isConnected():
-            log("Successfully connected using ib_insync")
-            send_response({"success": True, "message": "Connected to TWS"})
-            return True
-        else:
-            log("Failed to connect")
-            send_response({"success": False, "message": "Failed to connect. Ensure TWS/Gateway is running."})
-            return False
-            
-    except ImportError:
-        log("ib_insync not installed - please run: pip install ib-insync")
-        send_response({"success": False, "message": "ib_insync not installed"})
-        return False
+    connection_state.update(state='disconnected', since=time.time(), nextAttempt=0.0, attempt=0)
+    return ib
+
+
+def start_session():
+    """Once the first connect succeeds: warm the caches and start the risk engine and order journal"""
+    warm_up(watchlist)
+    start_risk_engine()
+    start_order_journal()
+
+
+def restore_subscriptions():
+    """Re-request every market-data line after a reconnect (old Tickers die with the session)"""
+    for symbol, old in list(ticker_cache.items()):
+        ticker_cache[symbol] = ib.reqMktData(old.contract, '', False, False)
+
+    # Orders are priced off these, so a dead line would quote a stale bid/ask
+    for con_id, old in list(quote_cache.items()):
+        quote_cache[con_id] = ib.reqMktData(old.contract, '', False, False)
+
+    for con_id, old in list(risk_tickers.items()):
+        option_ticker = ib.reqMktData(old.contract, '', False, False)
+        option_ticker.updateEvent += on_risk_greeks
+        risk_tickers[con_id] = option_ticker
+
+    for entry in vol_surfaces.values():
+        renewed = []
+        for old in entry['tickers']:
+            option_ticker = ib.reqMktData(old.contract, '', False, False)
+            option_ticker.updateEvent += entry['onTick']
+            renewed.append(option_ticker)
+        entry['tickers'] = renewed
+
+    for entry in scanners.values():
+        subscribe_scanner(entry)
+
+    # Account updates are re-requested by ib_insync on connect; resync positions and orders
+    for item in ib.portfolio():
+        track_position(item.contract, item.position)
+    if position_table.loaded:
+        load_positions()
+    if order_journal is not None:
+        order_journal.reconcile(ib.openTrades(), ib.fills())
+
+    return market_data_lines() + len(scanners)
+
+
+def supervise_connection():
+    """
+    Periodic task: make the first connect, and after a dropped connection reconnect with
+    exponential backoff, then restore subscriptions. Each attempt runs as a task on the
+    ib_insync event loop, so the request loop keeps answering offline commands while it
+    is pending. Emits 'connection_state' events on every transition.
+    """
+    if ib is None:
+        return
+
+    pending = connection_state['pending']
+    if pending is not None:
+        if pending.done():
+            connection_state['pending'] = None
+            connection_attempted(pending)
+        return
+
+    if ib.isConnected():
+        return
+
+    now = time.time()
+    if connection_state['state'] == 'connected':
+        log("Connection to TWS lost, will reconnect")
+        connection_state.update(state='disconnected', since=now, attempt=0,
+                                delay=RECONNECT_INITIAL_DELAY, nextAttempt=now + RECONNECT_INITIAL_DELAY)
+        send_event("connection_state", {"state": "disconnected"})
+        return
+
+    if now < connection_state['nextAttempt']:
+        return
+
+    connection_state['attempt'] += 1
+    if connection_state['started']:
+        send_event("connection_state", {"state": "reconnecting", "attempt": connection_state['attempt']})
+    host, port, client_id = (connection_params[key] for key in ('host', 'port', 'client_id'))
+    log(f"Attempting to connect to {host}:{port} with client ID {client_id}...")
+    ib.disconnect()
+    connection_state['pending'] = asyncio.get_event_loop().create_task(
+        ib.connectAsync(host, port, clientId=client_id, timeout=CONNECT_TIMEOUT))
+
+
+def connection_attempted(attempt):
+    """Finish a connect attempt started by supervise_connection"""
+    if attempt.exception() is not None:
+        log(f"Connect attempt {connection_state['attempt']} failed: {str(attempt.exception())}")
+
+    if ib.isConnected() and not connection_state['started']:
+        log("Successfully connected using ib_insync")
+        connection_state['started'] = True
+        # Answers the client's wait for the connection even after earlier failed attempts
+        send_response({"success": True, "message": "Connected to TWS"})
+        start_session()
+        outage = round(time.time() - connection_state['since'], 1)
+        connection_state.update(state='connected', since=time.time(), delay=RECONNECT_INITIAL_DELAY)
+        if connection_state['attempt'] > 1:
+            send_event("connection_state", {"state": "connected", "outageSeconds": outage,
+                                            "restoredSubscriptions": 0})
+    elif ib.isConnected():
+        restored = restore_subscriptions()
+        outage = round(time.time() - connection_state['since'], 1)
+        log(f"Reconnected after {outage}s, restored {restored} subscriptions")
+        connection_state.update(state='connected', since=time.time(), delay=RECONNECT_INITIAL_DELAY)
+        send_event("connection_state", {"state": "connected", "outageSeconds": outage,
+                                        "restoredSubscriptions": restored})
+    else:
+        if not connection_state['started'] and connection_state['attempt'] == 1:
+            send_response({"success": False, "message": "Failed to connect. Ensure TWS/Gateway is running; "
+                                                        "retrying in the background."})
+        connection_state['delay'] = min(connection_state['delay'] * 2, RECONNECT_MAX_DELAY)
+        connection_state['nextAttempt'] = time.time() + connection_state['delay']
+        send_event("connection_state", {"state": "disconnected", "retryIn": connection_state['delay']})
+
+
+def warm_up(tickers):
+    """
+    Prefetch account snapshots and watchlist contracts right after connecting.
+    All steps run concurrently on the ib_insync event loop; a 'ready' event with
+    per-step timings (ms) is emitted when they finish.
+    """
+    timings = {}
+
+    async def timed(name, coro):
+        start = time.perf_counter()
+        try:
+            return await coro
+        except Exception as e:
+            log(f"Warm-up step {name} failed: {str(e)}")
+            return None
+        finally:
+            timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    async def load_watchlist():
+        contracts = [Stock(t, 'SMART', 'USD') for t in tickers]
+        qualified = await timed('qualify', ib.qualifyContractsAsync(*contracts))
+        for contract in qualified or []:
+            contract_cache[contract.symbol] = contract
+
+        start = time.perf_counter()
+        for symbol, contract in contract_cache.items():
+            if symbol not in ticker_cache:
+                ticker_cache[symbol] = ib.reqMktData(contract, '', False, False)
+        timings['subscribe'] = round((time.perf_counter() - start) * 1000, 1)
+
+        async def load_params(contract):
+            chains = await ib.reqSecDefOptParamsAsync(contract.symbol, '', contract.secType, contract.conId)
+            option_params_cache[contract.symbol] = chains
+
+        await timed('optionParams', asyncio.gather(
+            *(load_params(c) for s, c in contract_cache.items() if s in tickers)))
+
+    try:
+        log(f"Warming up caches for watchlist: {tickers}")
+        start = time.perf_counter()
+        ib.run(asyncio.gather(
+            timed('accountValues', ib.accountSummaryAsync()),
+            timed('portfolio', ib.reqPositionsAsync()),
+            load_watchlist()
+        ))
+        timings['total'] = round((time.perf_counter() - start) * 1000, 1)
+        log(f"Warm-up complete: {timings}")
+        send_event("ready", {"timings": timings, "tickers": sorted(contract_cache)})
+    except Exception as e:
+        log(f"Error during warm-up: {str(e)}\n{traceback.format_exc()}")
+        send_event("ready", {"timings": timings, "tickers": sorted(contract_cache), "message": str(e)})
+
+
+def new_order_ref(prefix='TT'):
+    """Unique orderRef tagging our orders in TWS and in the journal"""
+    global order_ref_counter
+    order_ref_counter += 1
+    return f"{prefix}-{int(time.time() * 1000)}-{order_ref_counter}"
+
+
+def journal(kind, order_ref, trade=None, **payload):
+    """Append to the order journal; never lets a journal error break the order path"""
+    if order_journal is None or not order_ref:
+        return
+    try:
+        order_id = trade.order.orderId if trade is not None else None
+        perm_id = trade.order.permId if trade is not None else None
+        order_journal.record(kind, order_ref, order_id, perm_id, **payload)
     except Exception as e:
-        log(f"Error connecting: {str(e)}")
-        send_response({"success": False, "message": f"Connection error: {str(e)}"})
-        return False
+        log(f"Error writing order journal ({kind} {order_ref}): {str(e)}")
+
+
+def on_order_status(trade):
+    """ib.orderStatusEvent hook: journal every status change of a tagged order"""
+    status = trade.orderStatus
+    journal('status', trade.order.orderRef, trade, status=status.status, filled=status.filled,
+            remaining=status.remaining, avgFillPrice=status.avgFillPrice)
+
+
+def on_exec_details(trade, fill):
+    """ib.execDetailsEvent hook: journal every fill of a tagged order"""
+    execution = fill.execution
+    journal('fill', execution.orderRef, trade, execId=execution.execId, shares=execution.shares,
+            price=execution.price, time=str(execution.time))
+
+
+def start_order_journal():
+    """Open the journal, replay it and reconcile against TWS open trades and executions"""
+    global order_journal
+    try:
+        order_journal = OrderJournal(JOURNAL_PATH)
+        ib.orderStatusEvent += on_order_status
+        ib.execDetailsEvent += on_exec_details
+
+        start = time.perf_counter()
+        summary = order_journal.reconcile(ib.openTrades(), ib.fills())
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+        log(f"Order journal reconciled in {elapsed_ms} ms: "
+            f"{ {k: len(v) for k, v in summary.items()} }")
+        send_event("journal_reconciled", {"elapsedMs": elapsed_ms, **summary})
+    except Exception as e:
+        log(f"Error starting order journal: {str(e)}\n{traceback.format_exc()}")
+
+
+def get_order_journal(limit=50):
+    """Latest journaled orders (replayed state), newest first"""
+    try:
+        if order_journal is None:
+            return {"success": False, "message": "Order journal is not open", "orders": []}
+        orders = list(order_journal.replay().values())[::-1][:limit]
+        return {"success": True, "orders": orders}
+    except Exception as e:
+        log(f"Error reading order journal: {str(e)}\n{traceback.format_exc()}")
+        return {"success": False, "message": f"Failed to read order journal: {str(e)}", "orders": []}
+
+
 def is_market_open():
-    """Check if US options market is currently open"""
-    from datetime import datetime
-    import pytz
+    """Check if US options market is currently open (precomputed session calendar)"""
+    if sim_settings is not None:
+        return True, "Market is open (simulated broker)"
+    global session_calendar
+    if session_calendar is None:
+        session_calendar = SessionCalendar()
+    return session_calendar.status()
+
+
+def get_price_increments(contract):
+    """
+    Price-band table [(lowEdge, increment), ...] for a qualified contract, fetched once
+    via reqContractDetails + reqMarketRule and cached per conId / market rule id.
+    """
+    rule_id = contract_rule_cache.get(contract.conId)
+    if rule_id is None:
+        try:
+            details = ib.reqContractDetails(contract)
+            if not details:
+                return DEFAULT_PRICE_INCREMENTS
+            detail = details[0]
+            rule_ids = [r for r in detail.marketRuleIds.split(',') if r]
+            exchanges = detail.validExchanges.split(',')
+            rule_id = rule_ids[0] if rule_ids else None
+            if contract.exchange in exchanges and len(rule_ids) == len(exchanges):
+                rule_id = rule_ids[exchanges.index(contract.exchange)]
+            if rule_id is None:
+                # No market rule: fall back to the flat minimum tick (when TWS reports one)
+                rule_id = f"minTick:{detail.minTick}"
+                market_rule_cache[rule_id] = [(0.0, detail.minTick)] if detail.minTick > 0 else []
+            contract_rule_cache[contract.conId] = rule_id
+        except Exception as e:
+            log(f"Error fetching contract details for tick size: {str(e)}")
+            return DEFAULT_PRICE_INCREMENTS
+
+    if rule_id not in market_rule_cache:
+        try:
+            increments = ib.reqMarketRule(int(rule_id))
+            market_rule_cache[rule_id] = sorted((inc.lowEdge, inc.increment) for inc in increments
+                                                if inc.increment > 0)
+            log(f"Cached market rule {rule_id}: {market_rule_cache[rule_id]}")
+        except Exception as e:
+            log(f"Error fetching market rule {rule_id}: {str(e)}")
+            return DEFAULT_PRICE_INCREMENTS
+
+    return market_rule_cache[rule_id] or DEFAULT_PRICE_INCREMENTS
+
+
+def tick_size_at(price, increments=DEFAULT_PRICE_INCREMENTS):
+    """Increment of the price band a price falls in (the default bands' if that is not positive)"""
+    edges = [edge for edge, _ in increments]
+    tick_size = increments[max(0, bisect_right(edges, price) - 1)][1] if increments else 0
+    return tick_size if tick_size > 0 else tick_size_at(price)
+
+
+def round_to_tick(price, increments=DEFAULT_PRICE_INCREMENTS):
+    """Round price to the increment of the band it falls in"""
+    tick_size = tick_size_at(price, increments)
+    decimals = max(0, -int(f"{tick_size:e}".split('e')[1])) + 2
+    return round(round(price / tick_size) * tick_size, decimals)
+
+
+def get_market_session():
+    """Current session state for scheduling (open flag, next open/close as ISO UTC)"""
+    global session_calendar
+    try:
+        if session_calendar is None:
+            session_calendar = SessionCalendar()
+        is_open, message = session_calendar.status()
+        next_open = session_calendar.next_open()
+        next_close = session_calendar.next_close()
+        return {
+            "success": True,
+            "isOpen": is_open,
+            "isExtendedHours": session_calendar.is_open(extended=True) and not is_open,
+            "message": message,
+            "nextOpen": next_open.isoformat() if next_open else None,
+            "nextClose": next_close.isoformat() if next_close else None
+        }
+    except Exception as e:
+        log(f"Error getting market session: {str(e)}\n{traceback.format_exc()}")
+        return {"success": False, "message": f"Failed to get market session: {str(e)}"}
+
+
+def wait_for_fill(trade, timeout=30, allow_credit=False):
+    """Wait for a parent order to fill; returns (fill_price, None) or (None, error_result)"""
+    # Wait for the order to fill
+    start_time = time.time()
+    while not trade.isDone():
+        ib.sleep(0.5)
+        if time.time() - start_time > timeout:
+            log("Timeout waiting for order to fill")
+            return None, {
+                "success": False,
+                "message": "Order placement timeout - check TWS for order status"
+            }
+    
+    # Check if order was filled (a worked order may be cut short with part of it filled)
+    if trade.orderStatus.status != 'Filled':
+        if not trade.orderStatus.filled:
+            log(f"Order not filled. Status: {trade.orderStatus.status}")
+            return None, {
+                "success": False,
+                "message": f"Order not filled. Status: {trade.orderStatus.status}"
+            }
+        log(f"Order partially filled: {trade.orderStatus.filled:g}, remainder {trade.orderStatus.status}")
+    
+    # Get the fill price - try multiple methods
+    fill_price = None
+    log(f"Trade status: {trade.orderStatus}")
+    log(f"Trade fills: {trade.fills}")
+    
+    # Method 1: Check fills list (for combos, only the BAG-level executions, not the legs)
+    fills = [f for f in trade.fills if f.contract.secType == trade.contract.secType]
+    if fills and len(fills) > 0:
+        # Calculate average fill price from fills
+        total_quantity = 0
+        total_value = 0
+        for fill in fills:
+            fill_qty = fill.execution.shares
+            fill_px = fill.execution.price
+            total_quantity += fill_qty
+            total_value += fill_qty * fill_px
+            log(f"Fill: {fill_qty} @ ${fill_px}")
+        
+        if total_quantity > 0:
+            fill_price = total_value / total_quantity
+            log(f"Calculated fill price from fills: ${fill_price:.2f}")
+    
+    # Method 2: Use avgFillPrice from order status
+    if fill_price is None or fill_price == 0:
+        fill_price = trade.orderStatus.avgFillPrice
+        log(f"Using avgFillPrice from orderStatus: ${fill_price}")
+    
+    # Validate fill price (combos may fill at a net credit, i.e. below zero)
+    if fill_price is None or fill_price == 0 or (fill_price < 0 and not allow_credit):
+        log(f"ERROR: Invalid fill price: {fill_price}")
+        return None, {
+            "success": False,
+            "message": f"Could not determine fill price. Order may have filled at ${fill_price}"
+        }
+    
+    log(f"Final fill price: ${fill_price:.2f}")
+    return fill_price, None
+
+
+def filled_quantity(trade, requested):
+    """Contracts the parent actually filled, which is what SL/TP orders must cover"""
+    filled = trade.orderStatus.filled
+    return int(filled) if filled else requested
+
+
+def place_bracket_orders(contract, action, quantity, fill_price, stop_loss_pct, take_profit_pct,
+                         price_increments, parent_ref):
+    """
+    Place SL (STP) / TP (LMT) exit orders around a fill price, linked in one OCA group.
+    Percentages apply to the magnitude of the fill, so net-credit combo fills work too.
+    For a SELL entry the exits are BUYs, with the stop above the fill and the target below.
+    Returns the human-readable bracket descriptions.
+    """
+    # Helper function to check if value is numeric
+    def is_numeric_value(val):
+        if val is None or val == '':
+            return False
+        try:
+            float(val)
+            return True
+        except (ValueError, TypeError):
+            return False
     
-    # Get current time in US/Eastern timezone
-    eastern = pytz.timezone('US/Eastern')
-    now = datetime.now(eastern)
+    # Check if we need to place bracket orders
+    has_stop_loss = is_numeric_value(stop_loss_pct)
+    has_take_profit = is_numeric_value(take_profit_pct)
     
-    # Check if it's a weekday (Monday=0, Sunday=6)
-    if now.weekday() > 4:  # Saturday or Sunday
-        return False, "Market is closed (weekend)"
+    log(f"Bracket order check: has_stop_loss={has_stop_loss}, has_take_profit={has_take_profit}")
     
-    # Market hours: 9:30 AM - 4:00 PM ET
-    market_open = now.replace(hour=9, minute=30, second=0, microsecond=0)
-    market_close = now.replace(hour=16, minute=0, second=0, microsecond=0)
+    bracket_messages = []
     
-    if now < market_open:
-        return False, f"Market is closed (opens at 9:30 AM ET, currently {now.strftime('%I:%M %p ET')})"
-    elif now >= market_close:
-        return False, f"Market is closed (closed at 4:00 PM ET, currently {now.strftime('%I:%M %p ET')})"
+    if has_stop_loss or has_take_profit:
+        log(f"Placing bracket orders with OCA group - SL: {stop_loss_pct}, TP: {take_profit_pct}")
+        
+        # Create unique OCA group name for this bracket
+        import time as time_module
+        oca_group = f"Bracket_{int(time_module.time() * 1000)}"
+        log(f"Created OCA group: {oca_group}")
+        
+        # Prepare bracket orders (a short entry loses as the price rises)
+        direction = 1 if action == 'BUY' else -1
+        sl_order = None
+        tp_order = None
+        
+        # Calculate and create stop loss order
+        if has_stop_loss:
+            try:
+                sl_pct = float(stop_loss_pct)
+                stop_price_raw = fill_price - direction * abs(fill_price) * sl_pct / 100
+                stop_price = round_to_tick(stop_price_raw, price_increments)
+                log(f"Stop Loss calculation: {sl_pct}% of ${fill_price:.2f} = ${stop_price_raw:.3f} -> rounded to ${stop_price:.2f}")
+                
+                # Create stop loss order
+                sl_order = Order()
+                sl_order.action = 'SELL' if action == 'BUY' else 'BUY'
+                sl_order.orderType = 'STP'
+                sl_order.totalQuantity = quantity
+                sl_order.auxPrice = stop_price
+                sl_order.transmit = True #not has_take_profit  # Only transmit if there's no TP order
+                sl_order.outsideRth = True
+                sl_order.eTradeOnly = False  # Allow order to be transmitted
+                sl_order.firmQuoteOnly = False  # Don't wait for firm quote
+                
+                # OCA settings for bracket (link with TP if both exist)
+                if has_take_profit:
+                    sl_order.ocaGroup = oca_group
+                    sl_order.ocaType = 1  # Cancel all remaining orders in group when one fills
+                
+                bracket_messages.append(f"Stop Loss at ${stop_price:.2f}")
+            except ValueError as ve:
+                log(f"ValueError with stop loss percentage: {stop_loss_pct} - {ve}")
+            except Exception as e:
+                log(f"Error preparing stop loss order: {str(e)}")
+        
+        # Calculate and create take profit order
+        if has_take_profit:
+            try:
+                tp_pct = float(take_profit_pct)
+                limit_price_raw = fill_price + direction * abs(fill_price) * tp_pct / 100
+                limit_price = round_to_tick(limit_price_raw, price_increments)
+                log(f"Take Profit calculation: {tp_pct}% of ${fill_price:.2f} = ${limit_price_raw:.3f} -> rounded to ${limit_price:.2f}")
+                
+                # Create take profit order
+                tp_order = Order()
+                tp_order.action = 'SELL' if action == 'BUY' else 'BUY'
+                tp_order.orderType = 'LMT'
+                tp_order.totalQuantity = quantity
+                tp_order.lmtPrice = limit_price
+                tp_order.transmit = True  # Always transmit the last order
+                tp_order.outsideRth = True
+                tp_order.eTradeOnly = False  # Allow order to be transmitted
+                tp_order.firmQuoteOnly = False  # Don't wait for firm quote
+                
+                # OCA settings for bracket (link with SL if both exist)
+                if has_stop_loss:
+                    tp_order.ocaGroup = oca_group
+                    tp_order.ocaType = 1  # Cancel all remaining orders in group when one fills
+                
+                bracket_messages.append(f"Take Profit at ${limit_price:.2f}")
+            except ValueError as ve:
+                log(f"ValueError with take profit percentage: {take_profit_pct} - {ve}")
+            except Exception as e:
+                log(f"Error preparing take profit order: {str(e)}")
+        
+        # Submit bracket orders
+        if sl_order:
+            log(f"Submitting stop loss order with OCA group: {sl_order.ocaGroup if hasattr(sl_order, 'ocaGroup') and sl_order.ocaGroup else 'None'}")
+            sl_parent_ref = f"{parent_ref}-SL"
+            sl_order.orderRef = sl_parent_ref  # status/fill hooks and reconcile match on it
+            journal('intent', sl_parent_ref, parentRef=parent_ref, ocaGroup=sl_order.ocaGroup,
+                    orderType='STP', stopPrice=sl_order.auxPrice, fillPrice=fill_price,
+                    quantity=quantity, action=sl_order.action)
+            sl_trade = ib.placeOrder(contract, sl_order)
+            journal('submitted', sl_parent_ref, sl_trade, conId=contract.conId)
+            ib.sleep(0.5)
+            log(f"Stop loss order placed: {sl_trade}")
+        
+        if tp_order:
+            log(f"Submitting take profit order with OCA group: {tp_order.ocaGroup if hasattr(tp_order, 'ocaGroup') and tp_order.ocaGroup else 'None'}")
+            tp_parent_ref = f"{parent_ref}-TP"
+            tp_order.orderRef = tp_parent_ref  # status/fill hooks and reconcile match on it
+            journal('intent', tp_parent_ref, parentRef=parent_ref, ocaGroup=tp_order.ocaGroup,
+                    orderType='LMT', limitPrice=tp_order.lmtPrice, fillPrice=fill_price,
+                    quantity=quantity, action=tp_order.action)
+            tp_trade = ib.placeOrder(contract, tp_order)
+            journal('submitted', tp_parent_ref, tp_trade, conId=contract.conId)
+            ib.sleep(0.5)
+            log(f"Take profit order placed: {tp_trade}")
+        
+        if has_stop_loss and has_take_profit:
+            log(f"Bracket orders linked via OCA group '{oca_group}' - one-cancels-all enabled")
+    else:
+        log("No bracket orders to place (SL/TP not set)")
     
-    return True, "Market is open"
+    return bracket_messages
+
+
+def get_quote(contract, wait=2.0):
+    """
+    Live bid/ask Ticker for a contract from the quote cache (subscribes on first use).
+    At most MAX_QUOTE_LINES lines stay open; the least recently traded one is cancelled
+    """
+    quote = quote_cache.pop(contract.conId, None)
+    if quote is None:
+        quote = ib.reqMktData(contract, '', False, False)
+        while len(quote_cache) >= MAX_QUOTE_LINES:
+            con_id, stale = next(iter(quote_cache.items()))
+            del quote_cache[con_id]
+            # Risk engine lines on the same contract stay open
+            if con_id not in risk_tickers:
+                log(f"Cancelling quote line for {stale.contract.localSymbol or con_id}")
+                ib.cancelMktData(stale.contract)
+    quote_cache[contract.conId] = quote
+    deadline = time.time() + wait
+    while not (quote.bid > 0 and quote.ask > 0) and time.time() < deadline:
+        ib.sleep(0.05)
+    return quote
+
+
+def execution_order_type(execution):
+    """Order type an entry/exit is sent as for the given execution settings"""
+    return 'LMT' if execution and execution.get('mode') == 'limit' else 'MKT'
+
+
+def submit_order(contract, order, execution=None, price_increments=None):
+    """
+    Submit an entry/exit order. By default this is the order as built (MKT);
+    with execution={'mode': 'limit', ...} it is worked as a marketable limit.
+    Returns (trade, execution report or None).
+    """
+    if not execution or execution.get('mode') != 'limit':
+        return ib.placeOrder(contract, order), None
+    return execute_marketable_limit(
+        contract, order,
+        offset=float(execution.get('offset', 0.0)),
+        step_ticks=int(execution.get('stepTicks', 1)),
+        max_ticks_through=int(execution.get('maxTicksThrough', 5)),
+        reprice_interval=float(execution.get('repriceInterval', 1.0)),
+        deadline=float(execution.get('deadline', 10.0)),
+        price_increments=price_increments or get_price_increments(contract)
+    )
+
+
+def execute_marketable_limit(contract, order, offset=0.0, step_ticks=1, max_ticks_through=5,
+                             reprice_interval=1.0, deadline=10.0, price_increments=DEFAULT_PRICE_INCREMENTS):
+    """
+    Work an order as a limit starting at mid (+/- offset toward the far side).
+    Quote ticks re-anchor the price to the new mid; when a reprice interval passes
+    without a fill the price steps `step_ticks` toward the far side. The price never
+    goes more than `max_ticks_through` ticks past the NBBO at submission, and what is
+    left at the deadline is cancelled.
+    Returns (trade, report with time-to-fill and price improvement vs that NBBO).
+    """
+    quote = get_quote(contract)
+    bid, ask = quote.bid, quote.ask
+    if not (bid > 0 and ask > 0):
+        log(f"No two-sided quote for {contract.localSymbol or contract.symbol}, sending MKT")
+        order.orderType = 'MKT'
+        return ib.placeOrder(contract, order), {"mode": "market", "reason": "no quote"}
+
+    buy = order.action == 'BUY'
+    direction = 1 if buy else -1
+    tick = tick_size_at((bid + ask) / 2, price_increments)
+    cap = ask + max_ticks_through * tick if buy else max(bid - max_ticks_through * tick, tick)
+
+    def clamp(price):
+        price = round_to_tick(price, price_increments)
+        return min(price, cap) if buy else max(price, cap)
 
+    order.orderType = 'LMT'
+    order.lmtPrice = clamp((bid + ask) / 2 + direction * offset)
+    submitted_at = time.time()
+    trade = ib.placeOrder(contract, order)
+    log(f"Marketable limit {order.action} @ {order.lmtPrice} (NBBO {bid}/{ask}, cap {cap})")
 
+    quote_changed = [False]
 
+    def on_quote(_):
+        quote_changed[0] = True
 
-def place_order(action, ticker, quantity, expiry, strike, option_type, stop_loss_pct='', take_profit_pct=''):
+    quote.updateEvent += on_quote
+    last_reprice = submitted_at
+    reprices = 0
+    try:
+        while not trade.isDone():
+            ib.sleep(0.05)
+            now = time.time()
+            if now - submitted_at >= deadline:
+                log(f"Execution deadline reached at {order.lmtPrice}, cancelling remainder")
+                ib.cancelOrder(order)
+                cancel_deadline = now + 2
+                while not trade.isDone() and time.time() < cancel_deadline:
+                    ib.sleep(0.05)
+                break
+
+            stepped = now - last_reprice >= reprice_interval
+            if not stepped and not quote_changed[0]:
+                continue
+            quote_changed[0] = False
+
+            target = order.lmtPrice + (direction * step_ticks * tick if stepped else 0)
+            if quote.bid > 0 and quote.ask > 0:
+                anchored = (quote.bid + quote.ask) / 2 + direction * offset
+                target = max(target, anchored) if buy else min(target, anchored)
+            target = clamp(target)
+            if target != order.lmtPrice:
+                order.lmtPrice = target
+                ib.placeOrder(contract, order)
+                reprices += 1
+                log(f"Repriced to {target}")
+            if stepped:
+                last_reprice = now
+    finally:
+        quote.updateEvent -= on_quote
+
+    report = {"mode": "limit", "nbbo": {"bid": bid, "ask": ask}, "reprices": reprices,
+              "finalLimit": order.lmtPrice, "status": trade.orderStatus.status}
+    if trade.fills:
+        filled = sum(f.execution.shares for f in trade.fills)
+        avg_price = sum(f.execution.shares * f.execution.price for f in trade.fills) / filled
+        report.update(
+            timeToFillMs=round((trade.fills[-1].time.timestamp() - submitted_at) * 1000),
+            avgFillPrice=avg_price,
+            # Positive = better than crossing the spread at submission
+            priceImprovement=round((ask - avg_price) if buy else (avg_price - bid), 4)
+        )
+    log(f"Execution report: {report}")
+    return trade, report
+
+
+def place_order(action, ticker, quantity, expiry, strike, option_type, stop_loss_pct='', take_profit_pct='',
+                execution=None):
     """Place order with optional bracket orders for SL/TP"""
     try:
         log(f"=== Starting order placement ===")
@@ -111,7 +846,8 @@ def place_order(action, ticker, quantity, expiry, strike, option_type, stop_loss
         contract.multiplier = '100'
         
         # Qualify the contract
-        ib.qualifyContracts(contract)
+        with span('qualify', 'place_order'):
+            ib.qualifyContracts(contract)
         log(f"Contract qualified: {contract}")
         
         # Create market order
@@ -120,194 +856,52 @@ def place_order(action, ticker, quantity, expiry, strike, option_type, stop_loss
         order.orderType = 'MKT'
         order.totalQuantity = quantity
         order.tif = 'GTC'  # Explicitly set Time in Force to prevent preset conflicts
-        
-        # Place the parent order
-        trade = ib.placeOrder(contract, order)
+        order.orderRef = new_order_ref()
+        journal('intent', order.orderRef, action=action, ticker=ticker, quantity=quantity,
+                expiry=expiry, strike=strike, right=option_type, orderType=execution_order_type(execution),
+                stopLossPct=stop_loss_pct, takeProfitPct=take_profit_pct, execution=execution)
+        
+        # Contract-specific tick sizes (penny pilot, index options, ...)
+        with span('price_increments', 'place_order'):
+            price_increments = get_price_increments(contract)
+        log(f"Price increments for {ticker}: {price_increments}")
+        
+        # Place the parent order (MKT, or worked as a marketable limit)
+        with span('submit', 'place_order', execution=bool(execution)):
+            trade, execution_report = submit_order(contract, order, execution, price_increments)
+        journal('submitted', order.orderRef, trade, conId=contract.conId, orderType=order.orderType)
         log(f"Parent order placed: {trade}")
         
-        # Wait for the order to fill
-        timeout = 30  # 30 seconds timeout
-        start_time = time.time()
-        while not trade.isDone():
-            ib.sleep(0.5)
-            if time.time() - start_time > timeout:
-                log("Timeout waiting for order to fill")
-                return {
-                    "success": False,
-                    "message": "Order placement timeout - check TWS for order status"
-                }
-        
-        # Check if order was filled
-        if trade.orderStatus.status != 'Filled':
-            log(f"Order not filled. Status: {trade.orderStatus.status}")
-            return {
-                "success": False,
-                "message": f"Order not filled. Status: {trade.orderStatus.status}"
-            }
-        
-        # Get the fill price - try multiple methods
-        fill_price = None
-        log(f"Trade status: {trade.orderStatus}")
-        log(f"Trade fills: {trade.fills}")
-        
-        # Method 1: Check fills list
-        if trade.fills and len(trade.fills) > 0:
-            # Calculate average fill price from fills
-            total_quantity = 0
-            total_value = 0
-            for fill in trade.fills:
-                fill_qty = fill.execution.shares
-                fill_px = fill.execution.price
-                total_quantity += fill_qty
-                total_value += fill_qty * fill_px
-                log(f"Fill: {fill_qty} @ ${fill_px}")
-            
-            if total_quantity > 0:
-                fill_price = total_value / total_quantity
-                log(f"Calculated fill price from fills: ${fill_price:.2f}")
-        
-        # Method 2: Use avgFillPrice from order status
-        if fill_price is None or fill_price == 0:
-            fill_price = trade.orderStatus.avgFillPrice
-            log(f"Using avgFillPrice from orderStatus: ${fill_price}")
-        
-        # Validate fill price
-        if fill_price is None or fill_price <= 0:
-            log(f"ERROR: Invalid fill price: {fill_price}")
-            return {
-                "success": False,
-                "message": f"Could not determine fill price. Order may have filled at ${fill_price}"
-            }
-        
-        log(f"Final fill price: ${fill_price:.2f}")
+        # Wait for the fill and work out the average fill price
+        with span('wait_for_fill', 'place_order'):
+            fill_price, error = wait_for_fill(trade)
+        if error:
+            if execution_report:
+                error['execution'] = execution_report
+            return error
         
-        # Helper function to round price to valid tick size (0.05 for options under $3, 0.10 for $3+)
-        def round_to_tick(price):
-            if price < 3:
-                tick_size = 0.05
-            else:
-                tick_size = 0.10
-            return round(price / tick_size) * tick_size
-        
-        # Helper function to check if value is numeric
-        def is_numeric_value(val):
-            if val is None or val == '':
-                return False
-            try:
-                float(val)
-                return True
-            except (ValueError, TypeError):
-                return False
-        
-        # Check if we need to place bracket orders
-        has_stop_loss = is_numeric_value(stop_loss_pct)
-        has_take_profit = is_numeric_value(take_profit_pct)
-        
-        log(f"Bracket order check: has_stop_loss={has_stop_loss}, has_take_profit={has_take_profit}")
-        
-        bracket_messages = []
-        
-        if has_stop_loss or has_take_profit:
-            log(f"Placing bracket orders with OCA group - SL: {stop_loss_pct}, TP: {take_profit_pct}")
-            
-            # Create unique OCA group name for this bracket
-            import time as time_module
-            oca_group = f"Bracket_{int(time_module.time() * 1000)}"
-            log(f"Created OCA group: {oca_group}")
-            
-            # Prepare bracket orders
-            sl_order = None
-            tp_order = None
-            
-            # Calculate and create stop loss order
-            if has_stop_loss:
-                try:
-                    sl_pct = float(stop_loss_pct)
-                    stop_price_raw = fill_price * (1 - sl_pct / 100)
-                    stop_price = round_to_tick(stop_price_raw)
-                    log(f"Stop Loss calculation: {sl_pct}% of ${fill_price:.2f} = ${stop_price_raw:.3f} -> rounded to ${stop_price:.2f}")
-                    
-                    # Create stop loss order
-                    sl_order = Order()
-                    sl_order.action = 'SELL' if action == 'BUY' else 'BUY'
-                    sl_order.orderType = 'STP'
-                    sl_order.totalQuantity = quantity
-                    sl_order.auxPrice = stop_price
-                    sl_order.transmit = True #not has_take_profit  # Only transmit if there's no TP order
-                    sl_order.outsideRth = True
-                    sl_order.eTradeOnly = False  # Allow order to be transmitted
-                    sl_order.firmQuoteOnly = False  # Don't wait for firm quote
-                    
-                    # OCA settings for bracket (link with TP if both exist)
-                    if has_take_profit:
-                        sl_order.ocaGroup = oca_group
-                        sl_order.ocaType = 1  # Cancel all remaining orders in group when one fills
-                    
-                    bracket_messages.append(f"Stop Loss at ${stop_price:.2f}")
-                except ValueError as ve:
-                    log(f"ValueError with stop loss percentage: {stop_loss_pct} - {ve}")
-                except Exception as e:
-                    log(f"Error preparing stop loss order: {str(e)}")
-            
-            # Calculate and create take profit order
-            if has_take_profit:
-                try:
-                    tp_pct = float(take_profit_pct)
-                    limit_price_raw = fill_price * (1 + tp_pct / 100)
-                    limit_price = round_to_tick(limit_price_raw)
-                    log(f"Take Profit calculation: {tp_pct}% of ${fill_price:.2f} = ${limit_price_raw:.3f} -> rounded to ${limit_price:.2f}")
-                    
-                    # Create take profit order
-                    tp_order = Order()
-                    tp_order.action = 'SELL' if action == 'BUY' else 'BUY'
-                    tp_order.orderType = 'LMT'
-                    tp_order.totalQuantity = quantity
-                    tp_order.lmtPrice = limit_price
-                    tp_order.transmit = True  # Always transmit the last order
-                    tp_order.outsideRth = True
-                    tp_order.eTradeOnly = False  # Allow order to be transmitted
-                    tp_order.firmQuoteOnly = False  # Don't wait for firm quote
-                    
-                    # OCA settings for bracket (link with SL if both exist)
-                    if has_stop_loss:
-                        tp_order.ocaGroup = oca_group
-                        tp_order.ocaType = 1  # Cancel all remaining orders in group when one fills
-                    
-                    bracket_messages.append(f"Take Profit at ${limit_price:.2f}")
-                except ValueError as ve:
-                    log(f"ValueError with take profit percentage: {take_profit_pct} - {ve}")
-                except Exception as e:
-                    log(f"Error preparing take profit order: {str(e)}")
-            
-            # Submit bracket orders
-            if sl_order:
-                log(f"Submitting stop loss order with OCA group: {sl_order.ocaGroup if hasattr(sl_order, 'ocaGroup') and sl_order.ocaGroup else 'None'}")
-                sl_trade = ib.placeOrder(contract, sl_order)
-                ib.sleep(0.5)
-                log(f"Stop loss order placed: {sl_trade}")
-            
-            if tp_order:
-                log(f"Submitting take profit order with OCA group: {tp_order.ocaGroup if hasattr(tp_order, 'ocaGroup') and tp_order.ocaGroup else 'None'}")
-                tp_trade = ib.placeOrder(contract, tp_order)
-                ib.sleep(0.5)
-                log(f"Take profit order placed: {tp_trade}")
-            
-            if has_stop_loss and has_take_profit:
-                log(f"Bracket orders linked via OCA group '{oca_group}' - one-cancels-all enabled")
-        else:
-            log("No bracket orders to place (SL/TP not set)")
+        filled = filled_quantity(trade, quantity)
+        with span('brackets', 'place_order'):
+            bracket_messages = place_bracket_orders(contract, action, filled, fill_price,
+                                                    stop_loss_pct, take_profit_pct,
+                                                    price_increments, order.orderRef)
         
         # Build success message
-        base_message = f"{action} order filled: {quantity} {ticker} {expiry} {strike}{option_type} @ ${fill_price:.2f}"
+        filled_text = f"{filled}" if filled == quantity else f"{filled} of {quantity}"
+        base_message = f"{action} order filled: {filled_text} {ticker} {expiry} {strike}{option_type} @ ${fill_price:.2f}"
         if bracket_messages:
             base_message += " with " + ", ".join(bracket_messages)
         
         log(f"=== Order placement complete: {base_message} ===")
         
-        return {
+        result = {
             "success": True,
-            "message": base_message
+            "message": base_message,
+            "filledQuantity": filled
         }
+        if execution_report:
+            result['execution'] = execution_report
+        return result
         
     except Exception as e:
         log(f"Error placing order: {str(e)}\\n{traceback.format_exc()}")
@@ -315,91 +909,172 @@ def place_order(action, ticker, quantity, expiry, strike, option_type, stop_loss
 
 
 
-def get_positions():
-    """Get positions"""
+def resolve_option_conids(ticker, legs):
+    """conIds for combo legs, qualifying only the ones not already cached (in one batch)"""
+    keys = [(ticker, str(leg['expiry']), float(leg['strike']), leg['optionType']) for leg in legs]
+    missing = [key for key in dict.fromkeys(keys) if key not in option_conid_cache]
+    if missing:
+        contracts = [Option(symbol, expiry, strike, right, 'SMART', currency='USD', multiplier='100')
+                     for symbol, expiry, strike, right in missing]
+        ib.qualifyContracts(*contracts)
+        for key, contract in zip(missing, contracts):
+            if contract.conId:
+                option_conid_cache[key] = contract.conId
+    return [option_conid_cache.get(key) for key in keys]
+
+
+def place_combo_order(ticker, legs, action, quantity, order_type='LMT', limit_price=None,
+                      stop_loss_pct='', take_profit_pct=''):
+    """
+    Place a multi-leg spread as one BAG order (net limit or market), with optional
+    SL/TP bracket orders on the combo's net fill price
+    """
     try:
-        log("Requesting positions from ib_insync...")
-        
-        # Get portfolio items (more detailed than positions)
-        portfolio_items = ib.portfolio()
-        log(f"Got {len(portfolio_items)} portfolio items from TWS")
-        position_list = []
-        
-        for item in portfolio_items:
-            try:
-                log(f"Processing portfolio item: {item}")
-                
-                # Get values from portfolio item
-                market_value = float(item.marketValue)
-                unrealized_pnl = float(item.unrealizedPNL)
-                realized_pnl = float(item.realizedPNL) if hasattr(item, 'realizedPNL') else 0
-                
-                # Daily P&L is typically realized + unrealized for the day
-                daily_pnl = unrealized_pnl  # For now, use unrealized as daily P&L
-                
-                # Fix avgCost for options: divide by 100 to show per-share cost
-                avg_cost = float(item.averageCost)
-                if item.contract.secType == 'OPT':
-                    avg_cost = avg_cost / 100
-                    log(f"Option position detected, adjusted avgCost from {item.averageCost} to {avg_cost}")
-                
-                position_data = {
-                    'symbol': f"{item.contract.symbol} {item.contract.lastTradeDateOrContractMonth} {item.contract.strike}{item.contract.right}",
-                    'position': float(item.position),
-                    'avgCost': avg_cost,
-                    'marketValue': market_value,
-                    'unrealizedPNL': unrealized_pnl,
-                    'dailyPNL': daily_pnl
-                }
-                log(f"Position data: {position_data}")
-                position_list.append(position_data)
-            except Exception as e:
-                log(f"Error processing portfolio item: {str(e)}\n{traceback.format_exc()}")
-                continue
-        
-        # If no portfolio items, fall back to positions
-        if len(position_list) == 0:
-            log("No portfolio items found, falling back to positions...")
-            positions = ib.positions()
-            log(f"Got {len(positions)} positions from TWS")
-            
-            for position in positions:
-                try:
-                    log(f"Processing position: {position}")
-                    market_value = position.position * position.avgCost
-                    unrealized_pnl = 0
-                    
-                    if hasattr(position, 'unrealizedPNL'):
-                        unrealized_pnl = position.unrealizedPNL
-                    
-                    avg_cost = float(position.avgCost)
-                    if position.contract.secType == 'OPT':
-                        avg_cost = avg_cost / 100
-                        log(f"Option position detected, adjusted avgCost from {position.avgCost} to {avg_cost}")
-                    
-                    position_data = {
-                        'symbol': f"{position.contract.symbol} {position.contract.lastTradeDateOrContractMonth} {position.contract.strike}{position.contract.right}",
-                        'position': float(position.position),
-                        'avgCost': avg_cost,
-                        'marketValue': float(market_value),
-                        'unrealizedPNL': float(unrealized_pnl),
-                        'dailyPNL': float(unrealized_pnl)  # Use unrealized as daily P&L
-                    }
-                    log(f"Position data: {position_data}")
-                    position_list.append(position_data)
-                except Exception as e:
-                    log(f"Error processing position: {str(e)}\n{traceback.format_exc()}")
-                    continue
-        
-        log(f"Returning {len(position_list)} positions")
-        return {"success": True, "positions": position_list}
+        log(f"=== Starting combo order placement: {action} {quantity} {ticker} {len(legs)} legs ===")
+
+        is_open, message = is_market_open()
+        if not is_open:
+            log(f"Combo order rejected: {message}")
+            return {"success": False, "message": message}
+
+        if len(legs) < 2:
+            return {"success": False, "message": "A combo order needs at least two legs"}
+
+        con_ids = resolve_option_conids(ticker, legs)
+        if not all(con_ids):
+            unresolved = [f"{leg['expiry']} {leg['strike']}{leg['optionType']}" for leg, c in zip(legs, con_ids) if not c]
+            return {"success": False, "message": f"Could not resolve legs: {', '.join(unresolved)}"}
+
+        # Build the BAG contract
+        contract = Contract()
+        contract.symbol = ticker
+        contract.secType = 'BAG'
+        contract.exchange = 'SMART'
+        contract.currency = 'USD'
+        contract.comboLegs = [ComboLeg(conId=con_id, ratio=int(leg.get('ratio', 1)),
+                                       action=leg['action'], exchange='SMART')
+                              for leg, con_id in zip(legs, con_ids)]
+        log(f"Combo contract: {contract}")
+
+        order = Order()
+        order.action = action
+        order.orderType = order_type
+        order.totalQuantity = quantity
+        order.tif = 'GTC'
+        order.orderRef = new_order_ref('TT-COMBO')
+
+        # Net prices follow the first leg's tick-size rules
+        price_increments = get_price_increments(Contract(conId=con_ids[0], exchange='SMART'))
+        if order_type == 'LMT':
+            if limit_price is None:
+                return {"success": False, "message": "Limit combo orders need a net limit price"}
+            order.lmtPrice = round_to_tick(float(limit_price), price_increments)
+
+        legs_text = " / ".join(f"{leg['action']} {leg.get('ratio', 1)} {leg['expiry']} {leg['strike']}{leg['optionType']}"
+                               for leg in legs)
+        journal('intent', order.orderRef, action=action, ticker=ticker, quantity=quantity,
+                orderType=order_type, limitPrice=order.lmtPrice if order_type == 'LMT' else None,
+                legs=[dict(leg, conId=con_id) for leg, con_id in zip(legs, con_ids)],
+                stopLossPct=stop_loss_pct, takeProfitPct=take_profit_pct)
+
+        trade = ib.placeOrder(contract, order)
+        journal('submitted', order.orderRef, trade)
+        log(f"Combo order placed: {trade}")
+
+        fill_price, error = wait_for_fill(trade, allow_credit=True)
+        if error:
+            return error
+
+        filled = filled_quantity(trade, quantity)
+        bracket_messages = place_bracket_orders(contract, action, filled, fill_price,
+                                                stop_loss_pct, take_profit_pct,
+                                                price_increments, order.orderRef)
+
+        filled_text = f"{filled}" if filled == quantity else f"{filled} of {quantity}"
+        base_message = f"{action} combo filled: {filled_text} {ticker} [{legs_text}] @ net ${fill_price:.2f}"
+        if bracket_messages:
+            base_message += " with " + ", ".join(bracket_messages)
+        log(f"=== Combo order placement complete: {base_message} ===")
+
+        return {"success": True, "message": base_message, "fillPrice": fill_price, "filledQuantity": filled}
+
+    except Exception as e:
+        log(f"Error placing combo order: {str(e)}\n{traceback.format_exc()}")
+        return {"success": False, "message": f"Failed to place combo order: {str(e)}"}
+
+
+def portfolio_row(item):
+    """get_positions row for an ib_insync PortfolioItem (option avgCost per share)"""
+    avg_cost = float(item.averageCost)
+    if item.contract.secType == 'OPT':
+        avg_cost = avg_cost / 100
+    unrealized_pnl = float(item.unrealizedPNL)
+    return {
+        'conId': item.contract.conId,
+        'symbol': f"{item.contract.symbol} {item.contract.lastTradeDateOrContractMonth} {item.contract.strike}{item.contract.right}",
+        'position': float(item.position),
+        'avgCost': avg_cost,
+        'marketValue': float(item.marketValue),
+        'unrealizedPNL': unrealized_pnl,
+        'dailyPNL': unrealized_pnl  # For now, use unrealized as daily P&L
+    }
+
+
+def position_row(position):
+    """Fallback row from an ib_insync Position (before portfolio values arrive)"""
+    avg_cost = float(position.avgCost)
+    if position.contract.secType == 'OPT':
+        avg_cost = avg_cost / 100
+    return {
+        'conId': position.contract.conId,
+        'symbol': f"{position.contract.symbol} {position.contract.lastTradeDateOrContractMonth} {position.contract.strike}{position.contract.right}",
+        'position': float(position.position),
+        'avgCost': avg_cost,
+        'marketValue': float(position.position * position.avgCost),
+        'unrealizedPNL': 0.0,
+        'dailyPNL': 0.0
+    }
+
+
+def on_portfolio_update(item):
+    """ib.updatePortfolioEvent hook: keep the versioned position table current"""
+    if item.position == 0:
+        position_table.remove(item.contract.conId)
+    else:
+        position_table.update(item.contract.conId, portfolio_row(item))
+
+
+def load_positions():
+    """(Re)load the position table from ib_insync's portfolio, falling back to positions"""
+    rows = {item.contract.conId: portfolio_row(item) for item in ib.portfolio() if item.position}
+    if not rows:
+        rows = {pos.contract.conId: position_row(pos) for pos in ib.positions() if pos.position}
+    if not position_table.loaded:
+        ib.updatePortfolioEvent += on_portfolio_update
+    position_table.replace(rows)
+
+
+def get_positions(since_version=None, epoch=None):
+    """
+    Positions from the versioned table. With the version and epoch of an earlier
+    reply, only rows added, changed or removed since then come back (or 'unchanged')
+    """
+    try:
+        if not position_table.rows:
+            load_positions()
+        result = position_table.changes_since(since_version, epoch)
+        if result.get('full'):
+            log(f"Returning {len(result['positions'])} positions (version {result['version']})")
+        elif not result.get('unchanged'):
+            log(f"Returning position changes {since_version} -> {result['version']}: {len(result['added'])} added, "
+                f"{len(result['changed'])} changed, {len(result['removed'])} removed")
+        return {"success": True, **result}
         
     except Exception as e:
         log(f"Error getting positions: {str(e)}\n{traceback.format_exc()}")
         return {"success": False, "message": f"Failed to get positions: {str(e)}", "positions": []}
 
 
-
 def get_balance():
     """Get account balance"""
     try:
@@ -430,11 +1105,18 @@ def get_ticker_price(ticker):
     """Get ticker price"""
     try:
         log(f"Requesting ticker price for {ticker}...")
-        contract = Stock(ticker, 'SMART', 'USD')
-        ib.qualifyContracts(contract)
+        ticker_data = ticker_cache.get(ticker)
+        if ticker_data is None or not (ticker_data.marketPrice() > 0):
+            contract = contract_cache.get(ticker)
+            if contract is None:
+                contract = Stock(ticker, 'SMART', 'USD')
+                ib.qualifyContracts(contract)
+                contract_cache[ticker] = contract
 
-        ticker_data = ib.reqMktData(contract, '', False, False)
-        ib.sleep(2)
+            if ticker_data is None:
+                ticker_data = ib.reqMktData(contract, '', False, False)
+                ticker_cache[ticker] = ticker_data
+            ib.sleep(2)
 
         price = ticker_data.marketPrice()
         if price and price > 0:
@@ -456,20 +1138,93 @@ def get_ticker_price(ticker):
         log(f"Error getting ticker price: {str(e)}\n{traceback.format_exc()}")
         return {"success": False, "message": f"Failed to get ticker price: {str(e)}", "price": 0}
 
-def validate_ticker(ticker):
-    """Validate if ticker is valid and supports options trading"""
+def extract_price(ticker_data):
+    """Best available price from a Ticker (market price, then last, then close)"""
+    for price in (ticker_data.marketPrice(), ticker_data.last, ticker_data.close):
+        if price and price > 0:
+            return float(price)
+    return None
+
+
+def get_ticker_prices(tickers, request_id=None, timeout=5, max_concurrency=40):
+    """
+    Quote a whole list of symbols at once. Cached streaming tickers answer
+    immediately; the rest are qualified in one batch and requested as snapshots
+    with bounded concurrency. A 'quote' event is streamed per symbol as soon as
+    it has a price, and everything shares one overall deadline.
+    """
     try:
-        log(f"Validating ticker: {ticker}...")
-        
-        # Create stock contract
-        stock_contract = Stock(ticker, 'SMART', 'USD')
-        qualified = ib.qualifyContracts(stock_contract)
-        
+        symbols = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+        log(f"Requesting quotes for {len(symbols)} tickers (deadline {timeout}s)...")
+        quotes = {}
+        deadline = time.time() + timeout
+
+        def report(symbol, price):
+            quotes[symbol] = price
+            send_event("quote", {"requestId": request_id, "symbol": symbol, "price": price})
+
+        async def run():
+            pending = [Stock(t, 'SMART', 'USD') for t in symbols if t not in contract_cache]
+            if pending:
+                await ib.qualifyContractsAsync(*pending)
+                for contract in pending:
+                    if contract.conId:
+                        contract_cache[contract.symbol] = contract
+
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def quote(symbol):
+                cached = ticker_cache.get(symbol)
+                price = extract_price(cached) if cached is not None else None
+                if price is not None:
+                    report(symbol, price)
+                    return
+                contract = contract_cache.get(symbol)
+                if contract is None:
+                    return
+                async with semaphore:
+                    ticker_data = ib.reqMktData(contract, '', True, False)
+                    while time.time() < deadline:
+                        price = extract_price(ticker_data)
+                        if price is not None:
+                            report(symbol, price)
+                            return
+                        await asyncio.sleep(0.05)
+
+            await asyncio.gather(*(quote(symbol) for symbol in symbols))
+
+        ib.run(run())
+
+        missing = [symbol for symbol in symbols if symbol not in quotes]
+        if missing:
+            log(f"No quote before deadline for: {missing}")
+        return {"success": True, "prices": quotes, "missing": missing}
+
+    except Exception as e:
+        log(f"Error getting ticker prices: {str(e)}\n{traceback.format_exc()}")
+        return {"success": False, "message": f"Failed to get ticker prices: {str(e)}", "prices": {}}
+
+
+def validate_ticker(ticker):
+    """Validate if ticker is valid and supports options trading"""
+    try:
+        log(f"Validating ticker: {ticker}...")
+
+        # Warm cache hit from connect-time prefetch
+        if option_params_cache.get(ticker):
+            log(f"Options trading verified for {ticker} (cached)")
+            return {"success": True, "message": f"{ticker} is valid and supports options trading"}
+        
+        # Create stock contract
+        stock_contract = Stock(ticker, 'SMART', 'USD')
+        qualified = ib.qualifyContracts(stock_contract)
+        
         if not qualified or len(qualified) == 0:
             log(f"Ticker {ticker} not found or invalid")
             return {"success": False, "message": f"Invalid ticker symbol: {ticker}"}
         
         log(f"Stock contract qualified: {qualified[0]}")
+        contract_cache[ticker] = qualified[0]
         
         # Try to get option chain to verify options trading is available
         # Request option chain for the stock
@@ -487,6 +1242,7 @@ def validate_ticker(ticker):
             log(f"No options chain found for {ticker}")
             return {"success": False, "message": f"{ticker} does not support options trading"}
         
+        option_params_cache[ticker] = chains
         log(f"Options trading verified for {ticker}")
         return {"success": True, "message": f"{ticker} is valid and supports options trading"}
         
@@ -495,6 +1251,65 @@ def validate_ticker(ticker):
         return {"success": False, "message": f"Invalid or unsupported ticker: {ticker}"}
 
 
+def validate_tickers(tickers, request_id=None, max_concurrency=8):
+    """
+    Validate a whole watchlist in one pass: qualify all symbols in a single batch,
+    then fetch option parameters with bounded parallelism. A 'validate_result'
+    event is streamed for each symbol as soon as it resolves.
+    """
+    try:
+        symbols = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+        log(f"Bulk validating {len(symbols)} tickers (max {max_concurrency} concurrent)...")
+        results = {}
+
+        def report(symbol, status, con_id=None):
+            results[symbol] = {"status": status, "conId": con_id}
+            send_event("validate_result", {"requestId": request_id, "symbol": symbol,
+                                           "status": status, "conId": con_id})
+
+        async def run():
+            pending = [Stock(t, 'SMART', 'USD') for t in symbols if t not in contract_cache]
+            if pending:
+                await ib.qualifyContractsAsync(*pending)
+                for contract in pending:
+                    if contract.conId:
+                        contract_cache[contract.symbol] = contract
+
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def check(symbol):
+                contract = contract_cache.get(symbol)
+                if contract is None:
+                    report(symbol, 'unknown')
+                    return
+                chains = option_params_cache.get(symbol)
+                if chains is None:
+                    try:
+                        async with semaphore:
+                            chains = await ib.reqSecDefOptParamsAsync(
+                                contract.symbol, '', contract.secType, contract.conId)
+                    except Exception as e:
+                        log(f"Error fetching option params for {symbol}: {str(e)}")
+                        chains = []
+                    if chains:
+                        option_params_cache[symbol] = chains
+                report(symbol, 'valid' if chains else 'no_options', contract.conId)
+
+            await asyncio.gather(*(check(symbol) for symbol in symbols))
+
+        ib.run(run())
+
+        valid_count = sum(1 for r in results.values() if r['status'] == 'valid')
+        log(f"Bulk validation complete: {valid_count}/{len(symbols)} valid")
+        return {
+            "success": True,
+            "message": f"{valid_count} of {len(symbols)} tickers are valid and support options trading",
+            "results": results
+        }
+
+    except Exception as e:
+        log(f"Error validating tickers: {str(e)}\n{traceback.format_exc()}")
+        return {"success": False, "message": f"Failed to validate tickers: {str(e)}", "results": {}}
 
 
 def get_daily_pnl():
@@ -532,7 +1347,7 @@ def get_daily_pnl():
 
 
 
-def close_position(symbol, position):
+def close_position(symbol, position, execution=None):
     """Close position"""
     try:
         
@@ -573,12 +1388,19 @@ def close_position(symbol, position):
         order.totalQuantity = abs(position)
         
         log(f"Placing closing order: action={action}, quantity={abs(position)}")
+        order.orderRef = new_order_ref('TT-CLOSE')
+        journal('intent', order.orderRef, action=action, symbol=symbol, quantity=abs(position),
+                orderType=execution_order_type(execution))
         
-        # Place the order
-        trade = ib.placeOrder(contract, order)
+        # Place the order (MKT, or worked as a marketable limit)
+        trade, execution_report = submit_order(contract, order, execution)
+        journal('submitted', order.orderRef, trade, conId=contract.conId, orderType=order.orderType)
         ib.sleep(1)
         
-        return {"success": True, "message": f"Position closed for {symbol}"}
+        result = {"success": True, "message": f"Position closed for {symbol}"}
+        if execution_report:
+            result['execution'] = execution_report
+        return result
         
     except Exception as e:
         log(f"Error closing position: {str(e)}\n{traceback.format_exc()}")
@@ -586,7 +1408,7 @@ def close_position(symbol, position):
 
 
 
-def close_all_positions():
+def close_all_positions(execution=None):
     """Close all positions"""
     try:
         log("=== Starting close all positions ===")
@@ -605,6 +1427,7 @@ def close_all_positions():
         
         closed_count = 0
         failed_count = 0
+        execution_reports = {}
         
         for pos in positions:
             try:
@@ -637,9 +1460,15 @@ def close_all_positions():
                 
                 pos_symbol = f"{pos.contract.symbol} {pos.contract.lastTradeDateOrContractMonth} {pos.contract.strike}{pos.contract.right}"
                 log(f"Closing position: {pos_symbol}, action={action}, quantity={abs(pos.position)}")
+                order.orderRef = new_order_ref('TT-CLOSE')
+                journal('intent', order.orderRef, action=action, symbol=pos_symbol,
+                        quantity=abs(pos.position), orderType=execution_order_type(execution))
                 
-                # Place the order
-                trade = ib.placeOrder(contract, order)
+                # Place the order (MKT, or worked as a marketable limit)
+                trade, execution_report = submit_order(contract, order, execution)
+                journal('submitted', order.orderRef, trade, conId=contract.conId, orderType=order.orderType)
+                if execution_report:
+                    execution_reports[pos_symbol] = execution_report
                 ib.sleep(0.5)
                 
                 closed_count += 1
@@ -649,18 +1478,19 @@ def close_all_positions():
                 continue
         
         if failed_count == 0:
-            return {"success": True, "message": f"Successfully closed {closed_count} positions"}
+            result = {"success": True, "message": f"Successfully closed {closed_count} positions"}
         else:
-            return {"success": True, "message": f"Closed {closed_count} positions, {failed_count} failed"}
+            result = {"success": True, "message": f"Closed {closed_count} positions, {failed_count} failed"}
+        if execution_reports:
+            result['execution'] = execution_reports
+        return result
         
     except Exception as e:
         log(f"Error closing all positions: {str(e)}\n{traceback.format_exc()}")
         return {"success": False, "message": f"Failed to close all positions: {str(e)}"}
 
 
-import sys
-
-def get_option_chain(ticker):
+def get_option_chain(ticker, cancel_event=None):
     """Get option chain for ticker using IBAPI (separate module to avoid ib_insync conflicts)"""
     try:
         log(f"Delegating option chain request for {ticker} to IBAPI module...")
@@ -668,20 +1498,30 @@ def get_option_chain(ticker):
         # Import the IBAPI option chain module
         from option_chain_ibapi import get_option_chain_ibapi
         
-        # Get connection parameters from global variables (set in main)
-        # These are the same connection params used for ib_insync
-        if len(sys.argv) >= 4:
-            host = sys.argv[1]
-            port = sys.argv[2]
-            client_id = sys.argv[3]
-        else:
-            # Fallback to defaults
-            host = '127.0.0.1'
-            port = '4002'
-            client_id = '1'
-        
-        # Call the IBAPI module
-        result = get_option_chain_ibapi(ticker, host, port, client_id)
+        # Same connection params used for ib_insync (set in main)
+        result = get_option_chain_ibapi(ticker, connection_params['host'],
+                                        connection_params['port'], connection_params['client_id'],
+                                        cancel_event)
+
+        # Keep the fetched greeks for strike-for-delta queries
+        if result.get('success') and result.get('optionChain'):
+            rows = result['optionChain']
+            ticker = ticker.upper()
+            index = get_chain_index(ticker)
+            if index is not None:
+                expiry = rows[0]['expiryRaw']
+                index.update_deltas(expiry, 'C', {row['strike']: row['callDelta'] for row in rows})
+                index.update_deltas(expiry, 'P', {row['strike']: row['putDelta'] for row in rows})
+
+            if chain_exporter is not None:
+                chain_exporter.add_chain(ticker, rows, result.get('currentPrice'))
+
+            # Fold the chain's IVs into an existing vol surface
+            if ticker in vol_surfaces:
+                surface = use_vol_surface(ticker)
+                for row in rows:
+                    surface.update(row['expiryRaw'], row['strike'], 'C', row['callIV'] / 100)
+                    surface.update(row['expiryRaw'], row['strike'], 'P', row['putIV'] / 100)
         return result
         
     except Exception as e:
@@ -689,7 +1529,787 @@ def get_option_chain(ticker):
         return {"success": False, "message": f"Failed to get option chain: {str(e)}", "optionChain": []}
 
 
-def handle_command(command):
+def get_chain_index(ticker):
+    """Strike/expiry index for an underlying, built once from its secDef option parameters"""
+    index = chain_indexes.get(ticker)
+    if index is not None:
+        return index
+
+    chains = option_params_cache.get(ticker)
+    if not chains:
+        contract = contract_cache.get(ticker)
+        if contract is None:
+            contract = Stock(ticker, 'SMART', 'USD')
+            if not ib.qualifyContracts(contract):
+                return None
+            contract_cache[ticker] = contract
+        chains = ib.reqSecDefOptParams(contract.symbol, '', contract.secType, contract.conId)
+        if not chains:
+            return None
+        option_params_cache[ticker] = chains
+
+    primary = next((c for c in chains if c.tradingClass == ticker and c.exchange == 'SMART'), None)
+    primary = primary or next((c for c in chains if c.tradingClass == ticker), chains[0])
+    index = ChainIndex(primary.strikes, primary.expirations)
+    chain_indexes[ticker] = index
+    log(f"Built chain index for {ticker}: {len(index.strikes)} strikes, {len(index.expirations)} expiries")
+    return index
+
+
+def query_chain_index(query, data):
+    """Answer ATM / strikes-around / strike-for-delta / DTE-window queries from the chain index"""
+    try:
+        ticker = data.get('ticker', '').upper()
+        index = get_chain_index(ticker)
+        if index is None:
+            return {"success": False, "message": f"No option chain found for {ticker}"}
+
+        if query == 'expiries':
+            expiries = index.expiries_in_window(int(data.get('minDte', 0)), int(data.get('maxDte', 45)))
+            return {"success": True, "expirations": expiries}
+
+        if query == 'delta':
+            expiry = data.get('expiry') or index.nearest_expiry()
+            match = index.strike_for_delta(expiry, data.get('right', 'C'), float(data['delta']))
+            if match is None:
+                return {"success": False, "message": f"No cached greeks for {ticker} {expiry}; fetch the option chain first"}
+            return {"success": True, "expiry": expiry, **match}
+
+        spot = data.get('spot')
+        if not spot:
+            price = get_ticker_price(ticker)
+            if not price.get('success'):
+                return price
+            spot = price['price']
+        spot = float(spot)
+
+        if query == 'atm':
+            return {"success": True, "strike": index.atm_strike(spot), "spot": spot}
+        if query == 'around':
+            return {"success": True, "strikes": index.strikes_around(spot, int(data.get('count', 12))), "spot": spot}
+        return {"success": False, "message": f"Unknown chain query: {query}"}
+
+    except Exception as e:
+        log(f"Error querying chain index: {str(e)}\n{traceback.format_exc()}")
+        return {"success": False, "message": f"Failed to query option chain: {str(e)}"}
+
+
+def load_historical_bars(contract, bar_size='1 day', what_to_show=None):
+    """
+    Bring the local bar cache for a contract up to date and return its BarStore key.
+    Only the gap after the last cached bar is requested from TWS.
+    """
+    what_to_show = what_to_show or ('MIDPOINT' if contract.secType == 'OPT' else 'TRADES')
+    last = bar_store.last_timestamp(contract.conId, bar_size)
+    if last is None:
+        duration = INITIAL_DURATIONS.get(bar_size, '1 M')
+    else:
+        duration = gap_duration(time.time() - last, bar_size)
+
+    log(f"Requesting {duration} of {bar_size} bars for conId {contract.conId} (last cached: {last})")
+    bars = ib.reqHistoricalData(contract, endDateTime='', durationStr=duration,
+                                barSizeSetting=bar_size, whatToShow=what_to_show,
+                                useRTH=True, formatDate=2)
+    written = bar_store.append(contract.conId, bar_size, bars or [])
+    log(f"Cached {written} new {bar_size} bars for conId {contract.conId}")
+    return written
+
+
+def get_historical_bars(data):
+    """Historical bars for a ticker or conId from the local cache, filling gaps from TWS first"""
+    try:
+        bar_size = data.get('barSize', '1 day')
+        if data.get('conId'):
+            contract = Contract(conId=int(data['conId']), exchange='SMART')
+            ib.qualifyContracts(contract)
+        else:
+            ticker = data.get('ticker', '').upper()
+            contract = contract_cache.get(ticker)
+            if contract is None:
+                contract = Stock(ticker, 'SMART', 'USD')
+                ib.qualifyContracts(contract)
+                contract_cache[ticker] = contract
+        if not contract.conId:
+            return {"success": False, "message": "Could not resolve contract", "bars": {}}
+
+        load_historical_bars(contract, bar_size, data.get('whatToShow'))
+        columns = bar_store.query(contract.conId, bar_size, data.get('start'), data.get('end'))
+        return {
+            "success": True,
+            "conId": contract.conId,
+            "barSize": bar_size,
+            "bars": {name: values.tolist() for name, values in columns.items()}
+        }
+
+    except Exception as e:
+        log(f"Error getting historical bars: {str(e)}\n{traceback.format_exc()}")
+        return {"success": False, "message": f"Failed to get historical bars: {str(e)}", "bars": {}}
+
+
+def market_data_lines():
+    """Market-data lines the bridge currently holds open"""
+    return (len(ticker_cache) + len(risk_tickers) + len(quote_cache)
+            + sum(len(entry['tickers']) for entry in vol_surfaces.values()))
+
+
+def release_vol_surface(ticker):
+    """Cancel a surface's option lines and drop it"""
+    entry = vol_surfaces.pop(ticker.upper(), None)
+    if entry is None:
+        return {"success": False, "message": f"No vol surface for {ticker.upper()}"}
+    for option_ticker in entry['tickers']:
+        option_ticker.updateEvent -= entry['onTick']
+        if ib.isConnected():
+            ib.cancelMktData(option_ticker.contract)
+    log(f"Released vol surface for {ticker.upper()} ({len(entry['tickers'])} lines)")
+    return {"success": True, "message": f"Released {len(entry['tickers'])} lines for {ticker.upper()}",
+            "lines": len(entry['tickers'])}
+
+
+def use_vol_surface(ticker):
+    """Cached surface for a symbol (or None), marked as most recently used"""
+    entry = vol_surfaces.pop(ticker, None)
+    if entry is None:
+        return None
+    vol_surfaces[ticker] = entry
+    return entry['surface']
+
+
+def build_vol_surface(ticker, max_expiries=8, strikes_per_expiry=10, timeout=8):
+    """
+    Build the IV surface for an underlying from OTM options across the listed expiries.
+    The option subscriptions stay open and each model-greeks tick updates its point
+    in the surface incrementally. Surfaces share MARKET_DATA_LINES with every other
+    line the bridge holds: the least recently used ones are released to make room,
+    and the farthest expiries are left out when that is still not enough.
+    """
+    try:
+        ticker = ticker.upper()
+        index = get_chain_index(ticker)
+        if index is None:
+            return {"success": False, "message": f"No option chain found for {ticker}"}
+        price = get_ticker_price(ticker)
+        if not price.get('success'):
+            return price
+        spot = price['price']
+
+        # Drop the previous surface's market-data lines
+        if ticker in vol_surfaces:
+            release_vol_surface(ticker)
+
+        expiries = index.expiries_in_window(0, 36500)[:max_expiries]
+        strikes = index.strikes_around(spot, strikes_per_expiry)
+        # Out-of-the-money side only: puts below spot, calls at/above
+        contracts = [Option(ticker, expiry, strike, 'P' if strike < spot else 'C', 'SMART',
+                         currency='USD', tradingClass=ticker)
+                     for expiry in expiries for strike in strikes]
+        contracts = [c for c in ib.qualifyContracts(*contracts) if c.conId]
+
+        while vol_surfaces and market_data_lines() + len(contracts) > MARKET_DATA_LINES:
+            release_vol_surface(next(iter(vol_surfaces)))
+        free_lines = MARKET_DATA_LINES - market_data_lines()
+        if free_lines <= 0:
+            return {"success": False, "message": f"No market-data lines free for a vol surface "
+                                                 f"({market_data_lines()} of {MARKET_DATA_LINES} in use)"}
+        if len(contracts) > free_lines:
+            log(f"Vol surface for {ticker} limited to {free_lines} of {len(contracts)} options by the line budget")
+            contracts = contracts[:free_lines]
+        log(f"Building vol surface for {ticker}: {len(contracts)} options across {len(expiries)} expiries")
+
+        surface = VolSurface(spot)
+
+        def on_tick(option_ticker):
+            greeks = option_ticker.modelGreeks
+            if greeks is not None:
+                c = option_ticker.contract
+                surface.update(c.lastTradeDateOrContractMonth, c.strike, c.right, greeks.impliedVol)
+            if chain_exporter is not None and chain_exporter.live:
+                chain_exporter.add_tick(option_ticker)
+
+        option_tickers = []
+        for contract in contracts:
+            option_ticker = ib.reqMktData(contract, '', False, False)
+            option_ticker.updateEvent += on_tick
+            option_tickers.append(option_ticker)
+        vol_surfaces[ticker] = {'surface': surface, 'tickers': option_tickers, 'onTick': on_tick}
+
+        # Wait until most points have reported, bounded by the deadline
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            ib.sleep(0.25)
+            filled = sum(len(smile.points) for smile in surface.smiles.values())
+            if filled >= 0.9 * len(option_tickers):
+                break
+
+        points = sum(len(smile.points) for smile in surface.smiles.values())
+        return {
+            "success": True,
+            "message": f"Vol surface for {ticker}: {points} points across {len(surface.smiles)} expiries",
+            "spot": spot,
+            "strikes": strikes,
+            "surface": surface.grid(strikes)
+        }
+
+    except Exception as e:
+        log(f"Error building vol surface: {str(e)}\n{traceback.format_exc()}")
+        return {"success": False, "message": f"Failed to build vol surface: {str(e)}"}
+
+
+def subscribe_scanner(entry):
+    """(Re)open a scanner subscription; each refresh from TWS is reduced to its changes"""
+    entry['data'] = ib.reqScannerSubscription(entry['subscription'], [], entry['filters'])
+    entry['data'].updateEvent += entry['onUpdate']
+
+
+def start_scanner(data):
+    """
+    Keep a TWS market scanner open (a preset such as hot_option_volume or high_iv_rank,
+    or any scanCode). The response carries the first ranked list; after that only
+    'scanner_update' events with the rows that entered, left or changed are pushed.
+    """
+    try:
+        preset = data.get('preset')
+        scan_code = data.get('scanCode') or PRESETS.get(preset, {}).get('scanCode')
+        if not scan_code:
+            return {"success": False, "message": f"Unknown scanner preset: {preset} "
+                                                 f"(expected one of {', '.join(PRESETS)} or a scanCode)"}
+        name = data.get('id') or preset or scan_code
+        if name in scanners:
+            stop_scanner({'id': name})
+        if len(scanners) >= MAX_SCANNERS:
+            return {"success": False, "message": f"TWS allows at most {MAX_SCANNERS} scanners; stop one first"}
+
+        subscription = ScannerSubscription(numberOfRows=min(int(data.get('rows', MAX_ROWS)), MAX_ROWS),
+                                           instrument=data.get('instrument', 'STK'),
+                                           locationCode=data.get('locationCode', 'STK.US.MAJOR'),
+                                           scanCode=scan_code)
+        filters = [TagValue(tag, str(value)) for tag, value in data.get('filters', {}).items()]
+        ranking = ScanRanking()
+
+        def on_update(scan_data):
+            changes = ranking.update([scan_row(item) for item in scan_data])
+            if changes:
+                send_event('scanner_update', {'scanner': name, **changes}, broadcast=True)
+
+        entry = {'ranking': ranking, 'subscription': subscription, 'filters': filters, 'onUpdate': on_update}
+        subscribe_scanner(entry)
+        scanners[name] = entry
+        log(f"Scanner {name} started: {scan_code} on {subscription.locationCode}")
+
+        # Wait for the first ranked list, bounded by the timeout
+        deadline = time.time() + float(data.get('timeout', 5))
+        while ranking.version == 0 and time.time() < deadline:
+            ib.sleep(0.1)
+
+        return {"success": True, "message": f"Scanner {name} running ({len(ranking.rows)} results)",
+                "scanner": name, "scanCode": scan_code, "version": ranking.version, "results": ranking.ranked()}
+
+    except Exception as e:
+        log(f"Error starting scanner: {str(e)}\n{traceback.format_exc()}")
+        return {"success": False, "message": f"Failed to start scanner: {str(e)}"}
+
+
+def stop_scanner(data):
+    name = data.get('id')
+    entry = scanners.pop(name, None)
+    if entry is None:
+        return {"success": False, "message": f"No scanner named {name}"}
+    entry['data'].updateEvent -= entry['onUpdate']
+    if ib.isConnected():
+        ib.cancelScannerSubscription(entry['data'])
+    log(f"Scanner {name} stopped")
+    return {"success": True, "message": f"Scanner {name} stopped"}
+
+
+def get_scanners(data):
+    """Full ranked list of one scanner (to resync after missed events), or every running scanner"""
+    name = data.get('id')
+    if name:
+        if name not in scanners:
+            return {"success": False, "message": f"No scanner named {name}"}
+        ranking = scanners[name]['ranking']
+        return {"success": True, "scanner": name, "version": ranking.version, "results": ranking.ranked()}
+    return {"success": True, "scanners": [
+        {"scanner": name, "scanCode": entry['subscription'].scanCode,
+         "version": entry['ranking'].version, "results": len(entry['ranking'].rows)}
+        for name, entry in scanners.items()]}
+
+
+def get_implied_vol(ticker, strike, expiry):
+    """IV at an arbitrary (strike, expiry) from the cached surface"""
+    try:
+        ticker = ticker.upper()
+        if ticker not in vol_surfaces:
+            result = build_vol_surface(ticker)
+            if not result.get('success'):
+                return result
+        iv = use_vol_surface(ticker).implied_vol([float(strike)], str(expiry).replace('-', ''))
+        if iv is None:
+            return {"success": False, "message": f"Vol surface for {ticker} has no data yet"}
+        return {"success": True, "iv": round(float(iv[0]) * 100, 2)}
+
+    except Exception as e:
+        log(f"Error getting implied vol: {str(e)}\n{traceback.format_exc()}")
+        return {"success": False, "message": f"Failed to get implied vol: {str(e)}"}
+
+
+def on_risk_greeks(option_ticker):
+    """Ticker.updateEvent hook for held options: feed model greeks into the risk engine"""
+    greeks = option_ticker.modelGreeks
+    if greeks is not None:
+        risk_engine.update_greeks(option_ticker.contract.conId, greeks.delta, greeks.gamma,
+                                  greeks.theta, greeks.vega)
+
+
+def track_position(contract, position):
+    """Feed a position change into the risk engine and keep greeks streaming for held options"""
+    risk_engine.update_position(contract.conId, contract.symbol, contract.secType,
+                                position, contract.multiplier or 1)
+
+    if contract.secType != 'OPT':
+        return
+    if position and contract.conId not in risk_tickers:
+        # Called from updatePortfolioEvent while the loop is running: no blocking qualify,
+        # the conId is enough for TWS to route the market-data request
+        option = Contract(conId=contract.conId, exchange='SMART')
+        option_ticker = ib.reqMktData(option, '', False, False)
+        option_ticker.updateEvent += on_risk_greeks
+        risk_tickers[contract.conId] = option_ticker
+    elif not position and contract.conId in risk_tickers:
+        ib.cancelMktData(risk_tickers.pop(contract.conId).contract)
+
+
+def start_risk_engine():
+    """Seed the risk engine from the current portfolio and follow portfolio updates"""
+    try:
+        for item in ib.portfolio():
+            track_position(item.contract, item.position)
+        ib.updatePortfolioEvent += lambda item: track_position(item.contract, item.position)
+        log(f"Risk engine tracking {len(risk_engine.legs)} legs")
+    except Exception as e:
+        log(f"Error starting risk engine: {str(e)}\n{traceback.format_exc()}")
+
+
+def get_portfolio_greeks():
+    """Net delta/gamma/theta/vega per underlying and for the account"""
+    return {"success": True, **risk_engine.snapshot()}
+
+
+def publish_portfolio_greeks():
+    """Throttled 'portfolio_greeks' push, only when something changed"""
+    now = time.time()
+    if risk_engine.version == last_risk_push['version'] or now - last_risk_push['time'] < RISK_PUSH_INTERVAL:
+        return
+    last_risk_push.update(time=now, version=risk_engine.version)
+    send_event("portfolio_greeks", risk_engine.snapshot())
+
+
+def run_periodic_tasks():
+    """Work done on every loop iteration between commands (pushes, housekeeping)"""
+    supervise_connection()
+    publish_portfolio_greeks()
+    if chain_exporter is not None:
+        chain_exporter.maybe_flush()
+    if profile_session is not None and profile_session.expired():
+        send_event('profile_complete', profile_stop())
+
+
+def start_chain_export(data):
+    """
+    Stream every chain snapshot (and, with live=true, each tick of the vol-surface
+    option lines) into rolling Arrow/Parquet/CSV files under cache/chains
+    """
+    global chain_exporter
+    try:
+        if chain_exporter is not None:
+            chain_exporter.close()
+            chain_exporter = None
+        chain_exporter = ChainExporter(data.get('directory') or EXPORT_DIR, data.get('format', 'auto'),
+                                       bool(data.get('live', False)),
+                                       roll_seconds=float(data.get('rollMinutes', 60)) * 60)
+        log(f"Chain export started: {chain_exporter.fmt} in {chain_exporter.root}")
+        return {"success": True, "message": f"Exporting chains as {chain_exporter.fmt}",
+                **chain_exporter.status()}
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    except Exception as e:
+        log(f"Error starting chain export: {str(e)}\n{traceback.format_exc()}")
+        return {"success": False, "message": f"Failed to start chain export: {str(e)}"}
+
+
+def stop_chain_export():
+    """Flush and close the export; returns the finished files"""
+    global chain_exporter
+    if chain_exporter is None:
+        return {"success": False, "message": "Chain export is not running"}
+    status = chain_exporter.close()
+    chain_exporter = None
+    log(f"Chain export stopped: {status['rowsWritten']} rows in {len(status['files'])} files")
+    return {"success": True, "message": f"Exported {status['rowsWritten']} rows", **status}
+
+
+def publish_quotes(tickers):
+    """ib.pendingTickersEvent hook: copy every updated ticker onto the quote board"""
+    for ticker in tickers:
+        quote_board.update_ticker(ticker)
+
+
+def start_quote_board(path):
+    """Create the shared-memory quote board and keep it fed from ticker and portfolio updates"""
+    global quote_board
+    try:
+        quote_board = QuoteBoard(path)
+        for item in ib.portfolio():
+            quote_board.update_position(item)
+        ib.pendingTickersEvent += publish_quotes
+        ib.updatePortfolioEvent += quote_board.update_position
+        log(f"Quote board at {path} ({quote_board.capacity} slots)")
+    except Exception as e:
+        quote_board = None
+        log(f"Error starting quote board: {str(e)}\n{traceback.format_exc()}")
+
+
+def get_quote_board():
+    """Where local readers find the board (see quote_board.QuoteBoardReader)"""
+    if quote_board is None:
+        return {"success": False, "message": "Quote board is not enabled (start the bridge with --quote-board)"}
+    return {"success": True, "path": quote_board.path, "capacity": quote_board.capacity,
+            "slots": len(quote_board.index)}
+
+
+def get_chain_export():
+    if chain_exporter is None:
+        return {"success": True, "running": False}
+    return {"success": True, "running": True, **chain_exporter.status()}
+
+
+def profile_start(data):
+    """
+    Profile the bridge loop for a bounded window: mode 'cprofile' writes a pstats
+    file, mode 'sample' a collapsed-stack file. Stops itself after `seconds`
+    """
+    global profile_session
+    if profile_session is not None:
+        return {"success": False, "message": f"A {profile_session.mode} profile is already running"}
+    try:
+        profile_session = ProfileSession(data.get('directory') or PROFILE_DIR, data.get('mode', 'cprofile'),
+                                         float(data.get('seconds', 30)),
+                                         float(data.get('intervalMs', 5)) / 1000)
+        log(f"Profiling ({profile_session.mode}) for {profile_session.seconds:g}s into {profile_session.path}")
+        return {"success": True, "message": f"Profiling for {profile_session.seconds:g}s",
+                "mode": profile_session.mode, "path": profile_session.path, "seconds": profile_session.seconds}
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+
+
+def profile_stop():
+    """Stop the running profile early (or on expiry) and report the output file"""
+    global profile_session
+    if profile_session is None:
+        return {"success": False, "message": "No profile is running"}
+    session, profile_session = profile_session, None
+    try:
+        result = session.stop()
+    except Exception as e:
+        log(f"Error writing profile: {str(e)}\n{traceback.format_exc()}")
+        return {"success": False, "message": f"Failed to write profile: {str(e)}"}
+    log(f"Profile written to {result['path']}")
+    return {"success": True, "message": f"Profile written to {result['path']}", **result}
+
+
+def trace_start(data):
+    """Record tracing spans (command, order and chain phases) until trace_stop"""
+    start_tracing(int(data.get('maxEvents', 100000)))
+    log("Tracing started")
+    return {"success": True, "message": "Tracing started"}
+
+
+def trace_stop(data):
+    """Stop tracing and write the spans as a Chrome trace (chrome://tracing, Perfetto)"""
+    if not tracing['enabled']:
+        return {"success": False, "message": "Tracing is not running"}
+    path = data.get('path') or os.path.join(PROFILE_DIR, f"trace-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    count = stop_tracing(path)
+    log(f"Trace of {count} spans written to {path}")
+    return {"success": True, "message": f"Wrote {count} spans", "path": path, "events": count}
+
+
+def run_scenario(data):
+    """
+    What-if P&L grid for the whole portfolio over spot x IV x days-forward shocks.
+    Option legs use live model greeks (IV, underlying price) from the risk engine's
+    subscriptions, falling back to the vol surface / quote caches.
+    """
+    try:
+        spot_shocks = data.get('spotShocks') or [x / 100 for x in range(-10, 11, 2)]
+        vol_shocks = data.get('volShocks') or [-0.10, -0.05, 0.0, 0.05, 0.10]
+        days_forward = data.get('daysForward') or [0, 1, 7]
+        rate = float(data.get('rate', 0.04))
+
+        legs = []
+        skipped = []
+        for item in ib.portfolio():
+            contract = item.contract
+            if not item.position:
+                continue
+            if contract.secType == 'STK':
+                legs.append({'spot': item.marketPrice, 'position': item.position, 'right': ''})
+                continue
+            if contract.secType != 'OPT':
+                skipped.append(contract.localSymbol)
+                continue
+
+            spot, iv = None, None
+            option_ticker = risk_tickers.get(contract.conId)
+            greeks = option_ticker.modelGreeks if option_ticker is not None else None
+            if greeks is not None:
+                spot, iv = greeks.undPrice, greeks.impliedVol
+            if not spot and contract.symbol in ticker_cache:
+                spot = extract_price(ticker_cache[contract.symbol])
+            if not iv and contract.symbol in vol_surfaces and spot:
+                surface_iv = use_vol_surface(contract.symbol).implied_vol(
+                    [contract.strike], contract.lastTradeDateOrContractMonth)
+                iv = float(surface_iv[0]) if surface_iv is not None else None
+            if not spot or not iv:
+                skipped.append(contract.localSymbol)
+                continue
+
+            legs.append({
+                'spot': spot, 'strike': contract.strike, 'iv': iv, 'right': contract.right,
+                'years': year_fraction(contract.lastTradeDateOrContractMonth),
+                'position': item.position, 'multiplier': float(contract.multiplier or 100)
+            })
+
+        start = time.perf_counter()
+        grid = scenario_grid(legs, spot_shocks, vol_shocks, days_forward, rate)
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+        log(f"Scenario grid for {len(legs)} legs computed in {elapsed_ms} ms (skipped {skipped})")
+
+        return {
+            "success": True,
+            "spotShocks": spot_shocks,
+            "volShocks": vol_shocks,
+            "daysForward": days_forward,
+            "pnl": [[[round(v, 2) for v in row] for row in plane] for plane in grid.tolist()],
+            "legs": len(legs),
+            "skipped": skipped,
+            "elapsedMs": elapsed_ms
+        }
+
+    except Exception as e:
+        log(f"Error running scenario: {str(e)}\n{traceback.format_exc()}")
+        return {"success": False, "message": f"Failed to run scenario: {str(e)}"}
+
+
+def execute_command(cmd_type, data, request_id=None, cancel_event=None):
+    """Run a single command and return its result dict"""
+    if not ib.isConnected() and cmd_type not in OFFLINE_COMMANDS:
+        return {"success": False, "message": "Not connected to TWS (reconnecting)"}
+
+    if cmd_type == 'place_order':
+        log(f"Placing order: {data}")
+        
+        # Extract SL/TP parameters
+        stop_loss = data.get('stopLoss', '--')
+        take_profit = data.get('takeProfit', '--')
+        
+        return place_order(
+            data['action'], data['ticker'], data['quantity'],
+            data['expiry'], data['strike'], data['optionType'],
+            stop_loss, take_profit, data.get('execution')
+        )
+        
+    elif cmd_type == 'place_combo_order':
+        log(f"Placing combo order: {data}")
+        return place_combo_order(
+            data['ticker'], data['legs'], data.get('action', 'BUY'), data['quantity'],
+            data.get('orderType', 'LMT'), data.get('limitPrice'),
+            data.get('stopLoss', '--'), data.get('takeProfit', '--')
+        )
+
+    elif cmd_type == 'get_positions':
+        return get_positions(data.get('sinceVersion'), data.get('epoch'))
+        
+    elif cmd_type == 'get_balance':
+        log("Getting balance...")
+        result = get_balance()
+        log(f"Balance result: {result}")
+        return result
+        
+    elif cmd_type == 'close_position':
+        log(f"Closing position: {data}")
+        return close_position(data['symbol'], data['position'], data.get('execution'))
+        
+    elif cmd_type == 'get_daily_pnl':
+        log("Getting daily P&L...")
+        result = get_daily_pnl()
+        log(f"Daily P&L result: {result}")
+        return result
+        
+    elif cmd_type == 'close_all_positions':
+        log("Closing all positions...")
+        result = close_all_positions(data.get('execution'))
+        log(f"Close all positions result: {result}")
+        return result
+
+    elif cmd_type == 'get_ticker_price':
+        ticker = data.get('ticker', '')
+        log(f"Getting ticker price for {ticker}...")
+        result = get_ticker_price(ticker)
+        log(f"Ticker price result: {result}")
+        return result
+
+    elif cmd_type == 'get_ticker_prices':
+        tickers = data.get('tickers', [])
+        log(f"Getting ticker prices for {len(tickers)} tickers...")
+        result = get_ticker_prices(tickers, request_id, data.get('timeout', 5), data.get('maxConcurrency', 40))
+        log(f"Ticker prices result: {len(result.get('prices', {}))} quotes")
+        return result
+
+    elif cmd_type == 'validate_ticker':
+        ticker = data.get('ticker', '')
+        log(f"Validating ticker {ticker}...")
+        result = validate_ticker(ticker)
+        log(f"Validation result: {result}")
+        return result
+
+    elif cmd_type == 'validate_tickers':
+        tickers = data.get('tickers', [])
+        log(f"Bulk validating {len(tickers)} tickers...")
+        result = validate_tickers(tickers, request_id, data.get('maxConcurrency', 8))
+        log(f"Bulk validation result: {result.get('message')}")
+        return result
+
+    elif cmd_type == 'get_option_chain':
+        ticker = data.get('ticker', '')
+        log(f"Getting option chain for {ticker}...")
+        result = get_option_chain(ticker, cancel_event)
+        log(f"Option chain result: success={result.get('success')}, chains={len(result.get('optionChain', []))}")
+        return result
+
+    elif cmd_type == 'get_atm_strike':
+        return query_chain_index('atm', data)
+
+    elif cmd_type == 'get_strikes_around':
+        return query_chain_index('around', data)
+
+    elif cmd_type == 'get_strike_for_delta':
+        return query_chain_index('delta', data)
+
+    elif cmd_type == 'get_expiries':
+        return query_chain_index('expiries', data)
+
+    elif cmd_type == 'get_historical_bars':
+        log(f"Getting historical bars: {data}")
+        result = get_historical_bars(data)
+        log(f"Historical bars result: {len(result.get('bars', {}).get('time', []))} bars")
+        return result
+
+    elif cmd_type == 'build_vol_surface':
+        ticker = data.get('ticker', '')
+        log(f"Building vol surface for {ticker}...")
+        result = build_vol_surface(ticker, data.get('maxExpiries', 8), data.get('strikesPerExpiry', 10))
+        log(f"Vol surface result: {result.get('message')}")
+        return result
+
+    elif cmd_type == 'release_vol_surface':
+        return release_vol_surface(data.get('ticker', ''))
+
+    elif cmd_type == 'start_scanner':
+        return start_scanner(data)
+
+    elif cmd_type == 'stop_scanner':
+        return stop_scanner(data)
+
+    elif cmd_type == 'get_scanners':
+        return get_scanners(data)
+
+    elif cmd_type == 'get_implied_vol':
+        log(f"Getting implied vol: {data}")
+        return get_implied_vol(data.get('ticker', ''), data['strike'], data['expiry'])
+
+    elif cmd_type == 'get_portfolio_greeks':
+        return get_portfolio_greeks()
+
+    elif cmd_type == 'run_scenario':
+        log(f"Running scenario: {data}")
+        return run_scenario(data)
+
+    elif cmd_type == 'get_order_journal':
+        return get_order_journal(int(data.get('limit', 50)))
+
+    elif cmd_type == 'get_market_session':
+        return get_market_session()
+
+    elif cmd_type == 'start_chain_export':
+        return start_chain_export(data)
+
+    elif cmd_type == 'stop_chain_export':
+        return stop_chain_export()
+
+    elif cmd_type == 'get_chain_export':
+        return get_chain_export()
+
+    elif cmd_type == 'get_quote_board':
+        return get_quote_board()
+
+    elif cmd_type == 'profile_start':
+        return profile_start(data)
+
+    elif cmd_type == 'profile_stop':
+        return profile_stop()
+
+    elif cmd_type == 'trace_start':
+        return trace_start(data)
+
+    elif cmd_type == 'trace_stop':
+        return trace_stop(data)
+
+    elif cmd_type == 'batch':
+        return run_batch(data.get('commands', []), request_id, cancel_event)
+
+    else:
+        log(f"Unknown command: {cmd_type}")
+        return {"success": False, "message": f"Unknown command: {cmd_type}"}
+
+
+def run_batch(commands, request_id=None, cancel_event=None):
+    """
+    Run several sub-commands in one round trip, in the order given, so a read
+    after an order sees its result. Results are keyed by each sub-command's 'id'
+    (or its index when no id is given).
+
+    Read-only sub-commands are not overlapped either: the handlers wait on the one
+    ib_insync event loop (ib.sleep) and share its caches, so they cannot run on
+    other threads, and interleaving them on the loop would not cut the round trip
+    below the slowest TWS reply they already wait on. Cancelling the batch is passed
+    to each sub-command; the ones not yet started are answered as cancelled.
+    """
+    log(f"Running batch of {len(commands)} commands")
+    results = {}
+
+    for index, sub in enumerate(commands):
+        key = str(sub.get('id', index))
+        sub_type = sub.get('type')
+        try:
+            if sub_type == 'batch':
+                results[key] = {"success": False, "message": "Nested batch commands are not supported"}
+                continue
+            if cancel_event is not None and cancel_event.is_set():
+                results[key] = {"success": False, "cancelled": True, "message": "Batch cancelled"}
+                continue
+            results[key] = execute_command(sub_type, sub.get('data', {}), request_id, cancel_event)
+        except Exception as e:
+            log(f"Error in batch command {sub_type}: {str(e)}\n{traceback.format_exc()}")
+            results[key] = {"success": False, "message": f"Error: {str(e)}"}
+
+    return {
+        "success": all(r.get('success') for r in results.values()),
+        "results": results
+    }
+
+
+def handle_command(command, cancel_event=None):
     """Handle incoming command"""
     global ib
     
@@ -699,114 +2319,290 @@ def handle_command(command):
     log(f"Handling command: {cmd_type} with requestId: {request_id}")
     
     try:
-        if cmd_type == 'place_order':
-            data = command.get('data', {})
-            log(f"Placing order: {data}")
-            
-            # Extract SL/TP parameters
-            stop_loss = data.get('stopLoss', '--')
-            take_profit = data.get('takeProfit', '--')
-            
-            result = place_order(
-                data['action'], data['ticker'], data['quantity'],
-                data['expiry'], data['strike'], data['optionType'],
-                stop_loss, take_profit
-            )
-            send_response(result, request_id)
-            
-        elif cmd_type == 'get_positions':
-            log("Getting positions...")
-            result = get_positions()
-            log(f"Positions result: {result}")
-            send_response(result, request_id)
-            
-        elif cmd_type == 'get_balance':
-            log("Getting balance...")
-            result = get_balance()
-            log(f"Balance result: {result}")
-            send_response(result, request_id)
-            
-        elif cmd_type == 'close_position':
-            data = command.get('data', {})
-            log(f"Closing position: {data}")
-            result = close_position(data['symbol'], data['position'])
-            send_response(result, request_id)
-            
-        elif cmd_type == 'get_daily_pnl':
-            log("Getting daily P&L...")
-            result = get_daily_pnl()
-            log(f"Daily P&L result: {result}")
-            send_response(result, request_id)
-            
-        elif cmd_type == 'close_all_positions':
-            log("Closing all positions...")
-            result = close_all_positions()
-            log(f"Close all positions result: {result}")
-            send_response(result, request_id)
-
-        elif cmd_type == 'get_ticker_price':
-            data = command.get('data', {})
-            ticker = data.get('ticker', '')
-            log(f"Getting ticker price for {ticker}...")
-            result = get_ticker_price(ticker)
-            log(f"Ticker price result: {result}")
-            send_response(result, request_id)
-
-        elif cmd_type == 'validate_ticker':
-            data = command.get('data', {})
-            ticker = data.get('ticker', '')
-            log(f"Validating ticker {ticker}...")
-            result = validate_ticker(ticker)
-            log(f"Validation result: {result}")
-            send_response(result, request_id)
-
-        elif cmd_type == 'get_option_chain':
-            data = command.get('data', {})
-            ticker = data.get('ticker', '')
-            log(f"Getting option chain for {ticker}...")
-            result = get_option_chain(ticker)
-            log(f"Option chain result: success={result.get('success')}, chains={len(result.get('optionChain', []))}")
-            send_response(result, request_id)
-
-        else:
-            log(f"Unknown command: {cmd_type}")
-            send_response({"success": False, "message": f"Unknown command: {cmd_type}"}, request_id)
+        with span(cmd_type, 'command', requestId=request_id):
+            result = execute_command(cmd_type, command.get('data', {}), request_id, cancel_event)
+        send_response(result, request_id)
+        return result
             
     except Exception as e:
         log(f"Error handling command {cmd_type}: {str(e)}\n{traceback.format_exc()}")
         send_response({"success": False, "message": f"Error: {str(e)}"}, request_id)
 
+
+def run_request(request):
+    """
+    Answer one request taken off the queue: a cancel ack, a cancelled request,
+    a result shared from an identical request, or the command itself
+    """
+    command = request.command
+    result = None
+    try:
+        if command.get('type') == 'cancel':
+            target = command.get('data', {}).get('requestId')
+            message = f"Cancelled request {target}" if request.found else f"No pending request {target}"
+            send_response({"success": bool(request.found), "message": message}, request.request_id)
+        elif request.cancelled:
+            log(f"Request {request.request_id} ({command.get('type')}) {request.cancel_reason} before it ran")
+            send_response({"success": False, "cancelled": True,
+                           "message": f"Request {request.cancel_reason}"}, request.request_id)
+        elif request.result is not None:
+            log(f"Request {request.request_id} ({command.get('type')}) answered by an identical request")
+            send_response(dict(request.result), request.request_id)
+        else:
+            result = handle_command(command, request.cancel_event)
+    finally:
+        # Identical requests that attached while this one ran get the same result
+        request_queue.finish(request, result)
+
+class DaemonClient:
+    """One local client connected to the bridge daemon socket"""
+
+    def __init__(self, sock, client_num):
+        self.sock = sock
+        self.name = f"client-{client_num}"
+        self.buffer = b''
+        self.symbols = set()  # market-data subscriptions this client relies on
+
+    def send_line(self, line):
+        self.sock.sendall(line.encode('utf-8') + b'\n')
+
+
+def release_tickers(symbols, clients, pinned=()):
+    """Cancel shared market-data lines no remaining client (or the watchlist) is using"""
+    still_used = set(pinned)
+    for client in clients:
+        still_used |= client.symbols
+    for symbol in symbols - still_used:
+        ticker_data = ticker_cache.pop(symbol, None)
+        if ticker_data is not None:
+            log(f"Cancelling shared market data for {symbol} (no subscribers left)")
+            ib.cancelMktData(ticker_data.contract)
+
+
+def serve_daemon(socket_path, pinned=()):
+    """
+    Serve the JSON line protocol to many local clients over a Unix domain socket,
+    all sharing this process's single TWS connection and market-data lines.
+    Client sockets are read on a separate thread, as stdin is, so a cancel or a
+    superseding request reaches a request that is already running.
+    """
+    global response_sink, event_sink
+    import socket
+    import selectors
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    server.listen()
+    server.setblocking(False)
+
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ)
+    clients = {}
+    gone = queue.Queue()  # clients the reader saw hang up, retired on the main thread
+    stopping = threading.Event()
+
+    def read_clients():
+        client_num = 0
+        while not stopping.is_set():
+            for key, _ in selector.select(timeout=0.05):
+                if key.fileobj is server:
+                    sock, _ = server.accept()
+                    sock.settimeout(5)
+                    client_num += 1
+                    client = DaemonClient(sock, client_num)
+                    log(f"Daemon {client.name} connected")
+                    try:
+                        client.send_line(json.dumps({"success": True, "message": "Connected to TWS bridge daemon"}))
+                    except OSError:
+                        sock.close()
+                        continue
+                    clients[sock] = client
+                    selector.register(sock, selectors.EVENT_READ)
+                    continue
+
+                client = clients[key.fileobj]
+                try:
+                    data = client.sock.recv(65536)
+                except OSError:
+                    data = b''
+                if not data:
+                    selector.unregister(client.sock)
+                    # Stops its running request too, not just the queued ones
+                    request_queue.cancel_owner(client)
+                    gone.put(client)
+                    continue
+
+                client.buffer += data
+                *lines, client.buffer = client.buffer.split(b'\n')
+                for line in lines:
+                    try:
+                        command = json.loads(line.decode('utf-8').strip())
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        continue
+                    request_queue.put(command, owner=client)
+
+    def drop(client):
+        """Hang up on a client; the reader thread sees it close and retires it"""
+        try:
+            client.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def retire(client):
+        log(f"Daemon {client.name} disconnected")
+        clients.pop(client.sock, None)
+        client.sock.close()
+        release_tickers(client.symbols, list(clients.values()), pinned)
+
+    def broadcast(line):
+        for client in list(clients.values()):
+            try:
+                client.send_line(line)
+            except OSError:
+                drop(client)
+
+    reader = threading.Thread(target=read_clients, daemon=True)
+    reader.start()
+    log(f"Bridge daemon listening on {socket_path}")
+    event_sink = broadcast
+    try:
+        while True:
+            ib.sleep(0.05)
+            while not gone.empty():
+                retire(gone.get_nowait())
+
+            # Unsolicited pushes go to every connected client
+            response_sink = broadcast
+            try:
+                run_periodic_tasks()
+            finally:
+                response_sink = None
+
+            # Run the most urgent pending request, answering on its client's socket
+            try:
+                request = request_queue.get_nowait()
+            except queue.Empty:
+                continue
+            client = request.owner
+            if client.sock not in clients:
+                request_queue.finish(request)
+                continue
+
+            command = request.command
+            if command.get('type') == 'get_ticker_price':
+                ticker = command.get('data', {}).get('ticker', '')
+                if ticker:
+                    client.symbols.add(ticker)
+
+            response_sink = client.send_line
+            try:
+                run_request(request)
+            except OSError as e:
+                log(f"Error writing to daemon {client.name}: {str(e)}")
+                drop(client)
+            finally:
+                response_sink = None
+
+    except KeyboardInterrupt:
+        log("Shutting down daemon...")
+    finally:
+        event_sink = None
+        stopping.set()
+        reader.join()
+        for client in list(clients.values()):
+            client.sock.close()
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
 def main():
-    if len(sys.argv) != 4:
-        log("Usage: tws_bridge.py <host> <port> <client_id>")
+    usage = ("Usage: tws_bridge.py [--daemon <socket_path>] [--quote-board <path>] [--sim <settings>] "
+             "<host> <port> <client_id> [watchlist]")
+    args = sys.argv[1:]
+    options = {}
+    while args[:1] and args[0].startswith('--'):
+        if args[0] not in ('--daemon', '--quote-board', '--sim') or len(args) < 2:
+            log(usage)
+            sys.exit(1)
+        options[args[0]] = args[1]
+        args = args[2:]
+    socket_path = options.get('--daemon')
+    if '--sim' in options:
+        global sim_settings, JOURNAL_PATH
+        try:
+            sim_settings = parse_settings(options['--sim'])
+        except ValueError as e:
+            log(str(e))
+            sys.exit(1)
+        # Simulated orders never mix with the real account's journal
+        JOURNAL_PATH = JOURNAL_PATH.replace('.db', '-sim.db')
+
+    if len(args) not in (3, 4):
+        log(usage)
         sys.exit(1)
     
-    host = sys.argv[1]
-    port = int(sys.argv[2])
-    client_id = int(sys.argv[3])
+    host = args[0]
+    port = int(args[1])
+    client_id = int(args[2])
+    connection_params.update(host=host, port=port, client_id=client_id)
+    global watchlist
+    watchlist = [t.strip().upper() for t in args[3].split(',') if t.strip()] if len(args) == 4 else []
+
+    # Build the session calendar once (holidays, early closes, extended hours)
+    global session_calendar
+    session_calendar = SessionCalendar()
     
-    # Connect to TWS
-    if not connect(host, port, client_id):
-        sys.exit(1)
+    # Start disconnected: the supervisor makes the first connect, retrying with backoff until
+    # TWS is up, and warms the caches once it succeeds so the first UI command is warm
+    create_client()
+    if '--quote-board' in options:
+        start_quote_board(options['--quote-board'])
+
+    if socket_path:
+        try:
+            serve_daemon(socket_path, set(watchlist))
+        finally:
+            if chain_exporter is not None:
+                chain_exporter.close()
+            ib.disconnect()
+        return
     
     log("Bridge ready, waiting for commands...")
     
+    # stdin is read on a separate thread so the loop keeps servicing ib_insync
+    # events and periodic pushes while no command is pending, and so a cancel
+    # or superseding request takes effect while another command is running
+    def read_stdin():
+        for line in sys.stdin:
+            try:
+                request_queue.put(json.loads(line.strip()))
+            except json.JSONDecodeError:
+                continue
+        request_queue.close()
+
+    threading.Thread(target=read_stdin, daemon=True).start()
+    
     # Command loop
     try:
         while True:
             ib.sleep(0.1)
+            run_periodic_tasks()
             
-            # Read commands from stdin
+            # Handle the most urgent command read from stdin
             try:
-                line = sys.stdin.readline()
-                if not line:
+                request = request_queue.get_nowait()
+            except queue.Empty:
+                if request_queue.closed and not len(request_queue):
                     break
-                
-                command = json.loads(line.strip())
-                handle_command(command)
-                
-            except json.JSONDecodeError:
                 continue
+
+            try:
+                run_request(request)
             except Exception as e:
                 log(f"Error processing command: {str(e)}\n{traceback.format_exc()}")
                 continue
@@ -814,6 +2610,8 @@ def main():
     except KeyboardInterrupt:
         log("Shutting down...")
     finally:
+        if chain_exporter is not None:
+            chain_exporter.close()
         if ib:
             try:
                 ib.disconnect()
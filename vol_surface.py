@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Vol Surface Module - Implied-volatility surface per underlying
+Each expiry's smile is a quadratic in log-moneyness fitted by least squares.
+The normal-equation sums are kept per expiry, so a new IV tick replaces one
+point's contribution instead of refitting; expiries are joined by linear
+interpolation in total variance
+"""
+
+import math
+from bisect import bisect_left
+from datetime import datetime
+
+import numpy as np
+
+SECONDS_PER_YEAR = 365.0 * 24 * 3600
+MIN_POINTS_PER_SMILE = 3
+
+
+def year_fraction(expiry, now=None):
+    """Years from now to a 'YYYYMMDD' expiry (4:00 PM ET close treated as end of day)"""
+    now = now or datetime.now()
+    expires = datetime.strptime(expiry, '%Y%m%d').replace(hour=16)
+    return max((expires - now).total_seconds() / SECONDS_PER_YEAR, 1.0 / 365 / 24)
+
+
+def _features(x):
+    """Design row [1, x, x^2] for one or many log-moneyness values"""
+    x = np.asarray(x, dtype=float)
+    return np.stack([np.ones_like(x), x, x * x], axis=-1)
+
+
+class Smile:
+    """One expiry's quadratic smile with incrementally maintained normal equations"""
+
+    def __init__(self):
+        self.points = {}  # key -> (x, iv)
+        self.xtx = np.zeros((3, 3))
+        self.xty = np.zeros(3)
+        self._coef = None
+
+    def update(self, key, x, iv):
+        old = self.points.get(key)
+        if old is not None:
+            row = _features(old[0])
+            self.xtx -= np.outer(row, row)
+            self.xty -= row * old[1]
+        row = _features(x)
+        self.xtx += np.outer(row, row)
+        self.xty += row * iv
+        self.points[key] = (x, iv)
+        self._coef = None
+
+    def coefficients(self):
+        if self._coef is None:
+            if len(self.points) >= MIN_POINTS_PER_SMILE:
+                self._coef = np.linalg.lstsq(self.xtx, self.xty, rcond=None)[0]
+            else:
+                # Too few points for a curve: flat at the mean IV
+                self._coef = np.array([np.mean([iv for _, iv in self.points.values()]), 0.0, 0.0])
+        return self._coef
+
+    def iv(self, x):
+        return np.maximum(_features(x) @ self.coefficients(), 1e-4)
+
+
+class VolSurface:
+    """IV surface for one underlying, keyed by expiry and log-moneyness against a reference spot"""
+
+    def __init__(self, spot):
+        self.spot = float(spot)
+        self.smiles = {}  # expiry -> Smile
+
+    def update(self, expiry, strike, right, iv):
+        """Add or replace one option's implied vol (ignored if missing/NaN)"""
+        if not iv or math.isnan(iv) or iv <= 0:
+            return False
+        x = math.log(float(strike) / self.spot)
+        self.smiles.setdefault(expiry, Smile()).update((strike, right), x, float(iv))
+        return True
+
+    def update_many(self, expiries, strikes, rights, ivs):
+        """Vectorized bulk load of a chain snapshot"""
+        ivs = np.asarray(ivs, dtype=float)
+        valid = np.isfinite(ivs) & (ivs > 0)
+        xs = np.log(np.asarray(strikes, dtype=float) / self.spot)
+        for expiry, strike, right, x, iv in zip(np.asarray(expiries)[valid], np.asarray(strikes)[valid],
+                                                np.asarray(rights)[valid], xs[valid], ivs[valid]):
+            self.smiles.setdefault(str(expiry), Smile()).update((float(strike), str(right)), x, iv)
+
+    def expiries(self):
+        return sorted(self.smiles)
+
+    def implied_vol(self, strikes, expiry, now=None):
+        """IV at arbitrary strike(s) and 'YYYYMMDD' expiry"""
+        expiries = self.expiries()
+        if not expiries:
+            return None
+        x = np.log(np.asarray(strikes, dtype=float) / self.spot)
+        if expiry in self.smiles:
+            return self.smiles[expiry].iv(x)
+
+        t = year_fraction(expiry, now)
+        i = bisect_left(expiries, expiry)
+        if i == 0:
+            return self.smiles[expiries[0]].iv(x)
+        if i == len(expiries):
+            return self.smiles[expiries[-1]].iv(x)
+
+        # Linear in total variance between the neighbouring expiries
+        before, after = expiries[i - 1], expiries[i]
+        t0, t1 = year_fraction(before, now), year_fraction(after, now)
+        w0 = self.smiles[before].iv(x) ** 2 * t0
+        w1 = self.smiles[after].iv(x) ** 2 * t1
+        weight = (t - t0) / (t1 - t0)
+        return np.sqrt(np.maximum(w0 + weight * (w1 - w0), 1e-8) / t)
+
+    def grid(self, strikes, now=None):
+        """IV for every listed expiry across the given strikes (expiries x strikes)"""
+        return {expiry: self.implied_vol(strikes, expiry, now).tolist() for expiry in self.expiries()}